@@ -9,6 +9,8 @@ with Tendermint.
 import logging
 import sys
 
+from hashlib import sha3_256
+
 from abci.application import BaseApplication
 from abci.application import OkCode
 
@@ -24,14 +26,23 @@ from tendermint.abci.types_pb2 import (
 )
 
 from planetmint.application.validator import Validator
+from planetmint.application.signatures import BlockSignatureVerifier
+from planetmint.config import Config
 from planetmint.abci.utils import decode_validator, decode_transaction, calculate_hash
 from planetmint.abci.block import Block
 from planetmint.ipc.events import EventTypes, Event
+from planetmint.backend import tracing
 from planetmint.backend.exceptions import DBConcurrencyError
+from planetmint.utils import metrics
+from planetmint.utils.lru_cache import LRUCache
 
 CodeTypeError = 1
 logger = logging.getLogger(__name__)
 
+# the ABCI requests whose processing time is recorded
+TIMED_PHASES = ("check_tx", "deliver_tx", "end_block", "commit")
+BLOCK_SIZE_BUCKETS = (0, 1, 10, 100, 1000, 10000)
+
 
 class ApplicationLogic(BaseApplication):
     """Bridge between Planetmint and Tendermint.
@@ -56,6 +67,25 @@ class ApplicationLogic(BaseApplication):
         self.validators = None
         self.new_height = None
         self.chain = self.validator.models.get_latest_abci_chain()
+        # transactions accepted by `check_tx`, by hash of the raw transaction
+        checked_transactions_size = Config().get()["cache"]["checked_transactions"]
+        self.checked_transactions = LRUCache(checked_transactions_size) if checked_transactions_size else None
+        # the ed25519 signatures deferred by the parallel validation are
+        # verified at once in `end_block`
+        validation_config = Config().get()["validation"]
+        self.signature_verifier = BlockSignatureVerifier(
+            validation_config["signature_batch_size"], validation_config["signature_threads"]
+        )
+        # every transaction validated by the parallel validation in the
+        # block, and whether its signatures are (or will be) verified
+        self.delivered_transactions = []
+        self.block_size = metrics.histogram(
+            "planetmint_block_transactions", "Transactions per committed block", buckets=BLOCK_SIZE_BUCKETS
+        )
+        # the phases of subclasses are timed, and their queries traced, too
+        for phase in TIMED_PHASES:
+            latency = metrics.histogram("planetmint_abci_seconds", "Time spent in an ABCI phase", {"phase": phase})
+            setattr(self, phase, tracing.scoped("abci " + phase, latency.timed(getattr(self, phase))))
 
     def log_abci_migration_error(self, chain_id, validators):
         logger.error(
@@ -129,6 +159,8 @@ class ApplicationLogic(BaseApplication):
         r = ResponseInfo()
         block = None
         try:
+            # Tendermint (re)connects with an info request, resync with the database
+            self.validator.models.load_chain_state()
             block = self.validator.models.get_latest_block()
         except DBConcurrencyError:
             block = None
@@ -156,8 +188,11 @@ class ApplicationLogic(BaseApplication):
         logger.debug("check_tx: %s", raw_transaction)
         transaction = decode_transaction(raw_transaction)
         try:
-            if self.validator.is_valid_transaction(transaction):
+            transaction = self.validator.is_valid_transaction(transaction)
+            if transaction:
                 logger.debug("check_tx: VALID")
+                if self.checked_transactions is not None:
+                    self.checked_transactions.put(sha3_256(raw_transaction).digest(), transaction)
                 return ResponseCheckTx(code=OkCode)
             else:
                 logger.debug("check_tx: INVALID")
@@ -181,6 +216,8 @@ class ApplicationLogic(BaseApplication):
 
         self.block_txn_ids = []
         self.block_transactions = []
+        self.delivered_transactions = []
+        self.signature_verifier.reset()
         return ResponseBeginBlock()
 
     def deliver_tx(self, raw_transaction):
@@ -194,10 +231,22 @@ class ApplicationLogic(BaseApplication):
 
         logger.debug("deliver_tx: %s", raw_transaction)
         transaction = None
+        checked_transaction = None
+        if self.checked_transactions is not None:
+            checked_transaction = self.checked_transactions.pop(sha3_256(raw_transaction).digest())
         try:
-            transaction = self.validator.is_valid_transaction(
-                decode_transaction(raw_transaction), self.block_transactions
-            )
+            if checked_transaction is not None:
+                # the schema and the signatures were verified by `check_tx`,
+                # only the state of the chain may have changed since then
+                transaction = self.validator.is_valid_transaction(
+                    checked_transaction, self.block_transactions, verify_signatures=False
+                )
+            else:
+                # the signatures are only deferred to `end_block` by the
+                # parallel validation, a transaction delivered here with an
+                # invalid signature is rejected right away
+                dict_transaction = decode_transaction(raw_transaction)
+                transaction = self.validator.is_valid_transaction(dict_transaction, self.block_transactions)
         except DBConcurrencyError:
             sys.exit(1)
         except ValueError:
@@ -229,8 +278,9 @@ class ApplicationLogic(BaseApplication):
         # store pre-commit state to recover in case there is a crash during
         # `end_block` or `commit`
         logger.debug(f"Updating pre-commit state: {self.new_height}")
-        pre_commit_state = dict(height=self.new_height, transactions=self.block_txn_ids)
         try:
+            self.verify_block_signatures()
+            pre_commit_state = dict(height=self.new_height, transactions=self.block_txn_ids)
             self.validator.models.store_pre_commit_state(pre_commit_state)
 
             block_txn_hash = calculate_hash(self.block_txn_ids)
@@ -252,12 +302,36 @@ class ApplicationLogic(BaseApplication):
 
         return ResponseEndBlock(validator_updates=validator_update)
 
+    def verify_block_signatures(self):
+        """Verify the signatures deferred by the parallel validation and drop
+        the transactions with an invalid signature from the block."""
+
+        invalid = self.signature_verifier.verify()
+        if not invalid:
+            return
+
+        logger.warning("Dropping %s transactions with an invalid signature from the block", len(invalid))
+        # the transactions delivered after an invalid one may depend on it,
+        # so the rest of the block is validated again without it
+        self.block_txn_ids = []
+        self.block_transactions = []
+        for index, (transaction, verified) in enumerate(self.delivered_transactions):
+            if index in invalid:
+                continue
+            transaction = self.validator.is_valid_transaction(
+                transaction, self.block_transactions, verify_signatures=not verified
+            )
+            if transaction:
+                self.block_txn_ids.append(transaction.id)
+                self.block_transactions.append(transaction)
+
     def commit(self):
         """Store the new height and along with block hash."""
 
         self.abort_if_abci_chain_is_not_synced()
 
         data = self.block_txn_hash.encode("utf-8")
+        self.block_size.observe(len(self.block_txn_ids))
         try:
             # register a new block only when new transactions are received
             if self.block_txn_ids:
@@ -3,23 +3,43 @@
 # SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
 # Code is Apache-2.0 and docs are CC-BY-4.0
 
+import logging
+import math
 import multiprocessing
+import os
+import queue
+import struct
+import time
 
-from collections import defaultdict
+from collections import defaultdict, deque
+from transactions import Transaction
 from planetmint.abci.application_logic import ApplicationLogic
 from planetmint.application.validator import Validator
 from planetmint.abci.utils import decode_transaction
+from planetmint.config import Config
+from planetmint.utils import metrics
+from planetmint.utils.ring_buffer import RingBuffer
 from abci.application import OkCode
 from tendermint.abci.types_pb2 import (
     ResponseCheckTx,
     ResponseDeliverTx,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class ParallelValidationApp(ApplicationLogic):
     def __init__(self, planetmint=None, events_queue=None):
         super().__init__(planetmint, events_queue)
-        self.parallel_validator = ParallelValidator()
+        validation_config = Config().get()["validation"]
+        self.parallel_validator = ParallelValidator(
+            number_of_workers=validation_config["workers"],
+            buffer_size=validation_config["buffer_size"],
+            cpu_affinity=validation_config["cpu_affinity"],
+            restart_workers=validation_config["restart_workers"],
+            auto_tune=validation_config["auto_tune"],
+            transactions_per_worker=validation_config["transactions_per_worker"],
+        )
         self.parallel_validator.start()
 
     def check_tx(self, raw_transaction):
@@ -31,57 +51,411 @@ class ParallelValidationApp(ApplicationLogic):
 
     def end_block(self, request_end_block):
         result = self.parallel_validator.result(timeout=30)
-        for transaction in result:
-            if transaction:
+        for dict_transaction, verdict, signatures in result:
+            if verdict == MALFORMED:
+                continue
+            if verdict == VALID:
+                # the workers validated the transaction, don't validate the
+                # schema again
+                transaction = Transaction.from_dict(dict_transaction, True)
+                self.signature_verifier.add(len(self.delivered_transactions), signatures)
                 self.block_txn_ids.append(transaction.id)
                 self.block_transactions.append(transaction)
+            self.delivered_transactions.append((dict_transaction, verdict == VALID))
 
         return super().end_block(request_end_block)
 
 
-RESET = "reset"
-EXIT = "exit"
+# messages to the workers
+TRANSACTION = b"T"
+RESET = b"R"
+EXIT = b"E"
+
+# verdicts of the workers
+VALID = 0
+INVALID = 1
+MALFORMED = 2
+
+_TRANSACTION_HEADER = struct.Struct("<cI")
+# index, verdict, validation time in microseconds and number of signatures
+_VERDICT_HEADER = struct.Struct("<IBII")
+# public key, message and signature of an ed25519 fulfillment
+_SIGNATURE = struct.Struct("<32s32s64s")
+
+# how often to check that the workers are alive while waiting for verdicts
+_LIVENESS_INTERVAL = 0.1
+
+# the bounds of the delay between two polls of the results buffers
+_MIN_POLL_DELAY = 0.0005
+_MAX_POLL_DELAY = 0.01
+
+
+def pack_transaction(index, raw_transaction):
+    return _TRANSACTION_HEADER.pack(TRANSACTION, index) + raw_transaction
+
+
+def unpack_transaction(message):
+    _, index = _TRANSACTION_HEADER.unpack_from(message)
+    return index, message[_TRANSACTION_HEADER.size :]
+
+
+def pack_verdict(index, verdict, signatures=(), elapsed=0.0):
+    elapsed_us = min(int(elapsed * 1_000_000), 0xFFFFFFFF)
+    return _VERDICT_HEADER.pack(index, verdict, elapsed_us, len(signatures)) + b"".join(
+        _SIGNATURE.pack(*signature) for signature in signatures
+    )
+
+
+def unpack_verdict(message):
+    """Return the index, the verdict and the signatures of a verdict."""
+    return unpack_verdict_with_timing(message)[:3]
+
+
+def unpack_verdict_with_timing(message):
+    index, verdict, elapsed_us, count = _VERDICT_HEADER.unpack_from(message)
+    signatures = [_SIGNATURE.unpack_from(message, _VERDICT_HEADER.size + i * _SIGNATURE.size) for i in range(count)]
+    return index, verdict, signatures, elapsed_us / 1_000_000
+
+
+def _run_worker(in_buffer, results_buffer, cpus):
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    # workers are forked from the process committing the blocks, possibly
+    # after it enabled its committed filter and chain state: only that
+    # process keeps them up to date
+    Validator().models.disable_committed_state()
+    ValidationWorker(in_buffer, results_buffer).run()
 
 
 class ParallelValidator:
-    def __init__(self, number_of_workers=multiprocessing.cpu_count()):
-        self.number_of_workers = number_of_workers
-        self.transaction_index = 0
-        self.routing_queues = [multiprocessing.Queue() for _ in range(self.number_of_workers)]
-        self.workers = []
-        self.results_queue = multiprocessing.Queue()
+    """Validate the transactions of a block across a pool of worker processes.
+
+    Transactions are buffered until the end of the block, grouped into
+    independent components with :func:`dependency_components` and every
+    component is routed to a single worker, so dependent transactions are
+    always validated in block order and against each other.
+
+    The raw transactions are passed to the workers through a shared memory
+    :class:`~planetmint.utils.ring_buffer.RingBuffer` per worker, and the
+    workers only send back a compact verdict: the index of the transaction,
+    whether it is valid and the signatures left to verify, through a results
+    buffer of their own, so a dead worker can't block the others.
+
+    Args:
+        number_of_workers (int): the number of worker processes, if None, the
+            number of CPUs.
+        buffer_size (int): the size in bytes of every ring buffer.
+        cpu_affinity (list): the CPUs to pin the workers to, one CPU per
+            worker, round robin. Workers are not pinned if empty.
+        restart_workers (bool): whether to restart the workers that died;
+            the transactions of the current block they were validating are
+            validated again.
+        auto_tune (bool): whether to only use as many workers as the recent
+            blocks need, that is one worker per `transactions_per_worker`
+            transactions of the average of the last `auto_tune_window` blocks.
+    """
+
+    def __init__(
+        self,
+        number_of_workers=None,
+        buffer_size=16 * 1024 * 1024,
+        cpu_affinity=None,
+        restart_workers=True,
+        auto_tune=False,
+        transactions_per_worker=100,
+        auto_tune_window=10,
+    ):
+        self.number_of_workers = number_of_workers or multiprocessing.cpu_count()
+        self.buffer_size = buffer_size
+        self.cpu_affinity = list(cpu_affinity or [])
+        self.restart_workers = restart_workers
+        self.auto_tune = auto_tune
+        self.transactions_per_worker = transactions_per_worker
+        self.block_sizes = deque(maxlen=auto_tune_window)
+        self.active_workers = self.number_of_workers
+        self.transactions = []
+        self.routing_buffers = [RingBuffer(buffer_size) for _ in range(self.number_of_workers)]
+        self.workers = [None] * self.number_of_workers
+        self.results_buffers = [RingBuffer(buffer_size) for _ in range(self.number_of_workers)]
+        self.rounds = 0
+        self.restarts = 0
+        self.worker_transactions = [0] * self.number_of_workers
+        self.worker_busy_seconds = [0.0] * self.number_of_workers
+        self._register_metrics()
+
+    def _register_metrics(self):
+        # the counts are kept in the metrics too: the workers forked from
+        # this process start from zero, functions would report stale copies
+        self.rounds_metric = metrics.counter(
+            "planetmint_validation_rounds_total", "Blocks validated by the parallel validation"
+        )
+        self.restarts_metric = metrics.counter(
+            "planetmint_validation_worker_restarts_total", "Dead validation workers restarted"
+        )
+        self.active_workers_metric = metrics.gauge(
+            "planetmint_validation_active_workers", "Validation workers used for the next block"
+        )
+        self.active_workers_metric.set(self.active_workers)
+        self.worker_transactions_metrics = []
+        self.worker_busy_seconds_metrics = []
+        for worker_index in range(self.number_of_workers):
+            labels = {"worker": str(worker_index)}
+            self.worker_transactions_metrics.append(
+                metrics.counter(
+                    "planetmint_validation_worker_transactions_total", "Transactions validated by a worker", labels
+                )
+            )
+            self.worker_busy_seconds_metrics.append(
+                metrics.counter(
+                    "planetmint_validation_worker_busy_seconds_total", "Time a worker spent validating", labels
+                )
+            )
 
     def start(self):
-        for routing_queue in self.routing_queues:
-            worker = ValidationWorker(routing_queue, self.results_queue)
-            process = multiprocessing.Process(target=worker.run)
-            process.start()
-            self.workers.append(process)
+        for worker_index in range(self.number_of_workers):
+            self._start_worker(worker_index)
+
+    def _start_worker(self, worker_index):
+        cpus = None
+        if self.cpu_affinity:
+            cpus = {self.cpu_affinity[worker_index % len(self.cpu_affinity)]}
+        process = multiprocessing.Process(
+            target=_run_worker,
+            args=(self.routing_buffers[worker_index], self.results_buffers[worker_index], cpus),
+        )
+        process.start()
+        self.workers[worker_index] = process
+
+    def _restart_worker(self, worker_index):
+        logger.warning("Restarting dead validation worker %s", worker_index)
+        # the worker may have died in the middle of a message, holding the
+        # lock of one of its buffers
+        for buffers in (self.routing_buffers, self.results_buffers):
+            buffers[worker_index].close()
+            buffers[worker_index] = RingBuffer(self.buffer_size)
+        self.restarts += 1
+        self.restarts_metric.inc()
+        self._start_worker(worker_index)
 
     def stop(self):
-        for routing_queue in self.routing_queues:
-            routing_queue.put(EXIT)
+        for routing_buffer in self.routing_buffers:
+            routing_buffer.put(EXIT)
+        for process in self.workers:
+            process.join()
+        for buffer in self.routing_buffers + self.results_buffers:
+            buffer.close()
 
     def validate(self, raw_transaction):
-        dict_transaction = decode_transaction(raw_transaction)
-        index = int(dict_transaction["id"], 16) % self.number_of_workers
-        self.routing_queues[index].put((self.transaction_index, dict_transaction))
-        self.transaction_index += 1
+        self.transactions.append(raw_transaction)
+
+    def schedule(self, transactions):
+        """Assign every transaction to one of the active workers.
+
+        Components are assigned largest first to the least loaded worker.
+
+        Returns:
+            list: the index of the worker of every transaction.
+        """
+        loads = [0] * self.active_workers
+        assignment = [None] * len(transactions)
+        for component in sorted(dependency_components(transactions), key=len, reverse=True):
+            worker_index = loads.index(min(loads))
+            loads[worker_index] += len(component)
+            for index in component:
+                assignment[index] = worker_index
+        return assignment
+
+    def tune(self, block_size):
+        """Record the size of a block and, if auto tuning, resize the set of
+        active workers from the sizes of the recent blocks."""
+        self.block_sizes.append(block_size)
+        if self.auto_tune:
+            average = sum(self.block_sizes) / len(self.block_sizes)
+            needed = math.ceil(average / self.transactions_per_worker)
+            self.active_workers = min(max(needed, 1), self.number_of_workers)
+            self.active_workers_metric.set(self.active_workers)
+
+    def stats(self):
+        """Return the usage statistics of the pool, e.g. to size it."""
+        return {
+            "workers": self.number_of_workers,
+            "active_workers": self.active_workers,
+            "rounds": self.rounds,
+            "restarts": self.restarts,
+            "per_worker": [
+                {
+                    "transactions": transactions,
+                    "busy_seconds": busy_seconds,
+                    "transactions_per_second": transactions / busy_seconds if busy_seconds else 0.0,
+                    "alive": process is not None and process.is_alive(),
+                }
+                for transactions, busy_seconds, process in zip(
+                    self.worker_transactions, self.worker_busy_seconds, self.workers
+                )
+            ],
+        }
+
+    def _get_verdict(self, timeout):
+        """Return the next verdict of any worker, raise :exc:`queue.Empty`
+        if there is none within `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        delay = _MIN_POLL_DELAY
+        while True:
+            for results_buffer in self.results_buffers:
+                try:
+                    return results_buffer.get(block=False)
+                except queue.Empty:
+                    pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise queue.Empty
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, _MAX_POLL_DELAY)
+
+    def _dead_workers(self):
+        return [index for index, process in enumerate(self.workers) if process is not None and not process.is_alive()]
 
     def result(self, timeout=None):
-        result_buffer = [None] * self.transaction_index
-        for _ in range(self.transaction_index):
-            index, transaction = self.results_queue.get(timeout=timeout)
-            result_buffer[index] = transaction
-        self.transaction_index = 0
-        for routing_queue in self.routing_queues:
-            routing_queue.put(RESET)
+        """Validate the buffered transactions.
+
+        Returns:
+            list: the decoded transaction, the verdict and the signatures left
+            to verify of every transaction, in block order.
+        """
+        raw_transactions, self.transactions = self.transactions, []
+        transactions = [_decode(raw_transaction) for raw_transaction in raw_transactions]
+
+        if self.restart_workers:
+            for worker_index in self._dead_workers():
+                self._restart_worker(worker_index)
+
+        # transactions are dispatched in block order, so every worker sees
+        # the transactions of a component in the order they were delivered
+        assigned = [[] for _ in range(self.number_of_workers)]
+        assignment = self.schedule(transactions)
+        for index, worker_index in enumerate(assignment):
+            assigned[worker_index].append(pack_transaction(index, raw_transactions[index]))
+        pending = [deque(messages) for messages in assigned]
+
+        result_buffer = [None] * len(transactions)
+        received = 0
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while received < len(transactions):
+            # keep reading verdicts while dispatching, so that neither the
+            # workers nor this process wait on a full buffer forever
+            for worker_index, messages in enumerate(pending):
+                while messages:
+                    try:
+                        self.routing_buffers[worker_index].put(messages[0], block=False)
+                    except queue.Full:
+                        break
+                    messages.popleft()
+            dispatching = any(pending)
+            wait = _LIVENESS_INTERVAL if deadline is None else max(deadline - time.monotonic(), 0)
+            wait = min(wait, 0.01 if dispatching else _LIVENESS_INTERVAL)
+            try:
+                message = self._get_verdict(wait)
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+                if self.restart_workers:
+                    # a restarted worker validates its share of the block
+                    # again, from the start
+                    for worker_index in self._dead_workers():
+                        self._restart_worker(worker_index)
+                        pending[worker_index] = deque(assigned[worker_index])
+                continue
+            index, verdict, signatures, elapsed = unpack_verdict_with_timing(message)
+            if result_buffer[index] is not None:
+                # validated again by a restarted worker
+                continue
+            result_buffer[index] = (transactions[index], verdict, signatures)
+            received += 1
+            self.worker_transactions[assignment[index]] += 1
+            self.worker_busy_seconds[assignment[index]] += elapsed
+            self.worker_transactions_metrics[assignment[index]].inc()
+            self.worker_busy_seconds_metrics[assignment[index]].inc(elapsed)
+            if deadline is not None:
+                deadline = time.monotonic() + timeout
+        for routing_buffer in self.routing_buffers:
+            routing_buffer.put(RESET)
+        self.rounds += 1
+        self.rounds_metric.inc()
+        self.tune(len(transactions))
         return result_buffer
 
 
+def _decode(raw_transaction):
+    try:
+        return decode_transaction(raw_transaction)
+    except ValueError:
+        return None
+
+
+def _dependency_keys(transaction, block_txids):
+    try:
+        keys = [transaction["id"]]
+        for input_ in transaction["inputs"]:
+            fulfills = input_["fulfills"]
+            if not fulfills:
+                continue
+            # the spent output, to catch double spends within the block
+            keys.append((fulfills["transaction_id"], fulfills["output_index"]))
+            # the spent transaction, if it is delivered in the same block
+            if fulfills["transaction_id"] in block_txids:
+                keys.append(fulfills["transaction_id"])
+        # keys are used in a dict, make sure they are usable as such
+        for key in keys:
+            hash(key)
+        return keys
+    except (KeyError, TypeError):
+        # malformed transactions are invalid anyway and don't depend on
+        # anything
+        return []
+
+
+def dependency_components(transactions):
+    """Group the transactions of a block into independent components.
+
+    Two transactions belong to the same component if one spends an output of
+    the other, if both spend the same output or if they have the same id,
+    directly or through other transactions. The validity of a transaction
+    only depends on the transactions of its own component, so components can
+    be validated in parallel, as long as the transactions of a component are
+    validated in block order.
+
+    Args:
+        transactions (list): the transactions (dict) of a block.
+
+    Returns:
+        list: the components, as lists of transaction indexes in block order.
+    """
+    parent = list(range(len(transactions)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    block_txids = {transaction.get("id") for transaction in transactions if isinstance(transaction, dict)}
+    owners = {}
+    for index, transaction in enumerate(transactions):
+        for key in _dependency_keys(transaction, block_txids):
+            if key in owners:
+                parent[find(index)] = find(owners[key])
+            else:
+                owners[key] = index
+
+    components = defaultdict(list)
+    for index in range(len(transactions)):
+        components[find(index)].append(index)
+    return list(components.values())
+
+
 class ValidationWorker:
     """Run validation logic in a loop. This Worker is suitable for a Process
-    life: no thrills, just a queue to get some values, and a queue to return results.
+    life: no thrills, just a buffer to get some values, and a buffer to return results.
 
     Note that a worker is expected to validate multiple transactions in
     multiple rounds, and it needs to keep in memory all transactions already
@@ -90,41 +464,48 @@ class ValidationWorker:
     worker is in, it expects an `EXIT` message.
     """
 
-    def __init__(self, in_queue, results_queue):
-        self.in_queue = in_queue
-        self.results_queue = results_queue
+    def __init__(self, in_buffer, results_buffer):
+        self.in_buffer = in_buffer
+        self.results_buffer = results_buffer
         self.validator = Validator()
         self.reset()
 
     def reset(self):
         # We need a place to store already validated transactions,
         # in case of dependant transactions in the same block.
-        # `validated_transactions` maps an `asset_id` with the list
-        # of all other transactions sharing the same asset.
-        self.validated_transactions = defaultdict(list)
+        # `ParallelValidator` routes all the transactions of a dependency
+        # component to the same worker, so the valid transactions seen in
+        # this round are all the context a transaction needs.
+        self.validated_transactions = []
 
     def validate(self, dict_transaction):
-        # TODO: this will only work for now, no multiasset support => needs to be refactored for COMPOSE/DECOMPOSE
-        try:
-            asset_id = dict_transaction["assets"][0]["id"]
-        except KeyError:
-            asset_id = dict_transaction["id"]
-        except TypeError:
-            asset_id = dict_transaction["id"]
-
-        transaction = self.validator.is_valid_transaction(dict_transaction, self.validated_transactions[asset_id])
+        # the signatures are returned, to be verified with the ones of the
+        # whole block
+        signatures = []
+        transaction = self.validator.is_valid_transaction(
+            dict_transaction, self.validated_transactions, deferred_signatures=signatures
+        )
 
         if transaction:
-            self.validated_transactions[asset_id].append(transaction)
-        return transaction
+            self.validated_transactions.append(transaction)
+        return transaction, signatures
+
+    def verdict(self, raw_transaction):
+        dict_transaction = _decode(raw_transaction)
+        if dict_transaction is None:
+            return MALFORMED, []
+        transaction, signatures = self.validate(dict_transaction)
+        return (VALID, signatures) if transaction else (INVALID, [])
 
     def run(self):
         while True:
-            message = self.in_queue.get()
+            message = self.in_buffer.get()
             if message == RESET:
                 self.reset()
             elif message == EXIT:
                 return
             else:
-                index, transaction = message
-                self.results_queue.put((index, self.validate(transaction)))
+                index, raw_transaction = unpack_transaction(message)
+                started = time.perf_counter()
+                verdict, signatures = self.verdict(raw_transaction)
+                self.results_buffer.put(pack_verdict(index, verdict, signatures, time.perf_counter() - started))
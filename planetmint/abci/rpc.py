@@ -1,4 +1,6 @@
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
 from uuid import uuid4
 from transactions.common.exceptions import ValidationError
 from transactions.common.transaction_mode_types import (
@@ -11,17 +13,33 @@ from planetmint.abci.utils import encode_transaction
 from planetmint.application.validator import logger
 from planetmint.config_utils import autoconfigure
 from planetmint.config import Config
+from planetmint.utils import serialization
 
 MODE_COMMIT = BROADCAST_TX_COMMIT
 MODE_LIST = (BROADCAST_TX_ASYNC, BROADCAST_TX_SYNC, MODE_COMMIT)
 
 
 class ABCI_RPC:
+    """Client of the Tendermint RPC.
+
+    The connections to Tendermint are kept alive and reused by the requests
+    of the client, so a client should be created once and reused. A client
+    must not be used by several threads at once, the web API keeps a pool
+    of one client per thread.
+    """
+
     def __init__(self):
         autoconfigure()
         self.tendermint_host = Config().get()["tendermint"]["host"]
         self.tendermint_port = Config().get()["tendermint"]["port"]
         self.tendermint_rpc_endpoint = "http://{}:{}/".format(self.tendermint_host, self.tendermint_port)
+        self.pool_size = Config().get()["tendermint"]["rpc_pool_size"]
+        self.session = self._create_session()
+
+    def _create_session(self):
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size))
+        return session
 
     @staticmethod
     def _process_post_response(mode_commit, response, mode):
@@ -51,26 +69,60 @@ class ABCI_RPC:
 
         return (202, "")
 
-    def write_transaction(self, mode_list, endpoint, mode_commit, transaction, mode):
-        # This method offers backward compatibility with the Web API.
-        """Submit a valid transaction to the mempool."""
-        response = self.post_transaction(mode_list, endpoint, transaction, mode)
-        return ABCI_RPC._process_post_response(mode_commit, response.json(), mode)
+    @staticmethod
+    def _process_batch_response(mode_commit, payload, response, mode):
+        """Return the status of every request of the batch `payload`, in
+        request order, Tendermint may reply in any order."""
+        if isinstance(response, dict):
+            # the whole batch was rejected
+            return [ABCI_RPC._process_post_response(mode_commit, response, mode) for _ in payload]
+        responses = {item.get("id"): item for item in response}
+        missing = {"error": {"message": "Internal Error", "data": "no response to the request"}}
+        return [
+            ABCI_RPC._process_post_response(mode_commit, responses.get(request["id"], missing), mode)
+            for request in payload
+        ]
 
-    def post_transaction(self, mode_list, endpoint, transaction, mode):
-        """Submit a valid transaction to the mempool."""
+    @staticmethod
+    def _payload(mode_list, transaction, mode):
         if not mode or mode not in mode_list:
             raise ValidationError("Mode must be one of the following {}.".format(", ".join(mode_list)))
 
         tx_dict = transaction.tx_dict if transaction.tx_dict else transaction.to_dict()
-        payload = {
+        return {
             "method": mode,
             "jsonrpc": "2.0",
             "params": [encode_transaction(tx_dict)],
             "id": str(uuid4()),
         }
+
+    def write_transaction(self, mode_list, endpoint, mode_commit, transaction, mode):
+        # This method offers backward compatibility with the Web API.
+        """Submit a valid transaction to the mempool."""
+        response = self.post_transaction(mode_list, endpoint, transaction, mode)
+        return ABCI_RPC._process_post_response(mode_commit, response.json(), mode)
+
+    def write_transactions(self, mode_list, endpoint, mode_commit, transactions, mode):
+        """Submit valid transactions to the mempool in a single JSON-RPC
+        batch request.
+
+        Returns:
+            list: the ``(status_code, message)`` of every transaction, as
+            returned by :meth:`write_transaction`.
+        """
+        if not transactions:
+            return []
+        payload = [ABCI_RPC._payload(mode_list, transaction, mode) for transaction in transactions]
+        response = self._post(endpoint, payload)
+        return ABCI_RPC._process_batch_response(mode_commit, payload, response.json(), mode)
+
+    def post_transaction(self, mode_list, endpoint, transaction, mode):
+        """Submit a valid transaction to the mempool."""
+        return self._post(endpoint, ABCI_RPC._payload(mode_list, transaction, mode))
+
+    def _post(self, endpoint, payload):
         try:
-            response = requests.post(endpoint, json=payload)
+            response = self.session.post(endpoint, json=payload)
         except requests.exceptions.ConnectionError as e:
             logger.error(f"Tendermint RCP Connection issue: {e}")
             raise e
@@ -78,3 +130,54 @@ class ABCI_RPC:
             logger.error(f"Tendermint RCP Connection issue: {e}")
             raise e
         return response
+
+
+class AsyncABCI_RPC(ABCI_RPC):
+    """Asyncio client of the Tendermint RPC, with the same methods as
+    :class:`ABCI_RPC` as coroutines.
+
+    It must be created and used in the same event loop, and closed with
+    :meth:`close` once it isn't used anymore.
+    """
+
+    def _create_session(self):
+        return None
+
+    def _session(self):
+        # aiohttp sessions must be created in a coroutine
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self.session = aiohttp.ClientSession(connector=connector, json_serialize=serialization.dumps)
+        return self.session
+
+    async def write_transaction(self, mode_list, endpoint, mode_commit, transaction, mode):
+        """Submit a valid transaction to the mempool."""
+        response = await self.post_transaction(mode_list, endpoint, transaction, mode)
+        return ABCI_RPC._process_post_response(mode_commit, response, mode)
+
+    async def write_transactions(self, mode_list, endpoint, mode_commit, transactions, mode):
+        """Submit valid transactions to the mempool in a single JSON-RPC
+        batch request."""
+        if not transactions:
+            return []
+        payload = [ABCI_RPC._payload(mode_list, transaction, mode) for transaction in transactions]
+        response = await self._post(endpoint, payload)
+        return ABCI_RPC._process_batch_response(mode_commit, payload, response, mode)
+
+    async def post_transaction(self, mode_list, endpoint, transaction, mode):
+        """Submit a valid transaction to the mempool and return the decoded
+        JSON-RPC response."""
+        return await self._post(endpoint, ABCI_RPC._payload(mode_list, transaction, mode))
+
+    async def _post(self, endpoint, payload):
+        try:
+            async with self._session().post(endpoint, json=payload) as response:
+                return await response.json(loads=serialization.loads, content_type=None)
+        except aiohttp.ClientError as e:
+            logger.error(f"Tendermint RCP Connection issue: {e}")
+            raise e
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
@@ -5,11 +5,13 @@ import json
 from binascii import hexlify
 from hashlib import sha3_256
 
+import rapidjson
 from packaging import version
 from tendermint.abci import types_pb2
 from tendermint.crypto import keys_pb2
 from transactions.common.crypto import key_pair_from_ed25519_key
 from transactions.common.exceptions import InvalidPublicKey
+from transactions.common.utils import serialize
 
 from planetmint.version import __tm_supported_versions__
 
@@ -95,19 +97,19 @@ def get_public_key_decoder(pk):
 def encode_transaction(value):
     """Encode a transaction (dict) to Base64."""
 
-    return base64.b64encode(json.dumps(value).encode("utf8")).decode("utf8")
+    return base64.b64encode(serialize(value).encode("utf8")).decode("utf8")
 
 
 def decode_transaction(raw):
     """Decode a transaction from bytes to a dict."""
 
-    return json.loads(raw.decode("utf8"))
+    return rapidjson.loads(raw)
 
 
 def decode_transaction_base64(value):
     """Decode a transaction from Base64."""
 
-    return json.loads(base64.b64decode(value.encode("utf8")).decode("utf8"))
+    return rapidjson.loads(base64.b64decode(value.encode("utf8")))
 
 
 def calculate_hash(key_list):
@@ -0,0 +1,141 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Block level verification of the ed25519 fulfillments of transactions.
+
+Only the parallel validation defers signatures to the end of the block. The
+serial ``deliver_tx`` must answer ``CodeTypeError`` for a transaction with an
+invalid signature when it is delivered, so it verifies them one by one.
+"""
+
+import multiprocessing
+
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha3_256
+
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
+from planetmint_cryptoconditions import Ed25519Sha256
+from transactions import Transaction
+from transactions.common.exceptions import InvalidSignature
+
+
+def collect_signatures(tx: Transaction, input_conditions: list) -> list[tuple]:
+    """Return the ed25519 signatures to verify for the inputs of `tx`.
+
+    Only the signatures of plain ed25519 fulfillments are returned, every
+    other part of the fulfillments (e.g. threshold conditions) is verified
+    right away.
+
+    Args:
+        tx (Transaction): the transaction.
+        input_conditions (list): the outputs the inputs of `tx` fulfill, as
+            :class:`transactions.common.output.Output`.
+
+    Returns:
+        list: ``(public_key, message, signature)`` tuples.
+
+    Raises:
+        InvalidSignature: if a fulfillment verified here is invalid.
+    """
+    conditions = [output.fulfillment.condition_uri for output in input_conditions]
+    deferrable = len(tx.inputs) == len(conditions) and all(
+        isinstance(input_.fulfillment, Ed25519Sha256) and input_.fulfillment.signature is not None
+        for input_ in tx.inputs
+    )
+    if not deferrable:
+        if not tx.inputs_valid(input_conditions):
+            raise InvalidSignature("Transaction signature is invalid.")
+        return []
+
+    # the same message as in `Transaction._inputs_valid`
+    tx_dict = Transaction._remove_signatures(tx.tx_dict if tx.tx_dict else tx.to_dict())
+    tx_dict["id"] = None
+    message = Transaction._to_str(tx_dict).encode()
+
+    signatures = []
+    for input_, condition in zip(tx.inputs, conditions):
+        if input_.fulfillment.condition_uri != condition:
+            raise InvalidSignature("Transaction signature is invalid.")
+        sha3_message = sha3_256(message)
+        if input_.fulfills:
+            sha3_message.update("{}{}".format(input_.fulfills.txid, input_.fulfills.output).encode())
+        signatures.append((input_.fulfillment.public_key, sha3_message.digest(), input_.fulfillment.signature))
+    return signatures
+
+
+def verify_signature(signature: tuple) -> bool:
+    public_key, message, signature = signature
+    try:
+        VerifyKey(public_key).verify(message, signature=signature)
+    except BadSignatureError:
+        return False
+    return True
+
+
+def verify_batch(signatures: list[tuple]) -> set:
+    """Return the positions of the invalid `signatures`.
+
+    PyNaCl has no batch verification, every signature is verified once.
+    """
+    return {position for position, signature in enumerate(signatures) if not verify_signature(signature)}
+
+
+class BlockSignatureVerifier:
+    """Verify the signatures collected from the transactions of a block.
+
+    Signatures are verified in batches of `batch_size` by a pool of
+    `threads` threads; libsodium releases the GIL, so batches are verified
+    in parallel.
+
+    It is used by the parallel validation only, whose workers return the
+    signatures of the transactions instead of verifying them. Without
+    ``--experimental-parallel-validation`` every transaction is verified
+    when it is delivered.
+
+    Example:
+        verifier = BlockSignatureVerifier()
+        verifier.add(0, collect_signatures(tx, input_conditions))
+        invalid = verifier.verify()
+    """
+
+    def __init__(self, batch_size=64, threads=None):
+        self.batch_size = batch_size
+        self.threads = threads or multiprocessing.cpu_count()
+        self._executor = None
+        self.reset()
+
+    def reset(self):
+        self.signatures = []
+        self.keys = []
+
+    def add(self, key, signatures: list[tuple]):
+        """Queue the `signatures` of the transaction identified by `key`."""
+        self.signatures.extend(signatures)
+        self.keys.extend(key for _ in signatures)
+
+    def verify(self) -> set:
+        """Verify the queued signatures.
+
+        Returns:
+            set: the keys of the transactions with an invalid signature.
+        """
+        signatures, keys = self.signatures, self.keys
+        self.reset()
+        batches = [
+            (signatures[start : start + self.batch_size], keys[start : start + self.batch_size])
+            for start in range(0, len(signatures), self.batch_size)
+        ]
+        if len(batches) > 1 and self.threads > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix="signatures")
+            results = list(self._executor.map(self._verify_batch, batches))
+        else:
+            results = [self._verify_batch(batch) for batch in batches]
+        return set().union(*results)
+
+    def _verify_batch(self, batch):
+        signatures, keys = batch
+        return {keys[position] for position in verify_batch(signatures)}
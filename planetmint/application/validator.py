@@ -24,15 +24,24 @@ from transactions.types.elections.validator_utils import election_id_to_public_k
 
 from planetmint.abci.utils import encode_validator, new_validator_set, key_from_base64, public_key_to_base64
 from planetmint.application.basevalidationrules import BaseValidationRules
+from planetmint.application.signatures import collect_signatures
 from planetmint.backend.models.output import Output
 from planetmint.model.dataaccessor import DataAccessor
 from planetmint.config import Config
 from planetmint.config_utils import load_validation_plugin
+from planetmint.utils import metrics
 from planetmint.utils.singleton import Singleton
 
 logger = logging.getLogger(__name__)
 
 
+def count_validation_failure(error):
+    """Count an invalid transaction in the metrics, by type of `error`."""
+    metrics.counter(
+        "planetmint_validation_failures_total", "Transactions found invalid, by error", {"error": type(error).__name__}
+    ).inc()
+
+
 class Validator:
     def __init__(self):
         self.models = DataAccessor()
@@ -68,20 +77,25 @@ class Validator:
                 raise AssetIdMismatch(("The asset ID of the compose must be different to all of its input asset IDs"))
 
     @staticmethod
-    def validate_input_conditions(tx: Transaction, input_conditions: list[Output]):
+    def validate_input_conditions(tx: Transaction, input_conditions: list[Output], deferred_signatures=None):
         # convert planetmint.Output objects to transactions.common.Output objects
         input_conditions_dict = Output.list_to_dict(input_conditions)
         input_conditions_converted = []
         for input_cond in input_conditions_dict:
             input_conditions_converted.append(TransactionOutput.from_dict(input_cond))
 
-        if not tx.inputs_valid(input_conditions_converted):
+        if deferred_signatures is not None:
+            deferred_signatures.extend(collect_signatures(tx, input_conditions_converted))
+        elif not tx.inputs_valid(input_conditions_converted):
             raise InvalidSignature("Transaction signature is invalid.")
 
-    def validate_compose_inputs(self, tx, current_transactions=[]) -> bool:
+    def validate_compose_inputs(
+        self, tx, current_transactions=[], verify_signatures=True, deferred_signatures=None
+    ) -> bool:
         input_txs, input_conditions = self.models.get_input_txs_and_conditions(tx.inputs, current_transactions)
 
-        Validator.validate_input_conditions(tx, input_conditions)
+        if verify_signatures:
+            Validator.validate_input_conditions(tx, input_conditions, deferred_signatures)
 
         Validator.validate_asset_id(tx, input_txs)
 
@@ -89,10 +103,13 @@ class Validator:
 
         return True
 
-    def validate_transfer_inputs(self, tx, current_transactions=[]) -> bool:
+    def validate_transfer_inputs(
+        self, tx, current_transactions=[], verify_signatures=True, deferred_signatures=None
+    ) -> bool:
         input_txs, input_conditions = self.models.get_input_txs_and_conditions(tx.inputs, current_transactions)
 
-        Validator.validate_input_conditions(tx, input_conditions)
+        if verify_signatures:
+            Validator.validate_input_conditions(tx, input_conditions, deferred_signatures)
 
         Validator.validate_asset_id(tx, input_txs)
 
@@ -130,8 +147,18 @@ class Validator:
 
         return True
 
-    def validate_transaction(self, transaction, current_transactions=[]):
-        """Validate a transaction against the current status of the database."""
+    def validate_transaction(
+        self, transaction, current_transactions=[], verify_signatures=True, deferred_signatures=None
+    ):
+        """Validate a transaction against the current status of the database.
+
+        The fulfillments of a transaction which already passed validation can
+        be trusted, since the conditions they fulfill can't change; pass
+        `verify_signatures=False` to only check the database state. If a
+        `deferred_signatures` list is passed, the ed25519 signatures are
+        appended to it instead of being verified, see
+        :class:`~planetmint.application.signatures.BlockSignatureVerifier`.
+        """
 
         # CLEANUP: The conditional below checks for transaction in dict format.
         # It would be better to only have a single format for the transaction
@@ -141,9 +168,11 @@ class Validator:
                 transaction = Transaction.from_dict(transaction, False)
             except SchemaValidationError as e:
                 logger.warning("Invalid transaction schema: %s", e.__cause__.message)
+                count_validation_failure(e)
                 return False
             except ValidationError as e:
                 logger.warning("Invalid transaction (%s): %s", type(e).__name__, e)
+                count_validation_failure(e)
                 return False
 
         if self.validate_script(transaction) == False:
@@ -153,10 +182,31 @@ class Validator:
         if transaction.operation == Transaction.CREATE:
             self.validate_create_inputs(transaction, current_transactions)
         elif transaction.operation in [Transaction.TRANSFER, Transaction.VOTE]:
-            self.validate_transfer_inputs(transaction, current_transactions)
+            self.validate_transfer_inputs(transaction, current_transactions, verify_signatures, deferred_signatures)
         elif transaction.operation in [Transaction.COMPOSE]:
-            self.validate_compose_inputs(transaction, current_transactions)
+            self.validate_compose_inputs(transaction, current_transactions, verify_signatures, deferred_signatures)
+
+        return transaction
 
+    @staticmethod
+    def validate_transaction_stateless(transaction: Transaction):
+        """Validate the part of a transaction which doesn't depend on the
+        database: its script and the signatures of its fulfillments.
+
+        The schema and the id are validated by ``Transaction.from_dict``.
+        Whether the fulfillments match the outputs they spend, double spends
+        and amounts are left to :meth:`validate_transaction`.
+        """
+        if transaction.script and not transaction.script.validate():
+            raise ValidationError("Invalid transaction script")
+        try:
+            # every fulfillment is checked against its own condition
+            outputs = [TransactionOutput(input_.fulfillment) for input_ in transaction.inputs]
+            valid = transaction.inputs_valid(outputs)
+        except (AttributeError, TypeError, ValueError):
+            valid = False
+        if not valid:
+            raise InvalidSignature("Transaction signature is invalid.")
         return transaction
 
     def validate_script(self, transaction: Transaction) -> bool:
@@ -501,13 +551,14 @@ class Validator:
             self.models.store_validator_set(new_height + 1, updated_validator_set)
             return encode_validator(election.assets[0].data)
 
-    def is_valid_transaction(self, tx, current_transactions=[]):
+    def is_valid_transaction(self, tx, current_transactions=[], verify_signatures=True, deferred_signatures=None):
         # NOTE: the function returns the Transaction object in case
         # the transaction is valid
         try:
-            return self.validate_transaction(tx, current_transactions)
+            return self.validate_transaction(tx, current_transactions, verify_signatures, deferred_signatures)
         except ValidationError as e:
             logger.warning("Invalid transaction (%s): %s", type(e).__name__, e)
+            count_validation_failure(e)
             return False
 
     def migrate_abci_chain(self):
@@ -555,3 +606,5 @@ class Validator:
         if latest_block["height"] < pre_commit["height"]:
             self.rollback_election(pre_commit["height"], pre_commit["transactions"])
             self.models.delete_transactions(pre_commit["transactions"])
+            # the rolled back elections changed the validators and the chain
+            self.models.invalidate_caches()
@@ -44,6 +44,13 @@ class DBSingleton(type):
         return cls._instances[cls]
 
 
+def release_connections():
+    """Hand the database connections used by the current thread back to
+    their connection pools, if any."""
+    for connection in DBSingleton._instances.values():
+        connection.release()
+
+
 class Connection(metaclass=DBSingleton):
     def __init__(self) -> None:
         pass
@@ -114,6 +121,11 @@ class DBConnection(metaclass=DBSingleton):
         """
         raise NotImplementedError()
 
+    def release(self):
+        """Release the resources the current thread holds, e.g. give its
+        connection back to a connection pool."""
+        pass
+
     def close(self):
         """Try to close connection to the database.
         Raises:
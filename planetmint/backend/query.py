@@ -62,6 +62,22 @@ def store_transactions(connection, signed_transactions):
     raise NotImplementedError
 
 
+@singledispatch
+def store_bulk_transactions(connection, transactions, governance_transactions):
+    """Store the transactions of a block in a single atomic operation.
+
+    Besides the transactions and their outputs, the utxo set is updated:
+    the outputs spent by the transactions are removed from it and their
+    own outputs are added to it.
+
+    Args:
+        transactions (list): transactions (dict) to store in the transactions table.
+        governance_transactions (list): transactions (dict) to store in the governance table.
+    """
+
+    raise NotImplementedError
+
+
 @singledispatch
 def store_transaction(connection, transaction):
     """Store a single transaction."""
@@ -104,6 +120,22 @@ def get_transactions_by_metadata(connection, metadata: str, limit: int = 1000) -
     raise NotImplementedError
 
 
+@singledispatch
+def get_txids_by_asset(connection, asset: str, limit: int = 1000, after: str = None) -> list[str]:
+    """Get the ids of the transactions with an asset of the given cid,
+    listed after the transaction with the id `after` if given."""
+
+    raise NotImplementedError
+
+
+@singledispatch
+def get_txids_by_metadata(connection, metadata: str, limit: int = 1000, after: str = None) -> list[str]:
+    """Get the ids of the transactions with the given metadata cid, listed
+    after the transaction with the id `after` if given."""
+
+    raise NotImplementedError
+
+
 @singledispatch
 def get_transactions(connection, transactions_ids) -> list[DbTransaction]:
     """Get a transaction from the transactions table.
@@ -165,6 +197,36 @@ def get_spending_transactions(connection, inputs):
     raise NotImplementedError
 
 
+@singledispatch
+def get_transaction_ids(connection, table, after=None, limit=10000):
+    """Return the ids of the transactions stored in `table` in ascending
+    order.
+
+    Args:
+        table (str): the table to read the ids from.
+        after (str): only return ids greater than this one.
+        limit (int): the maximum number of ids to return.
+
+    Returns:
+        list of transaction ids.
+    """
+    raise NotImplementedError
+
+
+@singledispatch
+def get_spending_transaction_ids(connection, links):
+    """Return the ids of the transactions spending any of the given outputs.
+
+    Args:
+        links (list): list of ``(transaction_id, output_index)`` pairs.
+
+    Returns:
+        list of ``(transaction_id, output_index, spending_transaction_id)``
+        triples, one for every spending transaction found.
+    """
+    raise NotImplementedError
+
+
 @singledispatch
 def get_owned_ids(connection, owner):
     """Retrieve a list of `txids` that can we used has inputs.
@@ -232,12 +294,15 @@ def get_assets(connection, asset_ids) -> list[Asset]:
 
 
 @singledispatch
-def get_txids_filtered(connection, asset_id, operation=None):
+def get_txids_filtered(connection, asset_id, operation=None, last_tx=False, after=None, limit=None):
     """Return all transactions for a particular asset id and optional operation.
 
     Args:
         asset_id (str): ID of transaction that defined the asset
         operation (str) (optional): Operation to filter on
+        after (str) (optional): only return the transactions listed after
+            the one with this id, i.e. the last one of the previous page
+        limit (int) (optional): the maximum number of ids to return
     """
 
     raise NotImplementedError
@@ -458,3 +523,26 @@ def get_outputs_by_owner(connection, public_key: str, table: str) -> list[Output
 def get_metadata(conn, transaction_ids):
     """Retrieve metadata for a list of transactions by their ids"""
     raise NotImplementedError
+
+
+@singledispatch
+def get_outputs_filtered(
+    connection, public_key: str, spent: bool = None, offset: int = 0, limit: int = None, after: str = None
+):
+    """Retrieve the outputs of an owner.
+
+    Args:
+        public_key (str): base58 encoded public key of the owner.
+        spent (bool): If ``True`` return only the spent outputs. If
+                      ``False`` return only unspent outputs. If ``None``
+                      return all outputs.
+        offset (int): the number of matching outputs to skip, which are
+                      still scanned, prefer `after` for paging.
+        limit (int): the maximum number of outputs to return.
+        after (str): only return the outputs listed after the one with
+                     this id, i.e. the last one of the previous page.
+
+    Returns:
+        list of :obj:`Output`.
+    """
+    raise NotImplementedError
@@ -1,5 +1,9 @@
 local fiber = require('fiber')
 
+-- tuples scanned by a long running function between two yields, so it doesn't
+-- block the other fibers of the TX thread
+local YIELD_EVERY = 1000
+
 box.cfg{listen = 3303}
 
 box.once("bootstrap", function()
@@ -41,24 +45,30 @@ function init()
         if_not_exists = true,
         parts = {{ field = 'id', type = 'string' }}
     })
+    -- the indexes paged through end with the primary key, see each_after
     transactions:create_index('transactions_by_asset_id', { 
         if_not_exists = true,
         unique = false,
         parts = {
-            { field = 'assets[*].id', type = 'string', is_nullable = true }
+            { field = 'assets[*].id', type = 'string', is_nullable = true },
+            { field = 'id', type = 'string' }
         }
     })
     transactions:create_index('transactions_by_asset_cid', {
         if_not_exists = true,
         unique = false,
         parts = {
-            { field = 'assets[*].data', type = 'string', is_nullable = true }
+            { field = 'assets[*].data', type = 'string', is_nullable = true },
+            { field = 'id', type = 'string' }
         }
     })
     transactions:create_index('transactions_by_metadata_cid', {
         if_not_exists = true,
         unique = false,
-        parts = {{ field = 'metadata', type = 'string' }}
+        parts = {
+            { field = 'metadata', type = 'string' },
+            { field = 'id', type = 'string' }
+        }
     })
     transactions:create_index('spending_transaction_by_id_and_output_index', { 
         if_not_exists = true,
@@ -126,7 +136,10 @@ function init()
     outputs:create_index('public_keys', { 
         if_not_exists = true,
         unique = false,
-        parts = {{field = 'public_keys[*]', type  = 'string' }}
+        parts = {
+            { field = 'public_keys[*]', type  = 'string' },
+            { field = 'id', type = 'string' }
+        }
     })
 
 
@@ -198,7 +211,10 @@ function init()
     utxos:create_index('public_keys', { 
         if_not_exists = true,
         unique = false,
-        parts = {{field = 'public_keys[*]', type  = 'string' }}
+        parts = {
+            { field = 'public_keys[*]', type  = 'string' },
+            { field = 'id', type = 'string' }
+        }
     })
 
 
@@ -330,6 +346,174 @@ function indexed_pattern_search(space_name, field_no, pattern)
     return result_set
 end
 
+function store_bulk_transactions(transactions)
+    box.atomic(function()
+        for _, tx in ipairs(transactions) do
+            local space_name, transaction, outputs, spent_outputs, utxos = unpack(tx)
+            box.space[space_name]:insert(transaction)
+            for _, output in ipairs(outputs) do
+                box.space.outputs:insert(output)
+            end
+            for _, spent_output in ipairs(spent_outputs) do
+                box.space.utxos.index.utxo_by_transaction_id_and_output_index:delete(spent_output)
+            end
+            for _, utxo in ipairs(utxos) do
+                box.space.utxos:insert(utxo)
+            end
+        end
+    end)
+end
+
+function get_complete_transactions_by_ids(txids)
+    local result = {}
+    for _, txid in ipairs(txids) do
+        local tx = box.space.transactions:get(txid)
+        if tx == nil then
+            tx = box.space.governance:get(txid)
+        end
+        if tx ~= nil then
+            local outputs = box.space.outputs.index.transaction_id:select(txid)
+            table.sort(outputs, function(a, b) return a[5] < b[5] end)
+            table.insert(result, {tx, outputs})
+        end
+    end
+    return result
+end
+
+function get_spending_transaction_ids(links)
+    local result = {}
+    for _, link in ipairs(links) do
+        local spending = box.space.transactions.index.spending_transaction_by_id_and_output_index:select{link[1], link[2]}
+        for _, tx in ipairs(spending) do
+            table.insert(result, {link[1], link[2], tx[1]})
+        end
+    end
+    return result
+end
+
+-- Call `fn` with the tuples of `index` matching `key` listed after the one with
+-- the primary key `after`, if any, in primary key order, until it returns
+-- false.
+--
+-- Tarantool 2.10 has no `after` option for selects. The indexes paged through
+-- end with the primary key though, so a page starts right after the position
+-- {key, after} of the last tuple of the previous page, found in O(log n).
+-- Past the tuples of `key` a GT iterator goes on with the next keys, which is
+-- noticed as the ids start again from lower ones or the tuple isn't indexed
+-- under `key`, e.g. an output of several public keys. The scan yields every
+-- YIELD_EVERY tuples and resumes from the last position.
+local function each_after(index, key, after, fn)
+    if type(key) ~= 'table' then
+        key = {key}
+    end
+    local parts = index.parts
+    if #parts ~= #key + 1 or parts[#parts].fieldno ~= 1 then
+        -- not a paged index, e.g. one starting with the primary key
+        for _, tuple in index:pairs(key, { iterator = 'EQ' }) do
+            if (after == nil or tuple[1] > after) and fn(tuple) == false then
+                return
+            end
+        end
+        return
+    end
+
+    local last = after
+    while true do
+        local position, iterator = {unpack(key)}, 'EQ'
+        if last ~= nil then
+            table.insert(position, last)
+            iterator = 'GT'
+        end
+        local scanned = 0
+        for _, tuple in index:pairs(position, { iterator = iterator }) do
+            local id = tuple[1]
+            if last ~= nil and id < last then
+                return
+            end
+            -- an equal id is listed again under the next key, skip it
+            if last == nil or id > last then
+                if iterator == 'GT' then
+                    local entry = {unpack(key)}
+                    table.insert(entry, id)
+                    if index:count(entry, { iterator = 'EQ' }) == 0 then
+                        return
+                    end
+                end
+                last = id
+                if fn(tuple) == false then
+                    return
+                end
+            end
+            scanned = scanned + 1
+            if scanned >= YIELD_EVERY then
+                break
+            end
+        end
+        if scanned < YIELD_EVERY then
+            return
+        end
+        fiber.yield()
+    end
+end
+
+function get_outputs_filtered(public_key, spent, offset, limit, after)
+    local space = box.space.outputs
+    if spent == false then
+        space = box.space.utxos
+    end
+    local utxos = box.space.utxos.index.utxo_by_transaction_id_and_output_index
+    local outputs, skipped = {}, 0
+    each_after(space.index.public_keys, public_key, after, function(output)
+        if limit ~= nil and #outputs >= limit then
+            return false
+        end
+        if spent ~= true or utxos:get{output[6], output[5]} == nil then
+            -- the skipped outputs are scanned too, a cursor is cheaper
+            if skipped < offset then
+                skipped = skipped + 1
+            else
+                table.insert(outputs, output)
+            end
+        end
+    end)
+    return outputs
+end
+
+function batch_select(requests)
+    local results = {}
+    for i, request in ipairs(requests) do
+        local space_name, index, key, options = unpack(request)
+        results[i] = box.space[space_name].index[index]:select(key, options)
+    end
+    return results
+end
+
+function get_transaction_ids(space_name, after, limit)
+    local key, iterator = {}, 'ALL'
+    if after ~= nil then
+        key, iterator = after, 'GT'
+    end
+    local ids = {}
+    for _, tuple in box.space[space_name].index.id:pairs(key, { iterator = iterator }) do
+        if #ids >= limit then
+            break
+        end
+        table.insert(ids, tuple[1])
+    end
+    return ids
+end
+
+function select_ids_after(space_name, index, key, after, limit)
+    local ids = {}
+    each_after(box.space[space_name].index[index], key, after, function(tuple)
+        if limit ~= nil and #ids >= limit then
+            return false
+        end
+        table.insert(ids, tuple[1])
+    end)
+    return ids
+end
+
 function delete_output( id )
     box.space.outputs:delete(id)
 end
@@ -381,7 +565,10 @@ function migrate()
         utxos:create_index('public_keys', { 
             if_not_exists = true,
             unique = false,
-            parts = {{field = 'public_keys[*]', type  = 'string' }}
+            parts = {
+                { field = 'public_keys[*]', type  = 'string' },
+                { field = 'id', type = 'string' }
+            }
         })
 
         atomic(1000, box.space.outputs:pairs(), function(output)
@@ -394,4 +581,24 @@ function migrate()
             end
         end)
     end)
+
+    -- the indexes paged through end with the primary key, see each_after
+    box.once("planetmint:paged_indexes", function()
+        local id = { field = 'id', type = 'string' }
+        box.space.transactions.index.transactions_by_asset_id:alter({ parts = {
+            { field = 'assets[*].id', type = 'string', is_nullable = true }, id
+        }})
+        box.space.transactions.index.transactions_by_asset_cid:alter({ parts = {
+            { field = 'assets[*].data', type = 'string', is_nullable = true }, id
+        }})
+        box.space.transactions.index.transactions_by_metadata_cid:alter({ parts = {
+            { field = 'metadata', type = 'string' }, id
+        }})
+        box.space.outputs.index.public_keys:alter({ parts = {
+            { field = 'public_keys[*]', type = 'string' }, id
+        }})
+        box.space.utxos.index.public_keys:alter({ parts = {
+            { field = 'public_keys[*]', type = 'string' }, id
+        }})
+    end)
 end
\ No newline at end of file
@@ -9,12 +9,57 @@ import tarantool
 
 from planetmint.config import Config
 from transactions.common.exceptions import ConfigurationError
+from planetmint.utils import metrics
 from planetmint.utils.lazy import Lazy
+from planetmint.backend import tracing
 from planetmint.backend.connection import DBConnection
 from planetmint.backend.exceptions import ConnectionError
+from planetmint.backend.tarantool.sync_io.pool import ConnectionPool
 
 logger = logging.getLogger(__name__)
 
+# the statistics of the connection pool published as metrics
+POOL_METRICS = (
+    (metrics.gauge, "planetmint_db_pool_size", "Maximum number of database connections", "size"),
+    (metrics.gauge, "planetmint_db_pool_in_use", "Database connections checked out by a thread", "in_use"),
+    (metrics.gauge, "planetmint_db_pool_idle", "Database connections waiting in the pool", "idle"),
+    (metrics.counter, "planetmint_db_pool_checkouts_total", "Connections checked out of the pool", "checkouts"),
+    (metrics.counter, "planetmint_db_pool_waits_total", "Checkouts which waited for a free connection", "waits"),
+    (metrics.counter, "planetmint_db_pool_broken_total", "Idle database connections found broken", "reconnects"),
+)
+
+
+class Pipeline:
+    """Collect independent selects and run them in a single round trip.
+
+    Example:
+        pipeline = connection.pipeline()
+        pipeline.select("transactions", txid)
+        pipeline.select("transactions", txid, index="transactions_by_asset_id")
+        by_id, by_asset_id = pipeline.execute()
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.requests = []
+
+    def select(self, space_name: str, key=None, index=0, limit: int = None, iterator: str = None):
+        options = {}
+        if limit is not None:
+            options["limit"] = limit
+        if iterator is not None:
+            options["iterator"] = iterator
+        self.requests.append((space_name, index, [] if key is None else key, options))
+        return self
+
+    def execute(self) -> list[list]:
+        """Return the tuples selected by every request, in request order."""
+        requests, self.requests = self.requests, []
+        if not requests:
+            return []
+        results = self.connection.connect().call("batch_select", (requests,)).data
+        return results[0] if results else [[] for _ in requests]
+
 
 class TarantoolDBConnection(DBConnection):
     def __init__(
@@ -31,7 +76,14 @@ class TarantoolDBConnection(DBConnection):
             dbconf = Config().get()["database"]
             self.init_path = dbconf["init_config"]["absolute_path"]
             self.drop_path = dbconf["drop_config"]["absolute_path"]
-            self.__conn = None
+            self.pool = ConnectionPool(
+                self._new_connection,
+                size=dbconf["pool_size"],
+                timeout=dbconf["pool_timeout"],
+                health_check_interval=dbconf["pool_health_check_interval"],
+            )
+            for metric, name, documentation, key in POOL_METRICS:
+                metric(name, documentation).set_function(lambda key=key: self.pool.stats()[key])
             self.connect()
             self.SPACE_NAMES = [
                 "abci_chains",
@@ -58,20 +110,36 @@ class TarantoolDBConnection(DBConnection):
             f.close()
         return "".join(execute).encode(encoding="utf-8")
 
+    def _new_connection(self):
+        return tarantool.Connection(
+            host=self.host, port=self.port, encoding="utf-8", connect_now=True, reconnect_delay=0.1
+        )
+
     def connect(self):
-        if not self.__conn:
-            self.__conn = tarantool.Connection(
-                host=self.host, port=self.port, encoding="utf-8", connect_now=True, reconnect_delay=0.1
-            )
-        elif self.__conn.connected == False:
-            self.__conn.connect()
-        return self.__conn
+        """Return the connection of the current thread, checked out of the
+        connection pool on first use."""
+        # every query sends a single request per connection it asks for
+        tracing.round_trip()
+        conn = self.pool.acquire()
+        if conn.connected == False:
+            conn.connect()
+        return conn
+
+    def release(self):
+        """Return the connection of the current thread to the pool."""
+        self.pool.release()
+
+    def pipeline(self) -> Pipeline:
+        return Pipeline(self)
+
+    def pool_stats(self) -> dict:
+        """Return the usage statistics of the connection pool, also
+        published as the ``planetmint_db_pool_*`` metrics."""
+        return self.pool.stats()
 
     def close(self):
         try:
-            if self.__conn:
-                self.__conn.close()
-                self.__conn = None
+            self.pool.close()
         except Exception as exc:
             logger.info("Exception in planetmint.backend.tarantool.close(): {}".format(exc))
             raise ConnectionError(str(exc)) from exc
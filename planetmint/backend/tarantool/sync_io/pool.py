@@ -0,0 +1,194 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import logging
+import os
+import queue
+import threading
+import time
+
+from planetmint.backend.exceptions import ConnectionError
+
+logger = logging.getLogger(__name__)
+
+
+class _Checkout:
+    """Holds the connection checked out by a thread and returns it to the
+    pool when the thread goes away without releasing it."""
+
+    def __init__(self, pool, connection, generation):
+        self.pool = pool
+        self.connection = connection
+        self.generation = generation
+
+    def __del__(self):
+        if self.connection is not None:
+            self.pool._put(self.connection, self.generation)
+
+
+class ConnectionPool:
+    """A bounded pool of database connections.
+
+    Every thread (or greenlet, when ``threading`` is monkey patched by gevent)
+    gets an exclusive connection on its first :meth:`acquire` and keeps it
+    until it calls :meth:`release`. Idle connections are pinged before being
+    handed out again and replaced if they went away.
+
+    Args:
+        factory: a function creating a new connection.
+        size (int): the maximum number of connections.
+        timeout (float): the seconds to wait for a free connection before
+            raising :exc:`~ConnectionError`, ``None`` waits forever.
+        health_check_interval (float): the seconds a connection may stay idle
+            before it is pinged on checkout.
+    """
+
+    def __init__(self, factory, size=10, timeout=None, health_check_interval=30):
+        if size < 1:
+            raise ValueError("the size of the pool must be a positive integer")
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        # reentrant: dropping thread locals on reset may return connections
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        # connections checked out before a reset are not taken back
+        self._generation = getattr(self, "_generation", 0) + 1
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._reconnects = 0
+
+    def _check_pid(self):
+        # connections inherited from a parent process share its sockets
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+    def acquire(self):
+        """Return the connection of the current thread, checking one out of
+        the pool if the thread has none."""
+        self._check_pid()
+        checkout = getattr(self._local, "checkout", None)
+        if checkout is not None:
+            return checkout.connection
+
+        generation = self._generation
+        connection = self._checkout()
+        self._local.checkout = _Checkout(self, connection, generation)
+        return connection
+
+    def release(self):
+        """Return the connection of the current thread to the pool."""
+        checkout = getattr(self._local, "checkout", None)
+        if checkout is None or checkout.connection is None:
+            return
+        connection, checkout.connection = checkout.connection, None
+        self._local.checkout = None
+        self._put(connection, checkout.generation)
+
+    def _put(self, connection, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._in_use -= 1
+        self._idle.put((connection, time.monotonic()))
+
+    def _checkout(self):
+        connection = None
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                connection = False
+
+        if connection is False:
+            return self._create()
+
+        try:
+            connection, idle_since = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self._waits += 1
+            try:
+                connection, idle_since = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._in_use -= 1
+                raise ConnectionError("no database connection available after {}s".format(self.timeout))
+
+        if time.monotonic() - idle_since > self.health_check_interval and not self._is_healthy(connection):
+            with self._lock:
+                self._reconnects += 1
+            self._discard(connection)
+            connection = self._create()
+        return connection
+
+    def _create(self):
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._created -= 1
+            raise
+
+    def _is_healthy(self, connection):
+        try:
+            connection.ping(notime=True)
+            return True
+        except Exception as exc:
+            logger.info("Dropping broken database connection: %s", exc)
+            return False
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Close the idle connections and the one of the current thread.
+
+        Connections checked out by other threads are left to them and not
+        taken back by the pool anymore.
+        """
+        self._check_pid()
+        checkout = getattr(self._local, "checkout", None)
+        if checkout is not None and checkout.connection is not None:
+            connection, checkout.connection = checkout.connection, None
+            self._discard(connection)
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(connection)
+        with self._lock:
+            self._reset()
+
+    def stats(self):
+        """Return usage statistics, e.g. to size the pool."""
+        # a forked process reports its own pool, not the one of its parent
+        self._check_pid()
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "reconnects": self._reconnects,
+            }
@@ -5,7 +5,6 @@
 
 """Query implementation for Tarantool"""
 import logging
-from uuid import uuid4
 from operator import itemgetter
 from typing import Union
 
@@ -18,7 +17,6 @@ from planetmint.backend.exceptions import DBConcurrencyError
 from planetmint.backend.tarantool.const import (
     TARANT_TABLE_TRANSACTION,
     TARANT_TABLE_OUTPUT,
-    TARANT_TABLE_SCRIPT,
     TARANT_TX_ID_SEARCH,
     TARANT_ID_SEARCH,
     TARANT_INDEX_TX_BY_ASSET_ID,
@@ -32,9 +30,10 @@ from planetmint.backend.tarantool.const import (
     TARANT_TABLE_ELECTIONS,
 )
 from planetmint.backend.utils import module_dispatch_registrar
-from planetmint.backend.models import Asset, Block, Output
+from planetmint.backend.models import Asset, Output
+from planetmint.backend.tarantool import tuples
 from planetmint.backend.tarantool.sync_io.connection import TarantoolDBConnection
-from transactions.common.transaction import Transaction
+from planetmint.utils import metrics
 
 logger = logging.getLogger(__name__)
 register_query = module_dispatch_registrar(query)
@@ -44,10 +43,15 @@ from functools import wraps
 
 
 def catch_db_exception(function_to_decorate):
+    latency = metrics.histogram(
+        "planetmint_db_query_seconds", "Time spent in a database query", {"query": function_to_decorate.__name__}
+    )
+
     @wraps(function_to_decorate)
     def wrapper(*args, **kw):
         try:
-            output = function_to_decorate(*args, **kw)
+            with latency.time():
+                output = function_to_decorate(*args, **kw)
         except OperationalError as op_error:
             raise op_error
         except SchemaError as schema_error:
@@ -72,18 +76,13 @@ def catch_db_exception(function_to_decorate):
 
 
 @register_query(TarantoolDBConnection)
+@catch_db_exception
 def get_complete_transactions_by_ids(connection, txids: list) -> list[DbTransaction]:
-    _transactions = []
-    for txid in txids:
-        tx = get_transaction_by_id(connection, txid, TARANT_TABLE_TRANSACTION)
-        if tx is None:
-            tx = get_transaction_by_id(connection, txid, TARANT_TABLE_GOVERNANCE)
-        if tx is None:
-            continue
-        outputs = get_outputs_by_tx_id(connection, txid)
-        tx.outputs = outputs
-        _transactions.append(tx)
-    return _transactions
+    txids = list(txids)
+    if not txids:
+        return []
+    _complete = connection.connect().call("get_complete_transactions_by_ids", (txids,)).data
+    return tuples.complete_transactions(_complete[0] if _complete else [])
 
 
 @register_query(TarantoolDBConnection)
@@ -96,53 +95,48 @@ def get_outputs_by_tx_id(connection, tx_id: str) -> list[Output]:
 
 @register_query(TarantoolDBConnection)
 def get_transaction(connection, tx_id: str) -> Union[DbTransaction, None]:
-    transactions = get_complete_transactions_by_ids(connection, (tx_id))
+    transactions = get_complete_transactions_by_ids(connection, [tx_id])
     if len(transactions) > 1 or len(transactions) == 0:
         return None
     else:
         return transactions[0]
 
 
+def _select_ids_after(connection, space_name: str, index: str, key, after: str = None, limit: int = None) -> list:
+    _ids = connection.connect().call("select_ids_after", (space_name, index, key, after, limit)).data
+    return _ids[0] if _ids else []
+
+
 @register_query(TarantoolDBConnection)
 @catch_db_exception
-def get_transactions_by_asset(connection, asset: str, limit: int = 1000) -> list[DbTransaction]:
-    txs = (
-        connection.connect()
-        .select(TARANT_TABLE_TRANSACTION, asset, limit=limit, index="transactions_by_asset_cid")
-        .data
-    )
-    tx_ids = [tx[0] for tx in txs]
-    return get_complete_transactions_by_ids(connection, tx_ids)
+def get_txids_by_asset(connection, asset: str, limit: int = 1000, after: str = None) -> list[str]:
+    return _select_ids_after(connection, TARANT_TABLE_TRANSACTION, "transactions_by_asset_cid", asset, after, limit)
 
 
 @register_query(TarantoolDBConnection)
 @catch_db_exception
-def get_transactions_by_metadata(connection, metadata: str, limit: int = 1000) -> list[DbTransaction]:
-    txs = (
-        connection.connect()
-        .select(TARANT_TABLE_TRANSACTION, metadata, limit=limit, index="transactions_by_metadata_cid")
-        .data
+def get_txids_by_metadata(connection, metadata: str, limit: int = 1000, after: str = None) -> list[str]:
+    return _select_ids_after(
+        connection, TARANT_TABLE_TRANSACTION, "transactions_by_metadata_cid", metadata, after, limit
     )
-    tx_ids = [tx[0] for tx in txs]
-    return get_complete_transactions_by_ids(connection, tx_ids)
+
+
+@register_query(TarantoolDBConnection)
+def get_transactions_by_asset(connection, asset: str, limit: int = 1000) -> list[DbTransaction]:
+    return get_complete_transactions_by_ids(connection, get_txids_by_asset(connection, asset, limit))
+
+
+@register_query(TarantoolDBConnection)
+def get_transactions_by_metadata(connection, metadata: str, limit: int = 1000) -> list[DbTransaction]:
+    return get_complete_transactions_by_ids(connection, get_txids_by_metadata(connection, metadata, limit))
 
 
 @register_query(TarantoolDBConnection)
 @catch_db_exception
 def store_transaction_outputs(connection, output: Output, index: int, table=TARANT_TABLE_OUTPUT) -> str:
-    output_id = uuid4().hex
-    connection.connect().insert(
-        table,
-        (
-            output_id,
-            int(output.amount),
-            output.public_keys,
-            output.condition.to_dict(),
-            index,
-            output.transaction_id,
-        ),
-    ).data
-    return output_id
+    output_tuple = tuples.output_tuple(output, index)
+    connection.connect().insert(table, output_tuple).data
+    return output_tuple[0]
 
 
 @register_query(TarantoolDBConnection)
@@ -155,27 +149,18 @@ def store_transactions(connection, signed_transactions: list, table=TARANT_TABLE
         ]
 
 
+@register_query(TarantoolDBConnection)
+@catch_db_exception
+def store_bulk_transactions(connection, transactions: list, governance_transactions: list):
+    bulk = tuples.bulk_transaction_tuples(transactions, governance_transactions)
+    if bulk:
+        connection.connect().call("store_bulk_transactions", (bulk,))
+
+
 @register_query(TarantoolDBConnection)
 @catch_db_exception
 def store_transaction(connection, transaction, table=TARANT_TABLE_TRANSACTION):
-    scripts = None
-    if TARANT_TABLE_SCRIPT in transaction:
-        scripts = transaction[TARANT_TABLE_SCRIPT]
-    asset_obj = Transaction.get_assets_tag(transaction["version"])
-    if transaction["version"] == "2.0":
-        asset_array = [transaction[asset_obj]]
-    else:
-        asset_array = transaction[asset_obj]
-    tx = (
-        transaction["id"],
-        transaction["operation"],
-        transaction["version"],
-        transaction["metadata"],
-        asset_array,
-        transaction["inputs"],
-        scripts,
-    )
-    connection.connect().insert(table, tx)
+    connection.connect().insert(table, tuples.transaction_tuple(transaction))
 
 
 @register_query(TarantoolDBConnection)
@@ -238,47 +223,72 @@ def get_spending_transaction(
 
 @register_query(TarantoolDBConnection)
 @catch_db_exception
-def get_latest_block(connection) -> Union[dict, None]:
-    blocks = connection.connect().select(TARANT_TABLE_BLOCKS).data
-    if not blocks:
-        return None
+def get_transaction_ids(connection, table: str, after: str = None, limit: int = 10000) -> list[str]:
+    _ids = connection.connect().call("get_transaction_ids", (table, after, limit)).data
+    return _ids[0] if _ids else []
+
+
+@register_query(TarantoolDBConnection)
+@catch_db_exception
+def get_spending_transaction_ids(connection, links: list) -> list[tuple]:
+    if not links:
+        return []
+    _spending = connection.connect().call("get_spending_transaction_ids", ([list(link) for link in links],)).data
+    return [tuple(spending) for spending in _spending[0]] if _spending else []
 
-    blocks = sorted(blocks, key=itemgetter(2), reverse=True)
-    latest_block = Block.from_tuple(blocks[0])
-    return latest_block.to_dict()
+
+@register_query(TarantoolDBConnection)
+@catch_db_exception
+def get_latest_block(connection) -> Union[dict, None]:
+    blocks = connection.connect().select(TARANT_TABLE_BLOCKS, [], index="height", iterator="REQ", limit=1).data
+    return tuples.block_dict(blocks)
 
 
 @register_query(TarantoolDBConnection)
 @catch_db_exception
 def store_block(connection, block: dict):
-    block_unique_id = uuid4().hex
-    connection.connect().insert(
-        TARANT_TABLE_BLOCKS, (block_unique_id, block["app_hash"], block["height"], block[TARANT_TABLE_TRANSACTION])
-    )
+    connection.connect().insert(TARANT_TABLE_BLOCKS, tuples.block_tuple(block))
 
 
 @register_query(TarantoolDBConnection)
 @catch_db_exception
-def get_txids_filtered(connection, asset_ids: list[str], operation: str = "", last_tx: bool = False) -> list[str]:
-    transactions = []
+def get_txids_filtered(
+    connection,
+    asset_ids: list[str],
+    operation: str = "",
+    last_tx: bool = False,
+    after: str = None,
+    limit: int = None,
+) -> list[str]:
     if operation == "CREATE":
-        transactions = (
-            connection.connect()
-            .select(TARANT_TABLE_TRANSACTION, [asset_ids[0], operation], index="transactions_by_id_and_operation")
-            .data
+        ids = _select_ids_after(
+            connection,
+            TARANT_TABLE_TRANSACTION,
+            "transactions_by_id_and_operation",
+            [asset_ids[0], operation],
+            after,
+            limit,
         )
     elif operation == "TRANSFER":
-        transactions = (
-            connection.connect().select(TARANT_TABLE_TRANSACTION, asset_ids, index=TARANT_INDEX_TX_BY_ASSET_ID).data
+        ids = _select_ids_after(
+            connection, TARANT_TABLE_TRANSACTION, TARANT_INDEX_TX_BY_ASSET_ID, asset_ids, after, limit
         )
+    elif after is None:
+        pipeline = connection.pipeline()
+        pipeline.select(TARANT_TABLE_TRANSACTION, asset_ids, index=TARANT_ID_SEARCH)
+        pipeline.select(TARANT_TABLE_TRANSACTION, asset_ids, index=TARANT_INDEX_TX_BY_ASSET_ID, limit=limit)
+        txs, asset_txs = pipeline.execute()
+        ids = [tx[0] for tx in txs + asset_txs][:limit]
     else:
-        txs = connection.connect().select(TARANT_TABLE_TRANSACTION, asset_ids, index=TARANT_ID_SEARCH).data
-        asset_txs = (
-            connection.connect().select(TARANT_TABLE_TRANSACTION, asset_ids, index=TARANT_INDEX_TX_BY_ASSET_ID).data
+        # the transactions creating the assets are listed first, once the
+        # page is past them it continues with the ones transferring them
+        if after in asset_ids:
+            after = None
+        ids = _select_ids_after(
+            connection, TARANT_TABLE_TRANSACTION, TARANT_INDEX_TX_BY_ASSET_ID, asset_ids, after, limit
         )
-        transactions = txs + asset_txs
 
-    ids = tuple([tx[0] for tx in transactions])
+    ids = tuple(ids)
 
     # NOTE: check when and where this is used and remove if not
     if last_tx:
@@ -317,20 +327,14 @@ def get_spending_transactions(connection, inputs):
 @catch_db_exception
 def get_block(connection, block_id=None) -> Union[dict, None]:
     _block = connection.connect().select(TARANT_TABLE_BLOCKS, block_id, index="height", limit=1).data
-    if len(_block) == 0:
-        return
-    _block = Block.from_tuple(_block[0])
-    return _block.to_dict()
+    return tuples.block_dict(_block)
 
 
 @register_query(TarantoolDBConnection)
 @catch_db_exception
 def get_block_with_transaction(connection, txid: str) -> Union[dict, None]:
     _block = connection.connect().select(TARANT_TABLE_BLOCKS, txid, index="block_by_transaction_id").data
-    if len(_block) == 0:
-        return
-    _block = Block.from_tuple(_block[0])
-    return _block.to_dict()
+    return tuples.block_dict(_block)
 
 
 @register_query(TarantoolDBConnection)
@@ -371,33 +375,25 @@ def delete_unspent_outputs(connection, unspent_outputs: list):
 @catch_db_exception
 def get_unspent_outputs(connection, query=None):  # for now we don't have implementation for 'query'.
     utxos = connection.connect().select(TARANT_TABLE_UTXOS, []).data
-    return [{"transaction_id": utxo[5], "output_index": utxo[4]} for utxo in utxos]
+    return [tuples.unspent_output_dict(utxo) for utxo in utxos]
 
 
 @register_query(TarantoolDBConnection)
 @catch_db_exception
 def store_pre_commit_state(connection, state: dict):
     _precommit = connection.connect().select(TARANT_TABLE_PRE_COMMITS, [], limit=1).data
-    _precommitTuple = (
-        (uuid4().hex, state["height"], state[TARANT_TABLE_TRANSACTION])
-        if _precommit is None or len(_precommit) == 0
-        else _precommit[0]
-    )
     connection.connect().upsert(
         TARANT_TABLE_PRE_COMMITS,
-        _precommitTuple,
-        op_list=[("=", 1, state["height"]), ("=", 2, state[TARANT_TABLE_TRANSACTION])],
+        tuples.pre_commit_tuple(state, _precommit),
+        op_list=tuples.pre_commit_operations(state),
     )
 
 
 @register_query(TarantoolDBConnection)
 @catch_db_exception
 def get_pre_commit_state(connection) -> dict:
-    _commit = connection.connect().select(TARANT_TABLE_PRE_COMMITS, [], index=TARANT_ID_SEARCH).data
-    if _commit is None or len(_commit) == 0:
-        return None
-    _commit = sorted(_commit, key=itemgetter(1), reverse=False)[0]
-    return {"height": _commit[1], TARANT_TABLE_TRANSACTION: _commit[2]}
+    _commit = connection.connect().select(TARANT_TABLE_PRE_COMMITS, [], index="height", limit=1).data
+    return tuples.pre_commit_dict(_commit)
 
 
 @register_query(TarantoolDBConnection)
@@ -406,11 +402,10 @@ def store_validator_set(conn, validators_update: dict):
     _validator = (
         conn.connect().select(TARANT_TABLE_VALIDATOR_SETS, validators_update["height"], index="height", limit=1).data
     )
-    unique_id = uuid4().hex if _validator is None or len(_validator) == 0 else _validator[0][0]
     result = conn.connect().upsert(
         TARANT_TABLE_VALIDATOR_SETS,
-        (unique_id, validators_update["height"], validators_update["validators"]),
-        op_list=[("=", 1, validators_update["height"]), ("=", 2, validators_update["validators"])],
+        tuples.validator_set_tuple(validators_update, _validator),
+        op_list=tuples.validator_set_operations(validators_update),
     )
     return result
 
@@ -435,9 +430,7 @@ def store_election(connection, election_id: str, height: int, is_concluded: bool
 @catch_db_exception
 def store_elections(connection, elections: list):
     for election in elections:
-        _election = connection.connect().insert(
-            TARANT_TABLE_ELECTIONS, (election["election_id"], election["height"], election["is_concluded"])
-        )
+        connection.connect().insert(TARANT_TABLE_ELECTIONS, tuples.election_tuple(election))
 
 
 @register_query(TarantoolDBConnection)
@@ -451,35 +444,30 @@ def delete_elections(connection, height: int):
 @register_query(TarantoolDBConnection)
 @catch_db_exception
 def get_validator_set(connection, height: int = None):
-    _validators = connection.connect().select(TARANT_TABLE_VALIDATOR_SETS).data
-    if height is not None and _validators is not None:
-        _validators = [
-            {"height": validator[1], "validators": validator[2]} for validator in _validators if validator[1] <= height
-        ]
-        return next(iter(sorted(_validators, key=lambda k: k["height"], reverse=True)), None)
-    elif _validators is not None:
-        _validators = [{"height": validator[1], "validators": validator[2]} for validator in _validators]
-        return next(iter(sorted(_validators, key=lambda k: k["height"], reverse=True)), None)
-    return None
+    if height is None:
+        key, iterator = [], "REQ"
+    else:
+        key, iterator = height, "LE"
+    _validators = (
+        connection.connect().select(TARANT_TABLE_VALIDATOR_SETS, key, index="height", iterator=iterator, limit=1).data
+    )
+    return tuples.validator_set_dict(_validators)
 
 
 @register_query(TarantoolDBConnection)
 @catch_db_exception
 def get_election(connection, election_id: str) -> dict:
-    _elections = connection.connect().select(TARANT_TABLE_ELECTIONS, election_id, index=TARANT_ID_SEARCH).data
-    if _elections is None or len(_elections) == 0:
-        return None
-    _election = sorted(_elections, key=itemgetter(0), reverse=True)[0]
-    return {"election_id": _election[0], "height": _election[1], "is_concluded": _election[2]}
+    _elections = connection.connect().select(TARANT_TABLE_ELECTIONS, election_id, index=TARANT_ID_SEARCH, limit=1).data
+    return tuples.election_dict(_elections)
 
 
 @register_query(TarantoolDBConnection)
 @catch_db_exception
 def get_asset_tokens_for_public_key(connection, asset_id: str, public_key: str) -> list[DbTransaction]:
-    id_transactions = connection.connect().select(TARANT_TABLE_GOVERNANCE, [asset_id]).data
-    asset_id_transactions = (
-        connection.connect().select(TARANT_TABLE_GOVERNANCE, [asset_id], index="governance_by_asset_id").data
-    )
+    pipeline = connection.pipeline()
+    pipeline.select(TARANT_TABLE_GOVERNANCE, [asset_id])
+    pipeline.select(TARANT_TABLE_GOVERNANCE, [asset_id], index="governance_by_asset_id")
+    id_transactions, asset_id_transactions = pipeline.execute()
 
     transactions = id_transactions + asset_id_transactions
     return get_complete_transactions_by_ids(connection, [_tx[0] for _tx in transactions])
@@ -505,11 +493,12 @@ def delete_abci_chain(connection, height: int):
 @register_query(TarantoolDBConnection)
 @catch_db_exception
 def get_latest_abci_chain(connection) -> Union[dict, None]:
-    _all_chains = connection.connect().select(TARANT_TABLE_ABCI_CHAINS).data
-    if _all_chains is None or len(_all_chains) == 0:
+    _latest = connection.connect().select(TARANT_TABLE_ABCI_CHAINS, [], index="height", iterator="REQ", limit=1).data
+    if _latest is None or len(_latest) == 0:
         return None
-    _chain = sorted(_all_chains, key=itemgetter(1), reverse=True)[0]
-    return {"chain_id": _chain[0], "height": _chain[1], "is_synced": _chain[2]}
+    # chains stored at the same height are ordered by id, the lowest wins
+    _chain = connection.connect().select(TARANT_TABLE_ABCI_CHAINS, _latest[0][1], index="height", limit=1).data[0]
+    return tuples.abci_chain_dict(_chain)
 
 
 @register_query(TarantoolDBConnection)
@@ -517,3 +506,12 @@ def get_latest_abci_chain(connection) -> Union[dict, None]:
 def get_outputs_by_owner(connection, public_key: str, table=TARANT_TABLE_OUTPUT) -> list[Output]:
     outputs = connection.connect().select(table, public_key, index="public_keys")
     return [Output.from_tuple(output) for output in outputs]
+
+
+@register_query(TarantoolDBConnection)
+@catch_db_exception
+def get_outputs_filtered(
+    connection, public_key: str, spent: bool = None, offset: int = 0, limit: int = None, after: str = None
+) -> list[Output]:
+    _outputs = connection.connect().call("get_outputs_filtered", (public_key, spent, offset, limit, after)).data
+    return [Output.from_tuple(output) for output in _outputs[0]] if _outputs else []
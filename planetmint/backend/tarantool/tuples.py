@@ -0,0 +1,150 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Conversion between the stored objects and the Tarantool tuples used by the
+queries."""
+from uuid import uuid4
+from typing import Union
+
+from planetmint.backend.models import Block, Output
+from planetmint.backend.models.dbtransaction import DbTransaction
+from planetmint.backend.tarantool.const import (
+    TARANT_TABLE_GOVERNANCE,
+    TARANT_TABLE_OUTPUT,
+    TARANT_TABLE_SCRIPT,
+    TARANT_TABLE_TRANSACTION,
+)
+from transactions.common.transaction import Transaction
+
+
+def output_tuple(output: Output, index: int) -> tuple:
+    return (
+        uuid4().hex,
+        int(output.amount),
+        output.public_keys,
+        output.condition.to_dict(),
+        index,
+        output.transaction_id,
+    )
+
+
+def transaction_tuple(transaction: dict) -> tuple:
+    scripts = None
+    if TARANT_TABLE_SCRIPT in transaction:
+        scripts = transaction[TARANT_TABLE_SCRIPT]
+    asset_obj = Transaction.get_assets_tag(transaction["version"])
+    if transaction["version"] == "2.0":
+        asset_array = [transaction[asset_obj]]
+    else:
+        asset_array = transaction[asset_obj]
+    return (
+        transaction["id"],
+        transaction["operation"],
+        transaction["version"],
+        transaction["metadata"],
+        asset_array,
+        transaction["inputs"],
+        scripts,
+    )
+
+
+def bulk_transaction_tuples(transactions: list, governance_transactions: list) -> list[tuple]:
+    """Return the arguments of the ``store_bulk_transactions`` Lua function:
+    the table, the transaction, its outputs, the outputs it spends and the
+    outputs it adds to the utxo set, for every transaction."""
+    bulk = []
+    for table, signed_transactions in (
+        (TARANT_TABLE_TRANSACTION, transactions),
+        (TARANT_TABLE_GOVERNANCE, governance_transactions),
+    ):
+        for transaction in signed_transactions:
+            outputs = [Output.outputs_dict(output, transaction["id"]) for output in transaction[TARANT_TABLE_OUTPUT]]
+            spent_outputs = [
+                [_input["fulfills"]["transaction_id"], _input["fulfills"]["output_index"]]
+                for _input in transaction["inputs"]
+                if _input["fulfills"]
+            ]
+            bulk.append(
+                (
+                    table,
+                    transaction_tuple(transaction),
+                    [output_tuple(output, index) for index, output in enumerate(outputs)],
+                    spent_outputs,
+                    [output_tuple(output, index) for index, output in enumerate(outputs)],
+                )
+            )
+    return bulk
+
+
+def complete_transactions(rows: list) -> list[DbTransaction]:
+    """Return the transactions returned by the
+    ``get_complete_transactions_by_ids`` Lua function."""
+    transactions = []
+    for _tx, _outputs in rows or []:
+        tx = DbTransaction.from_tuple(_tx)
+        tx.outputs = [Output.from_tuple(output) for output in _outputs]
+        transactions.append(tx)
+    return transactions
+
+
+def block_tuple(block: dict) -> tuple:
+    return (uuid4().hex, block["app_hash"], block["height"], block[TARANT_TABLE_TRANSACTION])
+
+
+def block_dict(rows: list) -> Union[dict, None]:
+    return Block.from_tuple(rows[0]).to_dict() if rows else None
+
+
+def unspent_output_dict(utxo: tuple) -> dict:
+    return {"transaction_id": utxo[5], "output_index": utxo[4]}
+
+
+def pre_commit_tuple(state: dict, rows: list) -> tuple:
+    """Return the pre commit tuple to upsert, reusing the id of the stored
+    one in `rows`, if any."""
+    if not rows:
+        return (uuid4().hex, state["height"], state[TARANT_TABLE_TRANSACTION])
+    return tuple(rows[0])
+
+
+def pre_commit_operations(state: dict) -> list:
+    return [("=", 1, state["height"]), ("=", 2, state[TARANT_TABLE_TRANSACTION])]
+
+
+def pre_commit_dict(rows: list) -> Union[dict, None]:
+    if not rows:
+        return None
+    return {"height": rows[0][1], TARANT_TABLE_TRANSACTION: rows[0][2]}
+
+
+def validator_set_tuple(validators_update: dict, rows: list) -> tuple:
+    """Return the validator set tuple to upsert, reusing the id of the one
+    stored at the same height in `rows`, if any."""
+    unique_id = rows[0][0] if rows else uuid4().hex
+    return (unique_id, validators_update["height"], validators_update["validators"])
+
+
+def validator_set_operations(validators_update: dict) -> list:
+    return [("=", 1, validators_update["height"]), ("=", 2, validators_update["validators"])]
+
+
+def validator_set_dict(rows: list) -> Union[dict, None]:
+    if not rows:
+        return None
+    return {"height": rows[0][1], "validators": rows[0][2]}
+
+
+def election_tuple(election: dict) -> tuple:
+    return (election["election_id"], election["height"], election["is_concluded"])
+
+
+def election_dict(rows: list) -> Union[dict, None]:
+    if not rows:
+        return None
+    return {"election_id": rows[0][0], "height": rows[0][1], "is_concluded": rows[0][2]}
+
+
+def abci_chain_dict(chain: tuple) -> dict:
+    return {"chain_id": chain[0], "height": chain[1], "is_synced": chain[2]}
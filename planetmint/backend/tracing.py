@@ -0,0 +1,239 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Opt-in tracing of the backend queries.
+
+Every query registered with
+:func:`~planetmint.backend.utils.module_dispatch_registrar` is traced once
+:func:`enable` is called: its calls, cumulative time, returned rows and
+round trips to the database are recorded per scope, i.e. per ABCI phase
+or HTTP route. Round trips are counted by the connections, a query calling
+other queries includes their round trips.
+
+The statistics are kept per process, and shared with the metrics, see
+:func:`planetmint.utils.metrics.enable_multiprocess`. :func:`top` returns
+the most expensive queries of the node.
+"""
+
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+
+from collections import defaultdict
+from contextlib import contextmanager
+
+from planetmint.utils import metrics
+
+# the scope of the queries, e.g. "abci deliver_tx"
+_scope = contextvars.ContextVar("planetmint_tracing_scope", default=None)
+# the round trips of the query being run, as a one element list
+_frame = contextvars.ContextVar("planetmint_tracing_frame", default=None)
+
+_enabled = False
+_lock = threading.Lock()
+# calls, seconds, rows and round trips by scope and query
+_operations = defaultdict(lambda: [0, 0.0, 0, 0])
+# times every scope was entered
+_scopes = defaultdict(int)
+
+SORT_KEYS = ("seconds", "calls", "rows", "round_trips")
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Forget the recorded statistics."""
+    with _lock:
+        _operations.clear()
+        _scopes.clear()
+
+
+def _after_fork():
+    global _lock
+    _lock = threading.Lock()
+    reset()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _snapshot():
+    with _lock:
+        return {
+            "operations": [[scope_name, operation, *stats] for (scope_name, operation), stats in _operations.items()],
+            "scopes": list(_scopes.items()),
+        }
+
+
+def _merge_snapshots(snapshots):
+    """Sum the statistics of the snapshots of several processes."""
+    operations, scopes = defaultdict(lambda: [0, 0.0, 0, 0]), defaultdict(int)
+    for snapshot in snapshots:
+        for scope_name, operation, *stats in snapshot["operations"]:
+            key = (scope_name, operation)
+            operations[key] = [total + value for total, value in zip(operations[key], stats)]
+        for scope_name, entered in snapshot["scopes"]:
+            scopes[scope_name] += entered
+    return {
+        "operations": [[scope_name, operation, *stats] for (scope_name, operation), stats in operations.items()],
+        "scopes": list(scopes.items()),
+    }
+
+
+metrics.share("tracing", _snapshot, _merge_snapshots)
+
+
+def _rows(result):
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple, set)):
+        return len(result)
+    return 1
+
+
+def _start():
+    frame = [0]
+    return frame, _frame.set(frame), time.perf_counter()
+
+
+def _record(operation, frame, token, start, result):
+    elapsed = time.perf_counter() - start
+    _frame.reset(token)
+    parent = _frame.get()
+    if parent is not None:
+        parent[0] += frame[0]
+    with _lock:
+        stats = _operations[(_scope.get(), operation)]
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += _rows(result)
+        stats[3] += frame[0]
+
+
+def traced(func):
+    """Return the query `func` recording its calls while tracing is
+    enabled, `func` may be a coroutine function."""
+    operation = func.__name__
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if not _enabled:
+                return await func(*args, **kwargs)
+            frame, token, start = _start()
+            result = None
+            try:
+                result = await func(*args, **kwargs)
+                return result
+            finally:
+                _record(operation, frame, token, start, result)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        frame, token, start = _start()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        finally:
+            _record(operation, frame, token, start, result)
+
+    return wrapper
+
+
+def round_trip():
+    """Count a request sent to the database by the query being traced."""
+    frame = _frame.get()
+    if frame is not None:
+        frame[0] += 1
+
+
+def enter_scope(name):
+    """Attribute the next queries of the current thread or task to the
+    scope `name`, and return the token to pass to :func:`exit_scope`."""
+    if _enabled:
+        with _lock:
+            _scopes[name] += 1
+    return _scope.set(name)
+
+
+def exit_scope(token):
+    _scope.reset(token)
+
+
+@contextmanager
+def scope(name):
+    token = enter_scope(name)
+    try:
+        yield
+    finally:
+        exit_scope(token)
+
+
+def scoped(name, func):
+    """Return `func` running its queries in the scope `name`."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with scope(name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def top(n=20, sort="seconds"):
+    """Return the `n` most expensive queries by `sort`, one of
+    :data:`SORT_KEYS`, per scope.
+
+    Returns:
+        list: dicts with the ``scope``, the ``operation`` (the query), its
+        ``calls``, ``seconds``, ``rows`` and ``round_trips``, and its
+        ``calls_per_scope``, the average calls each time the scope was
+        entered, e.g. per HTTP request, which reveals N+1 query patterns.
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError("the queries can be sorted by {}, not {!r}".format(", ".join(SORT_KEYS), sort))
+    # the statistics of this process and of the others sharing theirs
+    merged = _merge_snapshots([_snapshot()] + metrics.shared("tracing"))
+    scopes = dict(merged["scopes"])
+    operations = [
+        {
+            "scope": scope_name,
+            "operation": operation,
+            "calls": calls,
+            "seconds": seconds,
+            "rows": rows,
+            "round_trips": round_trips,
+            "calls_per_scope": calls / scopes[scope_name] if scopes.get(scope_name) else None,
+        }
+        for scope_name, operation, calls, seconds, rows, round_trips in merged["operations"]
+    ]
+    operations.sort(key=lambda operation: operation[sort], reverse=True)
+    return operations[:n]
+
+
+def report(n=20, sort="seconds"):
+    """Return whether tracing is enabled and the :func:`top` queries."""
+    return {"enabled": _enabled, "queries": top(n, sort)}
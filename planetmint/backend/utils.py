@@ -3,6 +3,8 @@
 # SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
 # Code is Apache-2.0 and docs are CC-BY-4.0
 
+from planetmint.backend import tracing
+
 
 class ModuleDispatchRegistrationError(Exception):
     """Raised when there is a problem registering dispatched functions for a
@@ -16,7 +18,7 @@ def module_dispatch_registrar(module):
             func_name = func.__name__
             try:
                 dispatch_registrar = getattr(module, func_name)
-                return dispatch_registrar.register(obj_type)(func)
+                return dispatch_registrar.register(obj_type)(tracing.traced(func))
             except AttributeError as ex:
                 raise ModuleDispatchRegistrationError(
                     (
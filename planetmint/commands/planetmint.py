@@ -12,6 +12,7 @@ import logging
 import argparse
 import json
 import sys
+import requests
 import planetmint
 
 
@@ -25,7 +26,7 @@ from transactions.common.transaction import Transaction
 
 
 from planetmint.application.validator import Validator
-from planetmint.backend import schema
+from planetmint.backend import schema, tracing
 from planetmint.commands import utils
 from planetmint.commands.utils import configure_planetmint, input_on_stderr
 from planetmint.config_utils import setup_logging
@@ -317,6 +318,40 @@ def run_tendermint_version(args):
     print(json.dumps(supported_tm_ver, indent=4, sort_keys=True))
 
 
+@configure_planetmint
+def run_tracing(args):
+    """Show the most expensive database queries of a running node"""
+    metrics_config = Config().get()["metrics"]
+    url = "http://{}:{}/tracing".format(metrics_config["host"], metrics_config["port"])
+
+    try:
+        response = requests.get(url, params={"top": args.top, "sort": args.sort})
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print("Could not get the queries from {}: {}".format(url, e), file=sys.stderr)
+        sys.exit(1)
+
+    report = response.json()
+    if not report["enabled"]:
+        print("Tracing is disabled, set tracing.enabled in the configuration to enable it.", file=sys.stderr)
+
+    row = "{:<40} {:<40} {:>10} {:>12} {:>10} {:>12} {:>10}"
+    print(row.format("scope", "query", "calls", "seconds", "rows", "round trips", "per scope"))
+    for query in report["queries"]:
+        calls_per_scope = query["calls_per_scope"]
+        print(
+            row.format(
+                query["scope"] or "-",
+                query["operation"],
+                query["calls"],
+                "{:.6f}".format(query["seconds"]),
+                query["rows"],
+                query["round_trips"],
+                "-" if calls_per_scope is None else "{:.2f}".format(calls_per_scope),
+            )
+        )
+
+
 def create_parser():
     parser = argparse.ArgumentParser(description="Control your Planetmint node.", parents=[utils.base_parser])
 
@@ -388,6 +423,14 @@ def create_parser():
 
     subparsers.add_parser("tendermint-version", help="Show the Tendermint supported versions")
 
+    # parser for showing the traced database queries
+    tracing_parser = subparsers.add_parser("tracing", help="Show the most expensive database queries")
+
+    tracing_parser.add_argument("--top", type=int, default=20, help="The number of queries to show")
+    tracing_parser.add_argument(
+        "--sort", choices=tracing.SORT_KEYS, default="seconds", help="The statistic to sort the queries by"
+    )
+
     start_parser.add_argument(
         "--experimental-parallel-validation",
         dest="experimental_parallel_validation",
@@ -59,6 +59,9 @@ class Config(metaclass=Singleton):
             "login": "guest",
             "password": "",
             "service": "tarantoolctl connect",
+            "pool_size": 10,
+            "pool_timeout": 30,
+            "pool_health_check_interval": 30,
             "init_config": self.__private_init_config,
             "drop_config": self.__private_drop_config,
         }
@@ -74,6 +77,8 @@ class Config(metaclass=Singleton):
                 "bind": "localhost:9984",
                 "loglevel": logging.getLevelName(self.log_config["handlers"]["console"]["level"]).lower(),
                 "workers": None,  # if None, the value will be cpu_count * 2 + 1
+                # not a Gunicorn setting, transactions accepted per POST to /api/v1/transactions/batch
+                "max_batch_size": 1000,
             },
             "wsserver": {
                 "scheme": "ws",
@@ -87,8 +92,76 @@ class Config(metaclass=Singleton):
                 "host": "localhost",
                 "port": 26657,
                 "version": "v0.34.24",  # look for __tm_supported_versions__
+                # connections to the RPC kept alive by each client
+                "rpc_pool_size": 10,
             },
             "database": self.__private_database_map,
+            "cache": {
+                # number of committed transactions the web API keeps in memory, 0 disables the cache.
+                # A block rolled back by the ABCI server isn't removed from the caches of the web
+                # workers, they may serve its transactions until they are evicted
+                "transactions": 10000,
+                # Bloom filter of the committed transaction ids used by the ABCI server
+                "bloom_filter_capacity": 1000000,
+                "bloom_filter_error_rate": 0.001,
+                "bloom_filter_file": os.path.join(os.path.expanduser("~"), ".planetmint_committed_txids"),
+                "bloom_filter_save_interval": 100,
+                # transactions accepted by check_tx whose signatures deliver_tx doesn't verify again
+                "checked_transactions": 10000,
+            },
+            "validation": {
+                # ed25519 signatures of a block verified per batch, and the
+                # threads verifying batches, if None, the number of CPUs.
+                # Only used by --experimental-parallel-validation, the serial
+                # deliver_tx verifies the signatures of every transaction
+                # right away, to reject an invalid one with CodeTypeError
+                "signature_batch_size": 64,
+                "signature_threads": None,
+                # settings of --experimental-parallel-validation
+                "workers": None,  # if None, the number of CPUs
+                "cpu_affinity": [],  # CPUs to pin the workers to, round robin
+                "restart_workers": True,
+                # only use one worker per `transactions_per_worker` transactions of the recent blocks
+                "auto_tune": False,
+                "transactions_per_worker": 100,
+                "buffer_size": 16 * 1024 * 1024,  # bytes of shared memory per worker
+            },
+            "admission": {
+                # validation of the transactions POSTed to the HTTP API before
+                # they are sent to Tendermint: "full", "stateless" (schema and
+                # signatures only, check_tx does the rest) or "adaptive"
+                "mode": "full",
+                # adaptive: stateless while the average full validation time
+                # in seconds, or the transactions being admitted, exceed
+                "latency_threshold": 0.05,
+                "queue_threshold": 16,
+                # adaptive: seconds between two full validations probing the
+                # database latency while stateless
+                "probe_interval": 1.0,
+            },
+            "metrics": {
+                # where the node exports its Prometheus metrics at /metrics
+                # and its traced queries at /tracing, None disables it;
+                # they are not served by the public HTTP API
+                "host": "localhost",
+                "port": 9986,
+                # where `planetmint start --web-api-only` exports them
+                "web_port": 9987,
+                # where the processes of the node share their metrics, so
+                # every scrape exports the ones of the whole node; a new
+                # temporary directory, removed when the node stops, if None
+                "directory": None,
+            },
+            "tracing": {
+                # record the calls, time, rows and round trips of the
+                # database queries, see `planetmint tracing`
+                "enabled": False,
+            },
+            "serialization": {
+                # JSON library of the HTTP API responses and websocket events:
+                # json, rapidjson or orjson (if installed)
+                "backend": "rapidjson",
+            },
             "log": {
                 "file": self.log_config["handlers"]["file"]["filename"],
                 "error_file": self.log_config["handlers"]["errors"]["filename"],
@@ -0,0 +1,89 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+from copy import deepcopy
+
+from planetmint import backend
+
+_UNKNOWN = object()
+
+
+class ChainState:
+    """The latest block, the latest two validator sets and the latest ABCI
+    chain, kept in memory.
+
+    Every part is loaded from the database on first use. The latest block is
+    then updated by :meth:`block_stored`; validator sets and ABCI chains only
+    change on elections and rollbacks, so they are simply reloaded after each
+    change.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.clear()
+
+    def clear(self):
+        self.latest_block = _UNKNOWN
+        self.abci_chain = _UNKNOWN
+        self.validator_sets = _UNKNOWN
+        # validator sets at lower heights are not in memory
+        self.validator_sets_from = 0
+
+    def load(self):
+        self.clear()
+        self.get_latest_block()
+        self.get_latest_abci_chain()
+        self._load_validator_sets()
+
+    def get_latest_block(self):
+        if self.latest_block is _UNKNOWN:
+            self.latest_block = backend.query.get_latest_block(self.connection)
+        return None if self.latest_block is None else deepcopy(self.latest_block)
+
+    def block_stored(self, block):
+        if self.latest_block is _UNKNOWN:
+            return
+        if self.latest_block is None or block["height"] >= self.latest_block["height"]:
+            self.latest_block = {
+                "app_hash": block["app_hash"],
+                "height": block["height"],
+                "transaction_ids": list(block["transactions"]),
+            }
+
+    def get_latest_abci_chain(self):
+        if self.abci_chain is _UNKNOWN:
+            self.abci_chain = backend.query.get_latest_abci_chain(self.connection)
+        return None if self.abci_chain is None else dict(self.abci_chain)
+
+    def abci_chains_changed(self):
+        self.abci_chain = _UNKNOWN
+
+    def _load_validator_sets(self):
+        latest = backend.query.get_validator_set(self.connection)
+        if latest is None:
+            self.validator_sets = []
+            self.validator_sets_from = 0
+            return
+        previous = None
+        if latest["height"] > 0:
+            previous = backend.query.get_validator_set(self.connection, latest["height"] - 1)
+        if previous is None:
+            self.validator_sets = [latest]
+            self.validator_sets_from = 0
+        else:
+            self.validator_sets = [previous, latest]
+            self.validator_sets_from = previous["height"]
+
+    def get_validator_set(self, height=None):
+        if self.validator_sets is _UNKNOWN:
+            self._load_validator_sets()
+        if height is not None and height < self.validator_sets_from:
+            return backend.query.get_validator_set(self.connection, height)
+
+        candidates = [v for v in self.validator_sets if height is None or v["height"] <= height]
+        return deepcopy(candidates[-1]) if candidates else None
+
+    def validator_sets_changed(self):
+        self.validator_sets = _UNKNOWN
@@ -1,5 +1,5 @@
 import rapidjson
-from itertools import chain
+from collections import defaultdict
 from hashlib import sha3_256
 
 from transactions import Transaction
@@ -12,10 +12,10 @@ from planetmint.const import GOVERNANCE_TRANSACTION_TYPES
 from planetmint.abci.utils import key_from_base64, merkleroot
 from planetmint.backend.connection import Connection
 from planetmint.backend.tarantool.const import (
-    TARANT_TABLE_TRANSACTION,
-    TARANT_TABLE_GOVERNANCE,
     TARANT_TABLE_UTXOS,
     TARANT_TABLE_OUTPUT,
+    TARANT_TABLE_TRANSACTION,
+    TARANT_TABLE_GOVERNANCE,
 )
 from planetmint.backend.models.block import Block
 from planetmint.backend.models.output import Output
@@ -23,12 +23,45 @@ from planetmint.backend.models.asset import Asset
 from planetmint.backend.models.metadata import MetaData
 from planetmint.backend.models.dbtransaction import DbTransaction
 from planetmint.utils.singleton import Singleton
+from planetmint.utils.lru_cache import LRUCache
+from planetmint.utils.bloom_filter import BloomFilter
+from planetmint.model.chain_state import ChainState
+
+# number of transactions loaded per query when iterating over query results
+STREAM_BATCH_SIZE = 100
+
+
+class Page:
+    """An iterable over a page of query results.
+
+    Attributes:
+        after: the position to pass as ``after`` to get the next page, the
+            id of the last result of a full page. ``None`` if there can't be
+            a next page.
+    """
+
+    def __init__(self, items, after=None):
+        self.items = items
+        self.after = after
+
+    def __iter__(self):
+        return iter(self.items)
+
+    @staticmethod
+    def of(ids, items, limit):
+        """Return the page of `items` loaded from the list of `ids` at most
+        `limit` long."""
+        return Page(items, ids[-1] if limit and len(ids) == limit else None)
 
 
 class DataAccessor(metaclass=Singleton):
     def __init__(self, database_connection=None):
         config_utils.autoconfigure()
         self.connection = database_connection if database_connection is not None else Connection()
+        self.transaction_cache = None
+        self.committed_filter = None
+        self.committed_filter_settings = None
+        self.chain_state = None
 
     def close_connection(self):
         self.connection.close()
@@ -36,6 +69,118 @@ class DataAccessor(metaclass=Singleton):
     def connect(self):
         self.connection.connect()
 
+    def invalidate_caches(self):
+        """Drop the in-memory state derived from the database, e.g. after the
+        database was modified bypassing this object."""
+        if self.transaction_cache is not None:
+            self.transaction_cache.clear()
+        self.committed_filter = None
+        if self.chain_state is not None:
+            self.chain_state.clear()
+
+    def enable_transaction_cache(self, size):
+        """Keep up to ``size`` committed transactions in memory.
+
+        Committed transactions never change, so only found transactions are
+        cached; the only way for them to go away is :meth:`delete_transactions`,
+        called by ``Validator.rollback``, which clears the cache. A ``size`` of
+        0 disables the cache.
+
+        The cache of a process is not cleared when another process deletes
+        transactions: the web API workers may keep serving the transactions of
+        a block rolled back by the ABCI server until they are evicted or the
+        workers are restarted.
+        """
+        self.transaction_cache = LRUCache(size) if size else None
+
+    def enable_committed_filter(self, capacity, error_rate, path=None, save_interval=100):
+        """Answer negative :meth:`is_committed` lookups from a Bloom filter of
+        the committed transaction ids instead of the database.
+
+        The filter is only kept up to date by this object, so it must only be
+        enabled in the process committing the blocks. If `path` is set, the
+        filter is saved there every `save_interval` blocks and loaded from
+        there instead of being rebuilt from the whole database.
+        """
+        self.committed_filter = None
+        self.committed_filter_settings = {
+            "capacity": capacity,
+            "error_rate": error_rate,
+            "path": path,
+            "save_interval": save_interval,
+        }
+
+    def enable_chain_state(self):
+        """Answer the lookups of the latest block, validator set and ABCI
+        chain from a :class:`~planetmint.model.chain_state.ChainState`.
+
+        The chain state is only updated by this object, so it must only be
+        enabled in the process committing the blocks.
+        """
+        self.chain_state = ChainState(self.connection)
+
+    def disable_committed_state(self):
+        """Drop the committed filter and the chain state, e.g. in a process
+        forked from the one committing the blocks, where they would go
+        stale."""
+        self.invalidate_caches()
+        self.committed_filter_settings = None
+        self.chain_state = None
+
+    def load_chain_state(self):
+        """Reload the chain state from the database, if enabled."""
+        if self.chain_state is not None:
+            self.chain_state.load()
+
+    def get_committed_filter(self):
+        if self.committed_filter_settings is None:
+            return None
+        if self.committed_filter is None:
+            self.committed_filter = self._load_committed_filter() or self._build_committed_filter()
+        return self.committed_filter
+
+    def _load_committed_filter(self):
+        path = self.committed_filter_settings["path"]
+        if not path:
+            return None
+        committed_filter, height, tag = BloomFilter.load(path)
+        if committed_filter is None:
+            return None
+        saved_block = backend.query.get_block(self.connection, height)
+        if saved_block is None or tag != self._committed_filter_tag(saved_block):
+            # the file was saved by another chain or database, or the block was rolled back
+            return None
+
+        latest_block = self.get_latest_block()
+        latest_height = latest_block["height"] if latest_block else 0
+        if height > latest_height:
+            # the file is ahead of the database, e.g. the database was reset
+            return None
+        for block_height in range(height + 1, latest_height + 1):
+            block = backend.query.get_block(self.connection, block_height)
+            if block:
+                committed_filter.update(block["transaction_ids"])
+        return None if committed_filter.is_full else committed_filter
+
+    def _committed_filter_tag(self, block):
+        """Identify the chain `block` belongs to by the chain id and the app
+        hash of the block."""
+        chain = self.get_latest_abci_chain()
+        return f"{chain['chain_id'] if chain else ''}:{block['app_hash']}"
+
+    def _build_committed_filter(self, capacity=None):
+        committed_filter = BloomFilter(
+            capacity or self.committed_filter_settings["capacity"], self.committed_filter_settings["error_rate"]
+        )
+        for table in (TARANT_TABLE_TRANSACTION, TARANT_TABLE_GOVERNANCE):
+            txids = backend.query.get_transaction_ids(self.connection, table)
+            while txids:
+                committed_filter.update(txids)
+                txids = backend.query.get_transaction_ids(self.connection, table, after=txids[-1])
+        if committed_filter.is_full:
+            return self._build_committed_filter(2 * committed_filter.count)
+        return committed_filter
+
     def store_bulk_transactions(self, transactions):
         txns = []
         gov_txns = []
@@ -47,33 +192,77 @@ class DataAccessor(metaclass=Singleton):
             else:
                 txns.append(transaction)
 
-        backend.query.store_transactions(self.connection, txns, TARANT_TABLE_TRANSACTION)
-        backend.query.store_transactions(self.connection, gov_txns, TARANT_TABLE_GOVERNANCE)
-        [self.update_utxoset(t) for t in txns + gov_txns]
+        # the transactions, their outputs and the utxo set changes are committed at once
+        backend.query.store_bulk_transactions(self.connection, txns, gov_txns)
+
+        if self.committed_filter is not None:
+            self.committed_filter.update(t["id"] for t in txns + gov_txns)
+            if self.committed_filter.is_full:
+                self.committed_filter = self._build_committed_filter(2 * self.committed_filter.count)
 
     def delete_transactions(self, txs):
+        if self.transaction_cache is not None:
+            self.transaction_cache.clear()
+        # ids cannot be removed from the filter, it is rebuilt on next use
+        self.committed_filter = None
         return backend.query.delete_transactions(self.connection, txs)
 
     def is_committed(self, transaction_id):
-        transaction = backend.query.get_transaction_single(self.connection, transaction_id)
+        committed_filter = self.get_committed_filter()
+        if committed_filter is not None and transaction_id not in committed_filter:
+            return False
+        transaction = self.get_transaction(transaction_id)
         return bool(transaction)
 
     def get_transaction(self, transaction_id):
-        return backend.query.get_transaction_single(self.connection, transaction_id)
+        if self.transaction_cache is None:
+            return backend.query.get_transaction_single(self.connection, transaction_id)
+
+        transaction = self.transaction_cache.get(transaction_id)
+        if transaction is None:
+            transaction = backend.query.get_transaction_single(self.connection, transaction_id)
+            if transaction is not None:
+                self.transaction_cache.put(transaction_id, transaction)
+        return transaction
 
     def get_transactions(self, txn_ids):
-        return backend.query.get_transactions(self.connection, txn_ids)
-
-    def get_transactions_filtered(self, asset_ids, operation=None, last_tx=False):
-        """Get a list of transactions filtered on some criteria"""
-        txids = backend.query.get_txids_filtered(self.connection, asset_ids, operation, last_tx)
-        for txid in txids:
-            yield self.get_transaction(txid)
+        if self.transaction_cache is None:
+            return backend.query.get_transactions(self.connection, txn_ids)
+
+        cached = {txid: self.transaction_cache.get(txid) for txid in txn_ids}
+        missing = [txid for txid, transaction in cached.items() if transaction is None]
+        if missing:
+            for transaction in backend.query.get_transactions(self.connection, missing):
+                self.transaction_cache.put(transaction.id, transaction)
+                cached[transaction.id] = transaction
+        return [transaction for transaction in cached.values() if transaction is not None]
+
+    def iter_transactions(self, txids, batch_size=STREAM_BATCH_SIZE):
+        """Yield the transactions of `txids`, in order, loading `batch_size`
+        of them per query. Missing transactions are skipped."""
+        txids = list(txids)
+        for start in range(0, len(txids), batch_size):
+            batch = txids[start : start + batch_size]
+            transactions = {transaction.id: transaction for transaction in self.get_transactions(batch)}
+            for txid in batch:
+                if txid in transactions:
+                    yield transactions[txid]
+
+    def get_transactions_filtered(self, asset_ids, operation=None, last_tx=False, after=None, limit=None) -> Page:
+        """Get a page of transactions filtered on some criteria"""
+        txids = backend.query.get_txids_filtered(self.connection, asset_ids, operation, last_tx, after, limit)
+        if last_tx:
+            txids = [txids]
+        return Page.of(txids, self.iter_transactions(txids), limit)
 
     def get_outputs_by_tx_id(self, txid):
-        return backend.query.get_outputs_by_tx_id(self.connection, txid)
+        if self.transaction_cache is None:
+            return backend.query.get_outputs_by_tx_id(self.connection, txid)
+
+        transaction = self.get_transaction(txid)
+        return transaction.outputs if transaction is not None else []
 
-    def get_outputs_filtered(self, owner, spent=None) -> list[Output]:
+    def get_outputs_filtered(self, owner, spent=None, offset=0, limit=None, after=None) -> list[Output]:
         """Get a list of output links filtered on some criteria
 
         Args:
@@ -81,34 +270,38 @@ class DataAccessor(metaclass=Singleton):
             spent (bool): If ``True`` return only the spent outputs. If
                           ``False`` return only unspent outputs. If spent is
                           not specified (``None``) return all outputs.
+            offset (int): the number of matching outputs to skip, which
+                          are still scanned, prefer `after` for paging.
+            limit (int): the maximum number of outputs to return, all of
+                         them if not specified.
+            after (str): only return the outputs listed after the output
+                         with this id, i.e. the last one of the previous
+                         page.
 
         Returns:
             :obj:`list` of Output: list of ``txid`` s and ``output`` s
             pointing to another transaction's condition
         """
-        outputs = backend.query.get_outputs_by_owner(self.connection, owner)
-        unspent_outputs = backend.query.get_outputs_by_owner(self.connection, owner, TARANT_TABLE_UTXOS)
-        if spent is True:
-            spent_outputs = []
-            for output in outputs:
-                if not any(
-                    utxo.transaction_id == output.transaction_id and utxo.index == output.index
-                    for utxo in unspent_outputs
-                ):
-                    spent_outputs.append(output)
-            return spent_outputs
-        elif spent is False:
-            return unspent_outputs
-        return outputs
+        return backend.query.get_outputs_filtered(self.connection, owner, spent, offset, limit, after)
 
     def store_block(self, block):
         """Create a new block."""
 
-        return backend.query.store_block(self.connection, block)
+        result = backend.query.store_block(self.connection, block)
+        if self.committed_filter is not None and self.committed_filter_settings["path"]:
+            if block["height"] % self.committed_filter_settings["save_interval"] == 0:
+                self.committed_filter.save(
+                    self.committed_filter_settings["path"], block["height"], self._committed_filter_tag(block)
+                )
+        if self.chain_state is not None:
+            self.chain_state.block_stored(block)
+        return result
 
     def get_latest_block(self) -> dict:
         """Get the block with largest height."""
 
+        if self.chain_state is not None:
+            return self.chain_state.get_latest_block()
         return backend.query.get_latest_block(self.connection)
 
     def get_block(self, block_id) -> dict:
@@ -131,9 +324,14 @@ class DataAccessor(metaclass=Singleton):
         return block
 
     def delete_abci_chain(self, height):
-        return backend.query.delete_abci_chain(self.connection, height)
+        result = backend.query.delete_abci_chain(self.connection, height)
+        if self.chain_state is not None:
+            self.chain_state.abci_chains_changed()
+        return result
 
     def get_latest_abci_chain(self):
+        if self.chain_state is not None:
+            return self.chain_state.get_latest_abci_chain()
         return backend.query.get_latest_abci_chain(self.connection)
 
     def store_election(self, election_id, height, is_concluded):
@@ -194,30 +392,78 @@ class DataAccessor(metaclass=Singleton):
 
         return block
 
-    def get_input_txs_and_conditions(self, inputs, current_transactions=[]):
+    def resolve_inputs(self, inputs) -> tuple[dict, dict]:
+        """Fetch the transactions referenced by `inputs` together with the
+        transactions already spending them, using a fixed number of backend
+        calls regardless of the number of inputs.
+
+        Args:
+            inputs (list): the inputs of one transaction or of all the
+                transactions of a block.
+
+        Returns:
+            tuple: the committed input transactions (:obj:`DbTransaction`)
+            by id and the ids of their committed spending transactions by
+            ``(transaction_id, output_index)``.
+        """
+        links = list(
+            dict.fromkeys((input_.fulfills.txid, input_.fulfills.output) for input_ in inputs if input_.fulfills)
+        )
+        txids = list(dict.fromkeys(txid for txid, _ in links))
+
+        input_txs = {}
+        if txids:
+            input_txs = {tx.id: tx for tx in self.get_transactions(txids)}
+
+        spending_txids = defaultdict(list)
+        for txid, output, spending_txid in backend.query.get_spending_transaction_ids(self.connection, links):
+            spending_txids[(txid, output)].append(spending_txid)
+
+        return input_txs, spending_txids
+
+    def get_input_txs_and_conditions(self, inputs, current_transactions=[], resolved_inputs=None):
+        """Resolve the transactions and conditions the given inputs fulfill.
+
+        Args:
+            inputs (list): the inputs to resolve.
+            current_transactions (list): transactions of the current block
+                that are not committed yet.
+            resolved_inputs (tuple): optional result of :meth:`resolve_inputs`
+                covering at least `inputs`, e.g. computed once for a whole
+                block. If not given, the inputs are resolved here.
+        """
         # store the inputs so that we can check if the asset ids match
         input_txs = []
         input_conditions = []
 
+        committed_txs, spending_txids = resolved_inputs if resolved_inputs else self.resolve_inputs(inputs)
+
+        current_txs = {ctxn.id: ctxn for ctxn in current_transactions}
+        current_spending = defaultdict(int)
+        for ctxn in current_transactions:
+            for ctxn_input in ctxn.inputs:
+                if ctxn_input.fulfills:
+                    current_spending[(ctxn_input.fulfills.txid, ctxn_input.fulfills.output)] += 1
+
         for input_ in inputs:
             input_txid = input_.fulfills.txid
-            input_tx = self.get_transaction(input_txid)
-            _output = self.get_outputs_by_tx_id(input_txid)
-            if input_tx is None:
-                for ctxn in current_transactions:
-                    if ctxn.id == input_txid:
-                        ctxn_dict = ctxn.to_dict()
-                        input_tx = DbTransaction.from_dict(ctxn_dict)
-                        _output = [
-                            Output.from_dict(output, index, ctxn.id)
-                            for index, output in enumerate(ctxn_dict["outputs"])
-                        ]
+            input_tx = committed_txs.get(input_txid)
+            _output = input_tx.outputs if input_tx is not None else None
+            if input_tx is None and input_txid in current_txs:
+                ctxn_dict = current_txs[input_txid].to_dict()
+                input_tx = DbTransaction.from_dict(ctxn_dict)
+                _output = [
+                    Output.from_dict(output, index, input_txid) for index, output in enumerate(ctxn_dict["outputs"])
+                ]
 
             if input_tx is None:
                 raise InputDoesNotExist("input `{}` doesn't exist".format(input_txid))
 
-            spent = self.get_spending_transaction(input_txid, input_.fulfills.output, current_transactions)
-            if spent:
+            link = (input_txid, input_.fulfills.output)
+            spent = len(spending_txids.get(link, [])) + current_spending[link]
+            if spent > 1:
+                raise DoubleSpend('tx "{}" spends inputs twice'.format(input_txid))
+            elif spent:
                 raise DoubleSpend("input `{}` was already spent".format(input_txid))
 
             output = _output[input_.fulfills.output]
@@ -242,10 +488,11 @@ class DataAccessor(metaclass=Singleton):
         """
         return backend.query.get_assets(self.connection, asset_ids)
 
-    def get_assets_by_cid(self, asset_cid, **kwargs) -> list[dict]:
-        asset_txs = backend.query.get_transactions_by_asset(self.connection, asset_cid, **kwargs)
+    def get_assets_by_cid(self, asset_cid, limit=1000, after=None) -> Page:
+        txids = backend.query.get_txids_by_asset(self.connection, asset_cid, limit=limit, after=after)
         # flatten and return all found assets
-        return list(chain.from_iterable([Asset.list_to_dict(tx.assets) for tx in asset_txs]))
+        assets = (asset for tx in self.iter_transactions(txids) for asset in Asset.list_to_dict(tx.assets))
+        return Page.of(txids, assets, limit)
 
     def get_metadata(self, txn_ids) -> list[MetaData]:
         """Return a list of metadata that match the transaction ids (txn_ids)
@@ -259,11 +506,13 @@ class DataAccessor(metaclass=Singleton):
         """
         return backend.query.get_metadata(self.connection, txn_ids)
 
-    def get_metadata_by_cid(self, metadata_cid, **kwargs) -> list[str]:
-        metadata_txs = backend.query.get_transactions_by_metadata(self.connection, metadata_cid, **kwargs)
-        return [tx.metadata.metadata for tx in metadata_txs]
+    def get_metadata_by_cid(self, metadata_cid, limit=1000, after=None) -> Page:
+        txids = backend.query.get_txids_by_metadata(self.connection, metadata_cid, limit=limit, after=after)
+        return Page.of(txids, (tx.metadata.metadata for tx in self.iter_transactions(txids)), limit)
 
     def get_validator_set(self, height=None):
+        if self.chain_state is not None:
+            return self.chain_state.get_validator_set(height)
         return backend.query.get_validator_set(self.connection, height)
 
     def get_validators(self, height=None):
@@ -285,13 +534,22 @@ class DataAccessor(metaclass=Singleton):
         NOTE: If the validator set already exists at that `height` then an
         exception will be raised.
         """
-        return backend.query.store_validator_set(self.connection, {"height": height, "validators": validators})
+        result = backend.query.store_validator_set(self.connection, {"height": height, "validators": validators})
+        if self.chain_state is not None:
+            self.chain_state.validator_sets_changed()
+        return result
 
     def delete_validator_set(self, height):
-        return backend.query.delete_validator_set(self.connection, height)
+        result = backend.query.delete_validator_set(self.connection, height)
+        if self.chain_state is not None:
+            self.chain_state.validator_sets_changed()
+        return result
 
     def store_abci_chain(self, height, chain_id, is_synced=True):
-        return backend.query.store_abci_chain(self.connection, height, chain_id, is_synced)
+        result = backend.query.store_abci_chain(self.connection, height, chain_id, is_synced)
+        if self.chain_state is not None:
+            self.chain_state.abci_chains_changed()
+        return result
 
     def get_asset_tokens_for_public_key(self, transaction_id, election_pk):
         txns = backend.query.get_asset_tokens_for_public_key(self.connection, transaction_id, election_pk)
@@ -313,16 +571,17 @@ class DataAccessor(metaclass=Singleton):
             for index, output in enumerate(transaction["outputs"])
         ]
 
+    @staticmethod
+    def utxo_hash(transaction_id, output_index) -> bytes:
+        return sha3_256("{}{}".format(transaction_id, output_index).encode()).digest()
+
     def get_utxoset_merkle_root(self):
         """Returns the merkle root of the utxoset. This implies that
         the utxoset is first put into a merkle tree.
 
-        For now, the merkle tree and its root will be computed each
-        time. This obviously is not efficient and a better approach
-        that limits the repetition of the same computation when
-        unnecesary should be sought. For instance, future optimizations
-        could simply re-compute the branches of the tree that were
-        affected by a change.
+        The merkle tree and its root are computed on each call: no part of
+        the node asks for the root on a hot path, so the tree isn't kept
+        around.
 
         The transaction hash (id) and output index should be sufficient
         to uniquely identify a utxo, and consequently only that
@@ -337,12 +596,5 @@ class DataAccessor(metaclass=Singleton):
             str: Merkle root in hexadecimal form.
         """
         utxoset = backend.query.get_unspent_outputs(self.connection)
-        # See common/transactions.py for details.
-
-        hashes = [
-            sha3_256("{}{}".format(utxo["transaction_id"], utxo["output_index"]).encode()).digest() for utxo in utxoset
-        ]
-
-        print(sorted(hashes))
-
+        hashes = [DataAccessor.utxo_hash(utxo["transaction_id"], utxo["output_index"]) for utxo in utxoset]
         return merkleroot(sorted(hashes))
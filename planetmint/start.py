@@ -11,9 +11,11 @@ from planetmint.config import Config
 from planetmint.application.validator import Validator
 from planetmint.abci.application_logic import ApplicationLogic
 from planetmint.abci.parallel_validation import ParallelValidationApp
+from planetmint.backend import tracing
 from planetmint.web import server, websocket_server
 from planetmint.ipc.events import EventTypes
 from planetmint.ipc.exchange import Exchange
+from planetmint.utils import metrics, serialization
 from planetmint.utils.processes import Process
 from planetmint.version import __version__
 
@@ -41,6 +43,8 @@ def start_web_api(args):
         settings=Config().get()["server"], log_config=Config().get()["log"], planetmint_factory=Validator
     )
     if args.web_api_only:
+        # the ABCI server of a split deployment may run on the same host
+        start_metrics_server("web_port")
         app_server.run()
     else:
         p_webapi = Process(name="planetmint_webapi", target=app_server.run, daemon=True)
@@ -78,12 +82,55 @@ def start_abci_server(args):
     else:
         abci_server_app = ApplicationLogic(events_queue=publisher_queue)
 
+    # The filter and the chain state are only updated by this process, the
+    # parallel validation workers drop them when they are (re)started.
+    cache_config = Config().get()["cache"]
+    abci_server_app.validator.models.enable_committed_filter(
+        cache_config["bloom_filter_capacity"],
+        cache_config["bloom_filter_error_rate"],
+        cache_config["bloom_filter_file"],
+        cache_config["bloom_filter_save_interval"],
+    )
+    abci_server_app.validator.models.get_committed_filter()
+    abci_server_app.validator.models.enable_chain_state()
+
+    start_metrics_server()
+
     app = ABCIServer(abci_server_app)
     app.run()
 
 
+def tracing_page(query):
+    report = tracing.report(int(query.get("top", 20)), query.get("sort", "seconds"))
+    return "application/json", serialization.dumps(report)
+
+
+def start_metrics_server(port_setting="port"):
+    """Export the metrics and the traced queries of the node, apart from the
+    public HTTP API, on the port of the `port_setting` metrics setting.
+
+    Returns:
+        ThreadingHTTPServer: the server, None if it is disabled or can't be
+        started, the node runs without it then.
+    """
+    metrics_config = Config().get()["metrics"]
+    host, port = metrics_config["host"], metrics_config[port_setting]
+    if not port:
+        return None
+    try:
+        return metrics.start_http_server(host, port, {"/tracing": tracing_page})
+    except OSError as e:
+        logger.warning("Cannot export the metrics on %s:%s: %s", host, port, e)
+        return None
+
+
 def start(args):
     logger.info("Starting Planetmint")
+    serialization.use(Config().get()["serialization"]["backend"])
+    # before forking the web server, the ABCI server and their workers
+    metrics.enable_multiprocess(Config().get()["metrics"]["directory"])
+    if Config().get()["tracing"]["enabled"]:
+        tracing.enable()
 
     if args.web_api_only:
         start_web_api(args)
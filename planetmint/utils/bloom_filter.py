@@ -0,0 +1,91 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import math
+import os
+import struct
+from hashlib import blake2b
+
+_MAGIC = b"PMBF"
+_HEADER = struct.Struct(">4sQQIQQI")
+
+
+class BloomFilter:
+    """A Bloom filter over strings.
+
+    Membership tests never give false negatives: if ``key not in bloom_filter``
+    the key was never added. A positive answer is wrong with a probability of
+    about ``error_rate`` as long as no more than ``capacity`` keys are added.
+    """
+
+    def __init__(self, capacity, error_rate=0.001, num_bits=None, num_hashes=None, bits=None, count=0):
+        self.capacity = capacity
+        self.num_bits = num_bits or max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.num_hashes = num_hashes or max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, key):
+        digest = blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, keys):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def is_full(self):
+        return self.count > self.capacity
+
+    def save(self, path, height, tag=""):
+        """Write the filter to `path`, tagged with the block `height` it is
+        up to date with and a `tag` identifying the chain that block belongs
+        to. The file is replaced atomically."""
+        tag = tag.encode()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, height, self.capacity, self.num_hashes, self.num_bits, self.count, len(tag)))
+            f.write(tag)
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        """Read a filter written by :meth:`save`.
+
+        Returns:
+            tuple: the filter, the block height it is up to date with and the
+            tag it was saved with, or ``(None, None, None)`` if `path` does
+            not hold a valid filter.
+        """
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None, None, None
+
+        if len(data) < _HEADER.size:
+            return None, None, None
+        magic, height, capacity, num_hashes, num_bits, count, tag_size = _HEADER.unpack_from(data)
+        tag = data[_HEADER.size : _HEADER.size + tag_size]
+        bits = bytearray(data[_HEADER.size + tag_size :])
+        if magic != _MAGIC or len(tag) != tag_size or len(bits) != (num_bits + 7) // 8:
+            return None, None, None
+        try:
+            tag = tag.decode()
+        except UnicodeDecodeError:
+            return None, None, None
+        bloom_filter = BloomFilter(capacity, num_bits=num_bits, num_hashes=num_hashes, bits=bits, count=count)
+        return bloom_filter, height, tag
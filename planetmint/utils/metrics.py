@@ -0,0 +1,474 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Metrics of a Planetmint process, in the Prometheus text format.
+
+Metrics are registered per process: every Gunicorn worker, the ABCI server
+and the parallel validation workers record their own, and a forked process
+starts from zero. Once :func:`enable_multiprocess` is called, every process
+forked from the caller shares its metrics through a directory, and
+:func:`render` exports the metrics of the whole node, whichever process
+serves the scrape.
+"""
+
+import atexit
+import bisect
+import fcntl
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# upper bounds in seconds of the buckets of latency histograms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Counter:
+    """A value which only goes up, thread safe.
+
+    Args:
+        name (str): the name of the metric.
+        documentation (str): what is counted.
+        labels (dict): the labels of this counter among the ones of the
+            same name.
+    """
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labels=None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = dict(labels or {})
+        self._value = 0
+        self._function = None
+        self._lock = threading.Lock()
+
+    def _reset(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def set_function(self, function):
+        """Report the value returned by `function` instead, e.g. a count
+        kept by another object."""
+        self._function = function
+
+    def snapshot(self):
+        if self._function is not None:
+            return self._function()
+        with self._lock:
+            return self._value
+
+    def samples(self):
+        return [(self.name, self.labels, self.snapshot())]
+
+
+class Gauge(Counter):
+    """A value which goes up and down, thread safe."""
+
+    type = "gauge"
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class Histogram:
+    """Count the observed values in buckets, thread safe.
+
+    Args:
+        name (str): the name of the metric.
+        documentation (str): what is observed.
+        labels (dict): the labels of this histogram among the ones of the
+            same name.
+        buckets (tuple): the sorted upper bounds of the buckets, values
+            above the last one are only counted in the total.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labels=None, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = dict(labels or {})
+        self.buckets = tuple(buckets)
+        self._reset()
+
+    def _reset(self):
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the time in seconds spent in the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def timed(self, func):
+        """Return `func` observing the time in seconds of its calls."""
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.time():
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def snapshot(self):
+        """Return the ``count`` and ``sum`` of the observed values, and the
+        ``buckets`` as ``[upper_bound, cumulative_count]`` pairs."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative, buckets = 0, []
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            buckets.append([bound, cumulative])
+        return {"count": sum(counts), "sum": total, "buckets": buckets}
+
+    def samples(self):
+        snapshot = self.snapshot()
+        samples = [
+            (self.name + "_bucket", dict(self.labels, le=_format_value(bound)), count)
+            for bound, count in snapshot["buckets"]
+        ]
+        samples.append((self.name + "_bucket", dict(self.labels, le="+Inf"), snapshot["count"]))
+        samples.append((self.name + "_sum", self.labels, snapshot["sum"]))
+        samples.append((self.name + "_count", self.labels, snapshot["count"]))
+        return samples
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _register(metric_class, name, documentation, labels, **kwargs):
+    key = (name, tuple(sorted((labels or {}).items())))
+    with _registry_lock:
+        if key not in _registry:
+            for other in _registry.values():
+                if other.name == name and not isinstance(other, metric_class):
+                    raise ValueError("the metric {} is already registered as a {}".format(name, other.type))
+            _registry[key] = metric_class(name, documentation, labels, **kwargs)
+        return _registry[key]
+
+
+def counter(name, documentation, labels=None):
+    """Return the counter `name` with the given `labels` of this process,
+    registering it on first use."""
+    return _register(Counter, name, documentation, labels)
+
+
+def gauge(name, documentation, labels=None):
+    """Return the gauge `name` with the given `labels` of this process,
+    registering it on first use."""
+    return _register(Gauge, name, documentation, labels)
+
+
+def histogram(name, documentation, labels=None, buckets=LATENCY_BUCKETS):
+    """Return the histogram `name` with the given `labels` of this process,
+    registering it on first use."""
+    return _register(Histogram, name, documentation, labels, buckets=buckets)
+
+
+def collect():
+    """Return the registered metrics, sorted by name and labels."""
+    with _registry_lock:
+        return [_registry[key] for key in sorted(_registry)]
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _snapshot():
+    return [
+        {
+            "name": metric.name,
+            "type": metric.type,
+            "documentation": metric.documentation,
+            "labels": metric.labels,
+            "samples": metric.samples(),
+        }
+        for metric in collect()
+    ]
+
+
+# the directory the metrics of the processes are shared through, if any
+_directory = None
+# more state of this process to share with its metrics, and how to merge
+# it, by key
+_shared = {}
+# seconds between two writes of the metrics of a process to the directory
+_DUMP_INTERVAL = 1.0
+# the metrics of the processes which exited, folded into one snapshot
+_EXITED = "exited.json"
+
+
+def enable_multiprocess(directory=None):
+    """Share the metrics of this process, and of the processes forked from
+    it, through `directory`, a new temporary directory removed when this
+    process exits if None.
+
+    Every process writes its metrics to ``<pid>.json`` in `directory` every
+    second, so the exported ones are at most that old. The metrics of the
+    processes which exited are folded into one file, without their gauges.
+    The files of the processes of a previous run are removed.
+    """
+    global _directory
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix="planetmint-metrics-")
+        atexit.register(_remove_directory, directory, os.getpid())
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith((".json", ".tmp")):
+            os.remove(os.path.join(directory, name))
+    _directory = directory
+    _start_writer()
+
+
+def _remove_directory(directory, pid):
+    # the exit handlers are inherited by the forked processes
+    if os.getpid() == pid:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def share(key, function, merge):
+    """Share the JSON serializable value returned by `function` with the
+    metrics of this process, see :func:`shared`. `merge` returns one such
+    value from a list of them, to fold the ones of the processes which
+    exited."""
+    _shared[key] = (function, merge)
+
+
+def shared(key):
+    """Return the values shared under `key` by the other processes sharing
+    their metrics, including the ones which exited."""
+    if _directory is None:
+        return []
+    return [snapshot["shared"][key] for snapshot in _shared_snapshots() if key in snapshot["shared"]]
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, snapshot):
+    with open(path + ".tmp", "w") as f:
+        json.dump(snapshot, f)
+    os.replace(path + ".tmp", path)
+
+
+def _dump():
+    snapshot = {"metrics": _snapshot(), "shared": {key: function() for key, (function, _) in _shared.items()}}
+    try:
+        _write(os.path.join(_directory, "{}.json".format(os.getpid())), snapshot)
+    except (OSError, ValueError) as e:
+        logger.warning("Cannot share the metrics of this process: %s", e)
+
+
+def _write_forever():
+    while True:
+        time.sleep(_DUMP_INTERVAL)
+        _dump()
+
+
+def _start_writer():
+    threading.Thread(target=_write_forever, name="metrics-writer", daemon=True).start()
+
+
+def _after_fork():
+    global _registry_lock
+    _registry_lock = threading.Lock()
+    for metric in _registry.values():
+        metric._reset()
+    if _directory is not None:
+        _start_writer()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _fold(path):
+    """Fold the snapshot at `path`, of a process which exited, into the one
+    of all the processes which exited, so the files read by a scrape don't
+    pile up with the restarts of the workers."""
+    with open(os.path.join(_directory, "exited.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        snapshot = _read(path)
+        if snapshot is None:
+            # folded by another process
+            return
+        exited_path = os.path.join(_directory, _EXITED)
+        exited = _read(exited_path) or {"metrics": [], "shared": {}}
+        # what a process counted still counts once it exited, its gauges don't
+        counted = [metric for metric in snapshot["metrics"] if metric["type"] != Gauge.type]
+        exited["metrics"] = _merge([exited["metrics"], counted])
+        for key, value in snapshot["shared"].items():
+            if key in exited["shared"] and key in _shared:
+                value = _shared[key][1]([exited["shared"][key], value])
+            exited["shared"][key] = value
+        _write(exited_path, exited)
+        os.remove(path)
+
+
+def _shared_snapshots():
+    """Return the snapshots written by the other processes sharing their
+    metrics, the ones of the processes which exited as one."""
+    snapshots = []
+    for name in os.listdir(_directory):
+        pid, _, extension = name.partition(".")
+        if extension != "json" or not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        path = os.path.join(_directory, name)
+        if not _alive(int(pid)):
+            _fold(path)
+            continue
+        snapshot = _read(path)
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    exited = _read(os.path.join(_directory, _EXITED))
+    if exited is not None:
+        snapshots.append(exited)
+    return snapshots
+
+
+def _merge(snapshots):
+    """Sum the samples of the metrics of the same name and labels."""
+    merged = {}
+    for snapshot in snapshots:
+        for metric in snapshot:
+            key = (metric["name"], tuple(sorted(metric["labels"].items())))
+            if key not in merged:
+                merged[key] = dict(metric, samples=[list(sample) for sample in metric["samples"]])
+            elif len(merged[key]["samples"]) == len(metric["samples"]):
+                for sample, (_, _, value) in zip(merged[key]["samples"], metric["samples"]):
+                    sample[2] += value
+    return [merged[key] for key in sorted(merged)]
+
+
+def render():
+    """Return the metrics in the Prometheus text format: the ones of this
+    process, and of the processes sharing theirs if :func:`enable_multiprocess`
+    was called."""
+    snapshots = [_snapshot()]
+    if _directory is not None:
+        snapshots.extend(snapshot["metrics"] for snapshot in _shared_snapshots())
+    lines = []
+    name = None
+    for metric in _merge(snapshots):
+        if metric["name"] != name:
+            name = metric["name"]
+            documentation = metric["documentation"].replace("\\", "\\\\").replace("\n", "\\n")
+            lines.append("# HELP {} {}".format(name, documentation))
+            lines.append("# TYPE {} {}".format(name, metric["type"]))
+        for sample_name, labels, value in metric["samples"]:
+            lines.append("{}{} {}".format(sample_name, _format_labels(labels), _format_value(value)))
+    return "\n".join(lines) + "\n"
+
+
+def _metrics_page(query):
+    return CONTENT_TYPE, render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    pages = {}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        page = self.pages.get(url.path)
+        if page is None:
+            self.send_error(404)
+            return
+        try:
+            content_type, body = page({key: values[-1] for key, values in parse_qs(url.query).items()})
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        body = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics: " + format, *args)
+
+
+def start_http_server(host, port, pages=None):
+    """Serve the metrics returned by :func:`render` over HTTP from a daemon
+    thread, at ``/`` and ``/metrics``.
+
+    Args:
+        pages (dict): more pages to serve, by path, as functions of the
+            query string arguments returning the content type and the body
+            of the page. They may raise :exc:`ValueError` for invalid
+            arguments.
+
+    Returns:
+        ThreadingHTTPServer: the server, call its ``shutdown`` method to
+        stop it.
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"pages": {"/": _metrics_page, "/metrics": _metrics_page}})
+    handler.pages.update(pages or {})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
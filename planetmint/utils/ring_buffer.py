@@ -0,0 +1,122 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import multiprocessing
+import queue
+import struct
+import time
+
+from multiprocessing.shared_memory import SharedMemory
+
+# the number of bytes written and read since the creation of the buffer
+_HEADER = struct.Struct("<QQ")
+_LENGTH = struct.Struct("<I")
+
+# the bounds of the delay between two checks for free space
+_MIN_POLL_DELAY = 0.0005
+_MAX_POLL_DELAY = 0.01
+
+
+def _remaining(deadline):
+    return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+
+class RingBuffer:
+    """A bounded FIFO queue of byte strings in shared memory.
+
+    Unlike :class:`multiprocessing.Queue`, messages are copied straight into
+    memory shared with the other processes, without pickling and without a
+    pipe. The buffer must be created before the processes using it are
+    started. :meth:`put` and :meth:`get` follow the :class:`queue.Queue`
+    interface and raise :exc:`queue.Full` and :exc:`queue.Empty`.
+
+    Args:
+        capacity (int): the size in bytes of the buffer. Every message takes
+            4 more bytes for its length.
+    """
+
+    def __init__(self, capacity):
+        if capacity <= _LENGTH.size:
+            raise ValueError("the capacity of the buffer must be larger than {} bytes".format(_LENGTH.size))
+        self.capacity = capacity
+        self._shm = SharedMemory(create=True, size=_HEADER.size + capacity)
+        _HEADER.pack_into(self._shm.buf, 0, 0, 0)
+        # plain locks and semaphores, unlike conditions, don't get stuck
+        # when a process dies while waiting on them
+        self._lock = multiprocessing.Lock()
+        self._messages = multiprocessing.Semaphore(0)
+
+    def _counters(self):
+        return _HEADER.unpack_from(self._shm.buf, 0)
+
+    def _copy_in(self, position, data):
+        start = position % self.capacity
+        first = min(len(data), self.capacity - start)
+        buf = self._shm.buf
+        buf[_HEADER.size + start : _HEADER.size + start + first] = data[:first]
+        if first < len(data):
+            buf[_HEADER.size : _HEADER.size + len(data) - first] = data[first:]
+
+    def _copy_out(self, position, size):
+        start = position % self.capacity
+        first = min(size, self.capacity - start)
+        buf = self._shm.buf
+        data = bytes(buf[_HEADER.size + start : _HEADER.size + start + first])
+        if first < size:
+            data += bytes(buf[_HEADER.size : _HEADER.size + size - first])
+        return data
+
+    def put(self, data, block=True, timeout=None):
+        size = _LENGTH.size + len(data)
+        if size > self.capacity:
+            raise ValueError("message of {} bytes doesn't fit in the buffer".format(len(data)))
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = _MIN_POLL_DELAY
+        while True:
+            if not self._lock.acquire(block, _remaining(deadline)):
+                raise queue.Full
+            try:
+                written, read = self._counters()
+                if self.capacity - (written - read) >= size:
+                    self._copy_in(written, _LENGTH.pack(len(data)))
+                    self._copy_in(written + _LENGTH.size, data)
+                    _HEADER.pack_into(self._shm.buf, 0, written + size, read)
+                    break
+            finally:
+                self._lock.release()
+            # the consumer doesn't signal freed space, wait for it
+            if not block or (deadline is not None and time.monotonic() >= deadline):
+                raise queue.Full
+            time.sleep(delay if deadline is None else min(delay, _remaining(deadline)))
+            delay = min(delay * 2, _MAX_POLL_DELAY)
+        self._messages.release()
+
+    def get(self, block=True, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self._messages.acquire(block, timeout):
+            raise queue.Empty
+        if not self._lock.acquire(block, _remaining(deadline)):
+            self._messages.release()
+            raise queue.Empty
+        try:
+            written, read = self._counters()
+            (length,) = _LENGTH.unpack(self._copy_out(read, _LENGTH.size))
+            data = self._copy_out(read + _LENGTH.size, length)
+            _HEADER.pack_into(self._shm.buf, 0, written, read + _LENGTH.size + length)
+            return data
+        finally:
+            self._lock.release()
+
+    def empty(self):
+        with self._lock:
+            written, read = self._counters()
+            return written == read
+
+    def close(self):
+        """Release the shared memory, only the process creating the buffer
+        should call this, once it is not used anymore."""
+        self._shm.close()
+        self._shm.unlink()
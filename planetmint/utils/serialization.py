@@ -0,0 +1,97 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""JSON serialization of HTTP responses and websocket events.
+
+The library doing the work is selected with :func:`use`, every process
+started by ``planetmint start`` uses the one of the ``serialization.backend``
+setting. Whatever the backend, :func:`dumps` returns the same compact
+``str``, with non ASCII characters left as they are, and :func:`loads`
+accepts ``str`` and ``bytes``.
+
+Transactions sent to and received from Tendermint are not serialized here:
+their encoding is the canonical one of
+:func:`transactions.common.utils.serialize`, see
+:func:`planetmint.abci.utils.encode_transaction`.
+"""
+
+import json
+
+import rapidjson
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+
+class JSONBackend:
+    name = "json"
+
+    @staticmethod
+    def dumps(obj, sort_keys=False) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys)
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+
+class RapidJSONBackend:
+    name = "rapidjson"
+
+    @staticmethod
+    def dumps(obj, sort_keys=False) -> str:
+        return rapidjson.dumps(obj, ensure_ascii=False, sort_keys=sort_keys)
+
+    @staticmethod
+    def loads(data):
+        return rapidjson.loads(data)
+
+
+class ORJSONBackend:
+    name = "orjson"
+
+    @staticmethod
+    def dumps(obj, sort_keys=False) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else None).decode()
+
+    @staticmethod
+    def loads(data):
+        return orjson.loads(data)
+
+
+BACKENDS = {backend.name: backend for backend in (JSONBackend, RapidJSONBackend, ORJSONBackend)}
+
+DEFAULT_BACKEND = "rapidjson"
+
+_backend = BACKENDS[DEFAULT_BACKEND]
+
+
+def use(name: str):
+    """Serialize with the backend called `name` from now on.
+
+    Raises:
+        ValueError: if there is no such backend, or if it isn't installed.
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError("unknown JSON backend {!r}, use one of {}".format(name, ", ".join(BACKENDS)))
+    if name == ORJSONBackend.name and orjson is None:
+        raise ValueError("the orjson JSON backend requires the orjson package")
+    _backend = BACKENDS[name]
+
+
+def backend() -> str:
+    """Return the name of the backend in use."""
+    return _backend.name
+
+
+def dumps(obj, sort_keys=False) -> str:
+    return _backend.dumps(obj, sort_keys)
+
+
+def loads(data):
+    return _backend.loads(data)
@@ -0,0 +1,114 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Validation of the transactions POSTed to the HTTP API.
+
+Tendermint validates every transaction again in ``check_tx``, so the HTTP
+API may only validate what doesn't need the database and let ``check_tx``
+reject the rest, see the ``admission`` settings.
+"""
+
+import threading
+import time
+
+from planetmint.application.validator import Validator
+from planetmint.utils import metrics
+
+FULL = "full"
+STATELESS = "stateless"
+ADAPTIVE = "adaptive"
+MODES = (FULL, STATELESS, ADAPTIVE)
+
+# weight of the last full validation in the average latency
+LATENCY_SMOOTHING = 0.2
+
+
+class AdmissionControl:
+    """Validate transactions fully or statelessly, as the mode says.
+
+    In ``adaptive`` mode transactions are validated statelessly while the
+    average time of a full validation, mostly spent querying the database,
+    exceeds `latency_threshold` seconds, or while more than
+    `queue_threshold` transactions are being admitted by the process. One
+    transaction per `probe_interval` seconds is still fully validated to
+    keep measuring the latency.
+    """
+
+    def __init__(self, mode=FULL, latency_threshold=0.05, queue_threshold=16, probe_interval=1.0):
+        if mode not in MODES:
+            raise ValueError("the admission mode must be one of {}, not {!r}".format(", ".join(MODES), mode))
+        self.mode = mode
+        self.latency_threshold = latency_threshold
+        self.queue_threshold = queue_threshold
+        self.probe_interval = probe_interval
+        self.latency = 0.0
+        self.pending = 0
+        self._last_full = 0.0
+        self._lock = threading.Lock()
+        self._histograms = {
+            validation: metrics.histogram(
+                "planetmint_admission_seconds",
+                "Time to validate a transaction POSTed to the HTTP API",
+                {"validation": validation},
+            )
+            for validation in (FULL, STATELESS)
+        }
+        self._stateless_gauge = metrics.gauge(
+            "planetmint_admission_stateless", "Web server processes validating transactions statelessly"
+        )
+        self._pending_gauge = metrics.gauge("planetmint_admission_pending", "Transactions being admitted")
+
+    def _stateless(self):
+        if self.mode != ADAPTIVE:
+            return self.mode == STATELESS
+        overloaded = self.latency > self.latency_threshold or self.pending > self.queue_threshold
+        return overloaded and time.monotonic() - self._last_full < self.probe_interval
+
+    def validate(self, transaction, validator_class):
+        """Validate `transaction`, fully with a validator of the
+        `validator_class` pool, or statelessly.
+
+        Raises:
+            ValidationError: if the transaction is invalid.
+        """
+        with self._lock:
+            self.pending += 1
+            stateless = self._stateless()
+            if not stateless:
+                self._last_full = time.monotonic()
+        self._pending_gauge.inc()
+        self._stateless_gauge.set(int(stateless))
+        try:
+            if stateless:
+                with self._histograms[STATELESS].time():
+                    return Validator.validate_transaction_stateless(transaction)
+            with validator_class() as validator:
+                start = time.perf_counter()
+                try:
+                    return validator.validate_transaction(transaction)
+                finally:
+                    self._observe_full(time.perf_counter() - start)
+        finally:
+            with self._lock:
+                self.pending -= 1
+            self._pending_gauge.dec()
+
+    def _observe_full(self, seconds):
+        self._histograms[FULL].observe(seconds)
+        with self._lock:
+            self.latency += LATENCY_SMOOTHING * (seconds - self.latency)
+
+    def stats(self):
+        """Return the state of the admission control and the latency
+        histograms of both validations."""
+        with self._lock:
+            stats = {
+                "mode": self.mode,
+                "stateless": self._stateless(),
+                "pending": self.pending,
+                "latency": self.latency,
+            }
+        stats["histograms"] = {validation: histogram.snapshot() for validation, histogram in self._histograms.items()}
+        return stats
@@ -5,6 +5,7 @@
 
 """API routes definition"""
 from flask_restful import Api
+from planetmint.web.views.base import json_response
 from planetmint.web.views import (
     assets,
     metadata,
@@ -20,6 +21,7 @@ def add_routes(app):
     """Add the routes to an app"""
     for prefix, routes in API_SECTIONS:
         api = Api(app, prefix=prefix)
+        api.representation("application/json")(json_response)
         for (pattern, resource, *args), kwargs in routes:
             kwargs.setdefault("strict_slashes", False)
             api.add_resource(resource, pattern, *args, **kwargs)
@@ -38,6 +40,7 @@ ROUTES_API_V1 = [
     r("blocks/", blocks.BlockListApi),
     r("transactions/<string:tx_id>", tx.TransactionApi),
     r("transactions", tx.TransactionListApi),
+    r("transactions/batch", tx.TransactionBatchApi),
     r("outputs/", outputs.OutputListApi),
     r("validators/", validators.ValidatorsApi),
 ]
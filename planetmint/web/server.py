@@ -9,13 +9,19 @@ The application is implemented in Flask and runs using Gunicorn.
 """
 
 import copy
+import time
 from multiprocessing import cpu_count
 import gunicorn.app.base
 
-from flask import Flask
+from flask import Flask, g, request
 from flask_cors import CORS
-from planetmint.utils import processes
+from planetmint.config import Config
+from planetmint.utils import metrics, processes
+from planetmint.abci.rpc import ABCI_RPC
 from planetmint.application.validator import Validator
+from planetmint.backend import tracing
+from planetmint.backend.connection import release_connections
+from planetmint.web.admission import AdmissionControl
 from planetmint.web.routes import add_routes
 from planetmint.web.strip_content_type_middleware import StripContentTypeMiddleware
 
@@ -81,7 +87,51 @@ def create_app(*, debug=False, threads=1, planetmint_factory=None):
 
     app.debug = debug
 
-    app.config["validator_class_name"] = processes.pool(planetmint_factory, size=threads)
+    def validator_factory():
+        validator = planetmint_factory()
+        validator.models.enable_transaction_cache(Config().get()["cache"]["transactions"])
+        return validator
+
+    app.config["validator_class_name"] = processes.pool(validator_factory, size=threads)
+    # a requests session isn't thread safe, so every thread of the worker
+    # gets its own client, which reuses its connections to Tendermint
+    app.config["abci_rpc"] = processes.pool(ABCI_RPC, size=threads)
+    admission_config = Config().get()["admission"]
+    app.config["admission"] = AdmissionControl(
+        admission_config["mode"],
+        admission_config["latency_threshold"],
+        admission_config["queue_threshold"],
+        admission_config["probe_interval"],
+    )
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.before_request
+    def enter_tracing_scope():
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        g.tracing_scope = tracing.enter_scope("http {} {}".format(request.method, route))
+
+    @app.after_request
+    def observe_request_latency(response):
+        # streamed responses are timed until their first chunk
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.histogram(
+            "planetmint_http_request_seconds",
+            "Time to respond to an HTTP API request, by route",
+            {"method": request.method, "route": route},
+        ).observe(time.perf_counter() - g.request_start)
+        return response
+
+    @app.teardown_request
+    def exit_tracing_scope(exception):
+        if "tracing_scope" in g:
+            tracing.exit_scope(g.pop("tracing_scope"))
+
+    @app.teardown_request
+    def release_database_connections(exception):
+        release_connections()
 
     add_routes(app)
 
@@ -12,7 +12,8 @@ import logging
 from flask_restful import Resource, reqparse
 from flask import current_app
 from planetmint.backend.exceptions import OperationError
-from planetmint.web.views.base import make_error
+from planetmint.web.views import parameters
+from planetmint.web.views.base import make_error, stream_page
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +22,7 @@ class AssetListApi(Resource):
     def get(self, cid: str):
         parser = reqparse.RequestParser()
         parser.add_argument("limit", type=int)
+        parser.add_argument("cursor", type=parameters.valid_cursor, dest="after")
         args = parser.parse_args()
 
         if not args["limit"]:
@@ -28,11 +30,13 @@ class AssetListApi(Resource):
 
         validator_class = current_app.config["validator_class_name"]
 
-        with validator_class() as validator:
-            assets = validator.models.get_assets_by_cid(cid, **args)
+        def assets():
+            with validator_class() as validator:
+                page = validator.models.get_assets_by_cid(cid, **args)
+                yield page.after
+                yield from page
 
         try:
-            # This only works with MongoDB as the backend
-            return assets
+            return stream_page(assets())
         except OperationError as e:
             return make_error(400, "({}): {}".format(type(e).__name__, e))
@@ -6,8 +6,13 @@
 """Common classes and methods for API handlers"""
 import logging
 
-from flask import jsonify, request
+from itertools import chain
+from urllib.parse import urlencode
+
+from flask import Response, request, stream_with_context
 from planetmint.config import Config
+from planetmint.utils import serialization
+from planetmint.web.views.parameters import encode_cursor
 
 
 logger = logging.getLogger(__name__)
@@ -26,9 +31,80 @@ def make_error(status_code, message=None, level: str = "debug"):
     else:
         logger.debug("HTTP API error: %(status)s - %(method)s:%(path)s - %(message)s", request_info)
 
-    response = jsonify(response_content)
-    response.status_code = status_code
-    return response
+    return json_response(response_content, status_code)
+
+
+def json_response(data, status_code=200, headers=None):
+    """Return a response with `data` serialized to JSON, with the keys of
+    the objects sorted like ``flask.jsonify`` does."""
+    return Response(
+        serialization.dumps(data, sort_keys=True), status=status_code, headers=headers, mimetype="application/json"
+    )
+
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def next_page_headers(after):
+    """Return the headers linking to the page of results following the
+    index position `after`, if any."""
+    if after is None:
+        return {}
+    args = request.args.to_dict()
+    args["cursor"] = encode_cursor(after)
+    return {"Link": '<{}?{}>; rel="next"'.format(request.base_url, urlencode(args))}
+
+
+def stream_json(items, headers=None):
+    """Return a response sending the JSON serializable `items` while they
+    are produced, instead of serializing the whole list at once.
+
+    The items are sent as newline delimited JSON if the client prefers
+    ``application/x-ndjson``, otherwise as the elements of a JSON array.
+    The first item is produced before the response is returned, so that
+    errors of the underlying query can still be reported with an error
+    status code.
+
+    Args:
+        items (iterable): the items to send.
+        headers (dict): additional headers of the response.
+    """
+    items = iter(items)
+    try:
+        items = chain([next(items)], items)
+    except StopIteration:
+        pass
+
+    if request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+
+        def generate():
+            for item in items:
+                yield serialization.dumps(item) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE, headers=headers)
+
+    def generate():
+        yield "["
+        for index, item in enumerate(items):
+            yield ("," if index else "") + serialization.dumps(item)
+        yield "]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json", headers=headers)
+
+
+def stream_page(results):
+    """Stream a page of query results, see :func:`stream_json`.
+
+    Args:
+        results (iterator): the position after the page, as
+            :attr:`~planetmint.model.dataaccessor.Page.after`, followed by
+            the items of the page. Views yield the position first, so that
+            the query runs, with a validator checked out of the pool, in the
+            same generator that produces the items.
+    """
+    results = iter(results)
+    after = next(results)
+    return stream_json(results, headers=next_page_headers(after))
 
 
 def base_ws_uri():
@@ -5,8 +5,6 @@
 
 """API Index endpoint"""
 
-import flask
-
 from flask_restful import Resource
 from planetmint.web.views.base import base_ws_uri
 from planetmint import version
@@ -16,19 +14,17 @@ from planetmint.web.websocket_server import EVENTS_ENDPOINT, EVENTS_ENDPOINT_BLO
 class RootIndex(Resource):
     def get(self):
         docs_url = ["https://docs.planetmint.io/projects/server/en/v", version.__version__ + "/"]
-        return flask.jsonify(
-            {
-                "api": {"v1": get_api_v1_info("/api/v1/")},
-                "docs": "".join(docs_url),
-                "software": "Planetmint",
-                "version": version.__version__,
-            }
-        )
+        return {
+            "api": {"v1": get_api_v1_info("/api/v1/")},
+            "docs": "".join(docs_url),
+            "software": "Planetmint",
+            "version": version.__version__,
+        }
 
 
 class ApiV1Index(Resource):
     def get(self):
-        return flask.jsonify(get_api_v1_info("/"))
+        return get_api_v1_info("/")
 
 
 def get_api_v1_info(api_prefix):
@@ -12,7 +12,8 @@ import logging
 from flask_restful import reqparse, Resource
 from flask import current_app
 from planetmint.backend.exceptions import OperationError
-from planetmint.web.views.base import make_error
+from planetmint.web.views import parameters
+from planetmint.web.views.base import make_error, stream_page
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +30,7 @@ class MetadataApi(Resource):
         """
         parser = reqparse.RequestParser()
         parser.add_argument("limit", type=int)
+        parser.add_argument("cursor", type=parameters.valid_cursor, dest="after")
         args = parser.parse_args()
 
         if not args["limit"]:
@@ -36,10 +38,13 @@ class MetadataApi(Resource):
 
         validator_class = current_app.config["validator_class_name"]
 
-        with validator_class() as validator:
-            metadata = validator.models.get_metadata_by_cid(cid, **args)
+        def metadata():
+            with validator_class() as validator:
+                page = validator.models.get_metadata_by_cid(cid, **args)
+                yield page.after
+                yield from page
 
         try:
-            return metadata
+            return stream_page(metadata())
         except OperationError as e:
             return make_error(400, "({}): {}".format(type(e).__name__, e))
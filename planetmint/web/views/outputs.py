@@ -6,7 +6,7 @@
 from flask import current_app
 from flask_restful import reqparse, Resource
 from planetmint.web.views import parameters
-from planetmint.web.views.base import make_error
+from planetmint.web.views.base import make_error, next_page_headers
 
 
 class OutputListApi(Resource):
@@ -20,16 +20,26 @@ class OutputListApi(Resource):
         parser = reqparse.RequestParser()
         parser.add_argument("public_key", type=parameters.valid_ed25519, required=True)
         parser.add_argument("spent", type=parameters.valid_bool)
+        parser.add_argument("offset", type=parameters.valid_non_negative_int)
+        parser.add_argument("limit", type=parameters.valid_non_negative_int)
+        parser.add_argument("cursor", type=parameters.valid_cursor, dest="after")
         args = parser.parse_args(strict=True)
 
+        pagination = {key: args[key] for key in ("offset", "limit", "after") if args[key] is not None}
+
         validator_class = current_app.config["validator_class_name"]
         with validator_class() as validator:
             try:
-                outputs = validator.models.get_outputs_filtered(args["public_key"], args["spent"])
+                outputs = validator.models.get_outputs_filtered(args["public_key"], args["spent"], **pagination)
             except Exception as e:
                 return make_error(
                     500,
                     "Invalid output ({}): {} : {} - {}".format(type(e).__name__, e, args["public_key"], args["spent"]),
                     level="error",
                 )
-            return [{"transaction_id": output.transaction_id, "output_index": output.index} for output in outputs]
+            after = outputs[-1].id if args["limit"] and len(outputs) == args["limit"] else None
+            return (
+                [{"transaction_id": output.transaction_id, "output_index": output.index} for output in outputs],
+                200,
+                next_page_headers(after),
+            )
@@ -3,8 +3,12 @@
 # SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
 # Code is Apache-2.0 and docs are CC-BY-4.0
 
+import base64
+import binascii
 import re
 
+import rapidjson
+
 from transactions.common.transaction_mode_types import (
     BROADCAST_TX_COMMIT,
     BROADCAST_TX_ASYNC,
@@ -36,6 +40,13 @@ def valid_bool(val):
     raise ValueError('Boolean value must be "true" or "false" (lowercase)')
 
 
+def valid_non_negative_int(val):
+    val = int(val)
+    if val < 0:
+        raise ValueError("Value must be a non-negative integer")
+    return val
+
+
 def valid_ed25519(key):
     if re.match("^[1-9a-zA-Z]{43,44}$", key) and not re.match(".*[Il0O]", key):
         return key
@@ -59,3 +70,19 @@ def valid_mode(mode):
     if mode == "commit":
         return BROADCAST_TX_COMMIT
     raise ValueError('Mode must be "async", "sync" or "commit"')
+
+
+def encode_cursor(after):
+    """Return the opaque token clients pass as ``cursor`` to get the page
+    of results following the index position `after`."""
+    return base64.urlsafe_b64encode(rapidjson.dumps([after]).encode()).decode()
+
+
+def valid_cursor(cursor):
+    try:
+        (after,) = rapidjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(after, str):
+        raise ValueError("Invalid cursor")
+    return after
@@ -9,7 +9,7 @@ For more information please refer to the documentation: http://planetmint.io/htt
 """
 import logging
 
-from flask import current_app, request, jsonify
+from flask import current_app, request
 from flask_restful import Resource, reqparse
 from transactions.common.transaction import Transaction
 from transactions.common.transaction_mode_types import BROADCAST_TX_ASYNC
@@ -17,9 +17,13 @@ from transactions.common.exceptions import (
     SchemaValidationError,
     ValidationError,
 )
-from planetmint.abci.rpc import ABCI_RPC, MODE_COMMIT, MODE_LIST
+from planetmint.abci.rpc import MODE_COMMIT, MODE_LIST
+from planetmint.application.signatures import BlockSignatureVerifier
+from planetmint.application.validator import count_validation_failure
+from planetmint.config import Config
+from planetmint.utils import serialization
 from planetmint.web.views import parameters
-from planetmint.web.views.base import make_error
+from planetmint.web.views.base import NDJSON_MIMETYPE, json_response, make_error, stream_page
 
 logger = logging.getLogger(__name__)
 
@@ -51,11 +55,23 @@ class TransactionListApi(Resource):
         parser.add_argument("operation", type=parameters.valid_operation)
         parser.add_argument("asset_ids", type=parameters.valid_txid_list, required=True)
         parser.add_argument("last_tx", type=parameters.valid_bool, required=False)
+        parser.add_argument("cursor", type=parameters.valid_cursor, dest="after")
+        parser.add_argument("limit", type=parameters.valid_non_negative_int)
         args = parser.parse_args()
-        with current_app.config["validator_class_name"]() as validator:
-            txs = validator.models.get_transactions_filtered(**args)
+        pagination = {key: args.pop(key) for key in ("after", "limit")}
+        pagination = {key: value for key, value in pagination.items() if value is not None}
+        validator_class = current_app.config["validator_class_name"]
+
+        def transactions():
+            # the validator stays checked out of the pool until the response is sent
+            with validator_class() as validator:
+                txs = validator.models.get_transactions_filtered(**args, **pagination)
+                # only a limited list has a next page
+                yield txs.after if "limit" in pagination else None
+                for tx in txs:
+                    yield tx.to_dict()
 
-        return [tx.to_dict() for tx in txs]
+        return stream_page(transactions())
 
     def post(self):
         """API endpoint to push transactions to the Federation.
@@ -73,49 +89,192 @@ class TransactionListApi(Resource):
         # `force` will try to format the body of the POST request even if the
         # `content-type` header is not set to `application/json`
         tx = request.get_json(force=True)
-        try:
-            tx_obj = Transaction.from_dict(tx, False)
-        except SchemaValidationError as e:
-            return make_error(
-                400,
-                message="Invalid transaction schema: {}".format(e.__cause__.message),
-            )
-        except KeyError as e:
-            return make_error(400, "Invalid transaction ({}): {}".format(type(e).__name__, e))
-        except ValidationError as e:
-            return make_error(400, "Invalid transaction ({}): {}".format(type(e).__name__, e))
-        except Exception as e:
-            return make_error(500, "Invalid transaction ({}): {} - {}".format(type(e).__name__, e, tx), level="error")
+        tx_obj, error = transaction_from_dict(tx)
+        if error:
+            return make_transaction_error(*error)
 
-        with validator_class() as validator:
+        # fully, or without the database if the admission control says so
+        admission = current_app.config["admission"]
+        error = validation_error(tx_obj, tx, admission.validate, validator_class)
+        if error:
+            return make_transaction_error(*error)
+
+        abci_rpc_pool = current_app.config["abci_rpc"]
+        with abci_rpc_pool() as abci_rpc:
             try:
-                validator.validate_transaction(tx_obj)
-            except ValidationError as e:
-                return make_error(400, "Invalid transaction ({}): {}".format(type(e).__name__, e))
-            except Exception as e:
-                return make_error(
-                    500, "Invalid transaction ({}): {} : {}".format(type(e).__name__, e, tx), level="error"
+                status_code, message = abci_rpc.write_transaction(
+                    MODE_LIST, abci_rpc.tendermint_rpc_endpoint, MODE_COMMIT, tx_obj, mode
                 )
+            except Exception as e:
+                logger.error(f"Tendermint RPC connection issue: {e}")
+                status_code = 500
+                message = {"detail": "Tendermint RPC connection error"}
+
+        if status_code == 202:
+            return json_response(tx, 202)
+        else:
+            return make_error(status_code, message)
+
+
+class TransactionBatchApi(Resource):
+    def post(self):
+        """API endpoint to push a batch of transactions to the Federation.
+
+        The body is a JSON array of transactions, or one transaction per
+        line if the content type is ``application/x-ndjson``. Transactions
+        of the batch may spend the outputs of the previous ones.
+
+        The ``commit`` mode is rejected: Tendermint answers every
+        ``broadcast_tx_commit`` once its transaction is committed, so a batch
+        could take as many blocks as it has transactions and time out.
+        Clients post the batch with ``sync`` and then poll the transactions.
+
+        Return:
+            A ``list`` with the ``id``, ``status`` and ``message`` of every
+            transaction, ``status`` being the one of a single POST.
+        """
+        parser = reqparse.RequestParser()
+        parser.add_argument("mode", type=parameters.valid_mode, default=BROADCAST_TX_ASYNC)
+        args = parser.parse_args()
+        mode = str(args["mode"])
+        if mode == MODE_COMMIT:
+            return make_error(400, 'Batches can\'t be posted in "commit" mode, use "sync" and poll the transactions')
+
+        try:
+            if request.mimetype == NDJSON_MIMETYPE:
+                txs = [serialization.loads(line) for line in request.get_data().splitlines() if line.strip()]
             else:
-                if tx_obj.version != Transaction.__VERSION__:
-                    return make_error(
-                        401,
-                        "Invalid transaction version: The transaction is valid, \
-                            but this node only accepts transaction with higher \
-                            schema version number.",
-                    )
+                txs = serialization.loads(request.get_data())
+        except ValueError as e:
+            return make_error(400, "Invalid JSON: {}".format(e))
+        if not isinstance(txs, list):
+            return make_error(400, "The body must be a list of transactions")
+        max_batch_size = Config().get()["server"]["max_batch_size"]
+        if len(txs) > max_batch_size:
+            return make_error(413, "Batches are limited to {} transactions".format(max_batch_size))
+
+        results = [None] * len(txs)
+        tx_objs = {}
+        for index, tx in enumerate(txs):
+            tx_objs[index], results[index] = transaction_from_dict(tx)
+
+        validator_class = current_app.config["validator_class_name"]
+        with validator_class() as validator:
+            valid = self._validate(validator, txs, tx_objs, results)
+
+            abci_rpc_pool = current_app.config["abci_rpc"]
+            with abci_rpc_pool() as abci_rpc:
                 try:
-                    status_code, message = ABCI_RPC().write_transaction(
-                        MODE_LIST, ABCI_RPC().tendermint_rpc_endpoint, MODE_COMMIT, tx_obj, mode
+                    statuses = abci_rpc.write_transactions(
+                        MODE_LIST,
+                        abci_rpc.tendermint_rpc_endpoint,
+                        MODE_COMMIT,
+                        [tx_objs[index] for index in valid],
+                        mode,
                     )
                 except Exception as e:
                     logger.error(f"Tendermint RPC connection issue: {e}")
-                    status_code = 500
-                    message = {"detail": "Tendermint RPC connection error"}
+                    statuses = [(500, "Tendermint RPC connection error")] * len(valid)
+            for index, status in zip(valid, statuses):
+                results[index] = status
 
-        if status_code == 202:
-            response = jsonify(tx)
-            response.status_code = 202
-            return response
-        else:
-            return make_error(status_code, message)
+        return [
+            {
+                "id": tx_objs[index].id if tx_objs[index] else _submitted_id(txs[index]),
+                "status": status_code,
+                "message": message,
+            }
+            for index, (status_code, message) in enumerate(results)
+        ]
+
+    @staticmethod
+    def _validate(validator, txs, tx_objs, results):
+        """Validate the parsed transactions of the batch, with the ones
+        before them as current transactions, and record the errors in
+        `results`.
+
+        Returns:
+            list: the indexes of the valid transactions.
+        """
+        # the requests are served by threads already
+        verifier = BlockSignatureVerifier(Config().get()["validation"]["signature_batch_size"], threads=1)
+        candidates = [index for index, result in enumerate(results) if result is None]
+        # the ed25519 signatures are verified at once, if some are invalid
+        # the transactions are validated again without the invalid ones
+        deferred = True
+        while True:
+            valid, current_transactions = [], []
+            for index in candidates:
+                signatures = [] if deferred else None
+                results[index] = validate_transaction(
+                    validator, tx_objs[index], txs[index], current_transactions, signatures
+                )
+                if results[index] is None:
+                    valid.append(index)
+                    current_transactions.append(tx_objs[index])
+                    if deferred:
+                        verifier.add(index, signatures)
+            if not deferred:
+                return valid
+            invalid = verifier.verify()
+            if not invalid:
+                return valid
+            for index in invalid:
+                results[index] = (400, "Invalid transaction (InvalidSignature): Transaction signature is invalid.")
+            candidates = [index for index in valid if index not in invalid]
+            deferred = False
+
+
+def transaction_from_dict(tx):
+    """Return the transaction `tx` as a :class:`Transaction`, along with
+    ``None``, or ``None`` along with the status code and message of the
+    error."""
+    try:
+        return Transaction.from_dict(tx, False), None
+    except SchemaValidationError as e:
+        count_validation_failure(e)
+        return None, (400, "Invalid transaction schema: {}".format(e.__cause__.message))
+    except KeyError as e:
+        return None, (400, "Invalid transaction ({}): {}".format(type(e).__name__, e))
+    except ValidationError as e:
+        count_validation_failure(e)
+        return None, (400, "Invalid transaction ({}): {}".format(type(e).__name__, e))
+    except Exception as e:
+        return None, (500, "Invalid transaction ({}): {} - {}".format(type(e).__name__, e, tx))
+
+
+def validate_transaction(validator, tx_obj, tx, current_transactions=[], deferred_signatures=None):
+    """Return the status code and message of the error if `tx_obj` isn't
+    valid, ``None`` otherwise."""
+    return validation_error(
+        tx_obj, tx, validator.validate_transaction, current_transactions, deferred_signatures=deferred_signatures
+    )
+
+
+def validation_error(tx_obj, tx, validate, *args, **kwargs):
+    """Return the status code and message of the error if
+    ``validate(tx_obj, *args, **kwargs)`` raises, or if the version of
+    `tx_obj` isn't supported, ``None`` otherwise."""
+    try:
+        validate(tx_obj, *args, **kwargs)
+    except ValidationError as e:
+        count_validation_failure(e)
+        return (400, "Invalid transaction ({}): {}".format(type(e).__name__, e))
+    except Exception as e:
+        return (500, "Invalid transaction ({}): {} : {}".format(type(e).__name__, e, tx))
+    if tx_obj.version != Transaction.__VERSION__:
+        return (
+            401,
+            "Invalid transaction version: The transaction is valid, \
+                            but this node only accepts transaction with higher \
+                            schema version number.",
+        )
+    return None
+
+
+def _submitted_id(tx):
+    return tx.get("id") if isinstance(tx, dict) else None
+
+
+def make_transaction_error(status_code, message):
+    return make_error(status_code, message, level="error" if status_code == 500 else "debug")
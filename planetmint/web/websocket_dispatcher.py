@@ -3,12 +3,12 @@
 # SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
 # Code is Apache-2.0 and docs are CC-BY-4.0
 
-import json
 import logging
 import asyncio
 
 from planetmint.ipc.events import EventTypes
 from planetmint.ipc.events import POISON_PILL
+from planetmint.utils import serialization
 from planetmint.utils.python import is_above_py39
 
 logger = logging.getLogger(__name__)
@@ -98,9 +98,9 @@ class Dispatcher:
                 str_buffer.append(event)
             elif event.type == EventTypes.BLOCK_VALID:
                 if self.type == "tx":
-                    str_buffer = map(json.dumps, self.eventify_block(event.data))
+                    str_buffer = map(serialization.dumps, self.eventify_block(event.data))
                 elif self.type == "blk":
-                    str_buffer = [json.dumps(self.simplified_block(event.data))]
+                    str_buffer = [serialization.dumps(self.simplified_block(event.data))]
                 else:
                     return
 
@@ -0,0 +1,92 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Compare storing the transactions of a block one insert at a time with
+:meth:`planetmint.model.dataaccessor.DataAccessor.store_bulk_transactions`,
+which stores them with a single call to Tarantool.
+
+Every block holds CREATE transactions and the TRANSFER spending each of them,
+so the utxo set is updated too.
+
+The benchmark needs the Tarantool of the Planetmint configuration. It DROPS
+the database and initializes it again before each run, so don't point it at
+the database of a node.
+
+Usage:
+    python scripts/benchmark_bulk_store.py --blocks 20 --transactions 1000
+"""
+
+import argparse
+import time
+
+from transactions.common.crypto import generate_key_pair
+from transactions.types.assets.create import Create
+from transactions.types.assets.transfer import Transfer
+
+from planetmint import backend
+from planetmint.application.validator import Validator
+from planetmint.backend import schema
+from planetmint.backend.tarantool.const import TARANT_TABLE_TRANSACTION
+
+
+def generate_blocks(blocks, transactions):
+    alice = generate_key_pair()
+    generated = []
+    for _ in range(blocks):
+        block = []
+        for _ in range(transactions // 2):
+            create_tx = Create.generate([alice.public_key], [([alice.public_key], 1)]).sign([alice.private_key])
+            transfer_tx = Transfer.generate(
+                create_tx.to_inputs(), [([alice.public_key], 1)], asset_ids=[create_tx.id]
+            ).sign([alice.private_key])
+            block.extend((create_tx, transfer_tx))
+        generated.append(block)
+    return generated
+
+
+def reset_database(models):
+    schema.drop_database(models.connection)
+    schema.init_database(models.connection)
+    models.invalidate_caches()
+
+
+def per_transaction(models, blocks):
+    # what store_bulk_transactions did before it called the Lua procedure
+    for block in blocks:
+        txns = [tx.to_dict() for tx in block]
+        backend.query.store_transactions(models.connection, txns, TARANT_TABLE_TRANSACTION)
+        for transaction in txns:
+            models.update_utxoset(transaction)
+
+
+def per_block(models, blocks):
+    for block in blocks:
+        models.store_bulk_transactions(block)
+
+
+def rate(function, count, *args):
+    started = time.perf_counter()
+    function(*args)
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=20, help="number of blocks")
+    parser.add_argument("--transactions", type=int, default=1000, help="transactions per block")
+    args = parser.parse_args()
+
+    models = Validator().models
+    blocks = generate_blocks(args.blocks, args.transactions)
+    count = sum(len(block) for block in blocks)
+
+    reset_database(models)
+    print(f"per transaction: {rate(per_transaction, count, models, blocks):.0f} transactions/s")
+    reset_database(models)
+    print(f"per block: {rate(per_block, count, models, blocks):.0f} transactions/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Compare the verification of the signatures of single input transfers one
+transaction at a time with the block level verification of
+:class:`planetmint.application.signatures.BlockSignatureVerifier`.
+
+The block level figure only applies to ``--experimental-parallel-validation``,
+the serial ``deliver_tx`` verifies signatures one transaction at a time.
+
+Usage:
+    python scripts/benchmark_signatures.py --transactions 2000 --threads 1
+"""
+
+import argparse
+import time
+
+from transactions.common.crypto import generate_key_pair
+from transactions.types.assets.create import Create
+from transactions.types.assets.transfer import Transfer
+
+from planetmint.application.signatures import BlockSignatureVerifier, collect_signatures
+
+
+def generate_transfers(count):
+    alice = generate_key_pair()
+    transfers = []
+    for _ in range(count):
+        create_tx = Create.generate([alice.public_key], [([alice.public_key], 1)]).sign([alice.private_key])
+        transfer_tx = Transfer.generate(create_tx.to_inputs(), [([alice.public_key], 1)], asset_ids=[create_tx.id])
+        transfers.append((transfer_tx.sign([alice.private_key]), create_tx.outputs))
+    return transfers
+
+
+def per_transaction(transfers):
+    for transfer_tx, input_conditions in transfers:
+        assert transfer_tx.inputs_valid(input_conditions)
+
+
+def per_block(transfers, batch_size, threads):
+    verifier = BlockSignatureVerifier(batch_size, threads)
+    for index, (transfer_tx, input_conditions) in enumerate(transfers):
+        verifier.add(index, collect_signatures(transfer_tx, input_conditions))
+    assert verifier.verify() == set()
+
+
+def rate(function, count, *args):
+    started = time.perf_counter()
+    function(*args)
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=2000, help="number of single input transfers")
+    parser.add_argument("--batch-size", type=int, default=64, help="signatures per batch")
+    parser.add_argument("--threads", type=int, default=1, help="threads verifying the batches")
+    args = parser.parse_args()
+
+    transfers = generate_transfers(args.transactions)
+    print(f"per transaction: {rate(per_transaction, args.transactions, transfers):.0f} verifications/s")
+    print(
+        f"per block ({args.threads} threads): "
+        f"{rate(per_block, args.transactions, transfers, args.batch_size, args.threads):.0f} verifications/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
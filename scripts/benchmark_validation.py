@@ -0,0 +1,114 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+"""Compare the block throughput of the serial
+:class:`planetmint.abci.application_logic.ApplicationLogic` with the one of
+:class:`planetmint.abci.parallel_validation.ParallelValidationApp`.
+
+Every block holds CREATE transactions and the TRANSFER spending each of them,
+so the dependency scheduling of the parallel validation is exercised. A block
+goes through begin_block, deliver_tx, end_block and commit.
+
+The benchmark needs the Tarantool of the Planetmint configuration. It DROPS
+the database and initializes it again before each run, so don't point it at
+the database of a node.
+
+Usage:
+    python scripts/benchmark_validation.py --blocks 20 --transactions 1000 --workers 4
+"""
+
+import argparse
+import os
+import time
+
+from tendermint.abci import types_pb2 as types
+from tendermint.crypto import keys_pb2
+from transactions.common.crypto import generate_key_pair
+from transactions.common.utils import serialize
+from transactions.types.assets.create import Create
+from transactions.types.assets.transfer import Transfer
+
+from planetmint.abci.application_logic import ApplicationLogic
+from planetmint.abci.parallel_validation import ParallelValidationApp
+from planetmint.application.validator import Validator
+from planetmint.backend import schema
+from planetmint.config import Config
+from planetmint.config_utils import autoconfigure
+
+
+def generate_blocks(blocks, transactions):
+    alice = generate_key_pair()
+    generated = []
+    for _ in range(blocks):
+        block = []
+        for _ in range(transactions // 2):
+            create_tx = Create.generate([alice.public_key], [([alice.public_key], 1)]).sign([alice.private_key])
+            transfer_tx = Transfer.generate(
+                create_tx.to_inputs(), [([alice.public_key], 1)], asset_ids=[create_tx.id]
+            ).sign([alice.private_key])
+            block.extend(serialize(tx.to_dict()).encode("utf8") for tx in (create_tx, transfer_tx))
+        generated.append(block)
+    return generated
+
+
+def reset_database(validator):
+    schema.drop_database(validator.models.connection)
+    schema.init_database(validator.models.connection)
+    validator.models.invalidate_caches()
+
+
+def init_chain(app):
+    validator = types.ValidatorUpdate(power=10, pub_key=keys_pb2.PublicKey(ed25519=os.urandom(32)))
+    app.init_chain(types.RequestInitChain(chain_id="benchmark", validators=[validator]))
+
+
+def run_blocks(app, blocks):
+    for height, block in enumerate(blocks, start=1):
+        app.begin_block(types.RequestBeginBlock())
+        for raw_transaction in block:
+            app.deliver_tx(raw_transaction)
+        app.end_block(types.RequestEndBlock(height=height))
+        assert len(app.block_txn_ids) == len(block), "a transaction of the block was rejected"
+        app.commit()
+
+
+def rate(function, count, *args):
+    started = time.perf_counter()
+    function(*args)
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=20, help="number of blocks")
+    parser.add_argument("--transactions", type=int, default=1000, help="transactions per block")
+    parser.add_argument("--workers", type=int, default=None, help="validation workers, the number of CPUs if unset")
+    args = parser.parse_args()
+
+    autoconfigure()
+    Config().get()["validation"]["workers"] = args.workers
+    validator = Validator()
+    blocks = generate_blocks(args.blocks, args.transactions)
+    count = sum(len(block) for block in blocks)
+
+    reset_database(validator)
+    app = ApplicationLogic(validator=validator)
+    init_chain(app)
+    print(f"serial: {rate(run_blocks, count, app, blocks):.0f} transactions/s")
+
+    reset_database(validator)
+    app = ParallelValidationApp(validator)
+    init_chain(app)
+    try:
+        print(
+            f"parallel ({app.parallel_validator.number_of_workers} workers): "
+            f"{rate(run_blocks, count, app, blocks):.0f} transactions/s"
+        )
+    finally:
+        app.parallel_validator.stop()
+
+
+if __name__ == "__main__":
+    main()
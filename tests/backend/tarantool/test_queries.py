@@ -47,6 +47,88 @@ def test_get_owned_ids(signed_create_tx, user_pk, db_conn):
     assert owned_tx == tx_dict
 
 
+def test_get_complete_transactions_by_ids(signed_create_tx, signed_transfer_tx, db_conn):
+    from planetmint.backend.tarantool.sync_io import query
+
+    query.store_transactions(
+        connection=db_conn, signed_transactions=[signed_create_tx.to_dict(), signed_transfer_tx.to_dict()]
+    )
+
+    txs = query.get_complete_transactions_by_ids(
+        connection=db_conn, txids=[signed_transfer_tx.id, "missing", signed_create_tx.id]
+    )
+    assert [tx.to_dict() for tx in txs] == [signed_transfer_tx.to_dict(), signed_create_tx.to_dict()]
+    assert query.get_complete_transactions_by_ids(connection=db_conn, txids=[]) == []
+
+
+def test_get_spending_transaction_ids(signed_create_tx, signed_transfer_tx, db_conn):
+    from planetmint.backend.tarantool.sync_io import query
+
+    query.store_transactions(connection=db_conn, signed_transactions=[signed_create_tx.to_dict()])
+    links = [(signed_create_tx.id, 0), (signed_transfer_tx.id, 0)]
+    assert query.get_spending_transaction_ids(connection=db_conn, links=links) == []
+
+    query.store_transactions(connection=db_conn, signed_transactions=[signed_transfer_tx.to_dict()])
+    spending = query.get_spending_transaction_ids(connection=db_conn, links=links)
+    assert spending == [(signed_create_tx.id, 0, signed_transfer_tx.id)]
+
+
+def test_pipeline_runs_selects_in_one_call(signed_create_tx, signed_transfer_tx, user_pk, db_conn, mocker):
+    from planetmint.backend.tarantool.sync_io import query
+
+    query.store_transactions(
+        connection=db_conn, signed_transactions=[signed_create_tx.to_dict(), signed_transfer_tx.to_dict()]
+    )
+
+    call = mocker.spy(db_conn.connect(), "call")
+    pipeline = db_conn.pipeline()
+    pipeline.select("transactions", signed_create_tx.id)
+    pipeline.select("outputs", user_pk, index="public_keys", limit=1)
+    pipeline.select("transactions", "missing")
+    by_id, by_owner, missing = pipeline.execute()
+    assert call.call_count == 1
+    assert [tx[0] for tx in by_id] == [signed_create_tx.id]
+    assert len(by_owner) == 1
+    assert missing == []
+
+
+def test_get_outputs_filtered(signed_create_tx, signed_transfer_tx, user_pk, db_conn):
+    from planetmint.backend.tarantool.sync_io import query
+
+    query.store_bulk_transactions(db_conn, [signed_create_tx.to_dict(), signed_transfer_tx.to_dict()], [])
+
+    def txids(**kwargs):
+        return [output.transaction_id for output in query.get_outputs_filtered(db_conn, user_pk, **kwargs)]
+
+    assert sorted(txids()) == sorted([signed_create_tx.id, signed_transfer_tx.id])
+    assert txids(spent=True) == [signed_create_tx.id]
+    assert txids(spent=False) == [signed_transfer_tx.id]
+    assert txids(spent=True, offset=1) == []
+    assert len(txids(limit=1)) == 1
+    assert txids(limit=1) + txids(offset=1, limit=1) == txids()
+
+
+def test_get_outputs_filtered_pages_after_an_output(alice, bob, db_conn):
+    from transactions.types.assets.create import Create
+    from planetmint.backend.tarantool.sync_io import query
+
+    # the outputs of both owners are indexed under both public keys
+    owners = [alice.public_key, bob.public_key]
+    tx = Create.generate([alice.public_key], [(owners, 1)] * 3).sign([alice.private_key])
+    query.store_bulk_transactions(db_conn, [tx.to_dict()], [])
+
+    for public_key in owners:
+        page, after = [], None
+        while True:
+            outputs = query.get_outputs_filtered(db_conn, public_key, limit=1, after=after)
+            if not outputs:
+                break
+            page.extend(outputs)
+            after = outputs[-1].id
+        assert sorted(output.index for output in page) == [0, 1, 2]
+        assert [output.id for output in page] == sorted(output.id for output in page)
+
+
 def test_store_block(db_conn):
     from planetmint.abci.block import Block
     from planetmint.backend.tarantool.sync_io import query
@@ -70,6 +152,17 @@ def test_get_block(db_conn):
     assert block["height"] == 3
 
 
+def test_get_latest_block(db_conn):
+    from planetmint.abci.block import Block
+    from planetmint.backend.tarantool.sync_io import query
+
+    assert query.get_latest_block(connection=db_conn) is None
+    for height in (2, 10, 3):
+        query.store_block(connection=db_conn, block=Block(app_hash="", height=height, transactions=[])._asdict())
+
+    assert query.get_latest_block(connection=db_conn)["height"] == 10
+
+
 def test_store_pre_commit_state(db_conn):
     from planetmint.backend.tarantool.sync_io import query
 
@@ -20,3 +20,87 @@ def test_get_connection_raises_a_configuration_error_mongodb(monkeypatch):
 
     with pytest.raises(ConnectionError):
         conn = LocalMongoDBConnection("localhost", "1337", "mydb", "password")
+
+
+class FakeConnection:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.closed = False
+
+    def ping(self, notime=False):
+        if not self.healthy:
+            raise OSError("connection lost")
+
+    def close(self):
+        self.closed = True
+
+
+def test_connection_pool_hands_out_one_connection_per_thread():
+    import threading
+    from planetmint.backend.tarantool.sync_io.pool import ConnectionPool
+
+    pool = ConnectionPool(FakeConnection, size=2, timeout=0.1)
+    connection = pool.acquire()
+    assert pool.acquire() is connection
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool.acquire()))
+    thread.start()
+    thread.join()
+    assert other[0] is not connection
+    del other, thread
+
+    # the finished thread gave its connection back
+    assert pool.stats() == {
+        "size": 2,
+        "created": 2,
+        "in_use": 1,
+        "idle": 1,
+        "checkouts": 2,
+        "waits": 0,
+        "reconnects": 0,
+    }
+
+    pool.release()
+    assert pool.stats()["in_use"] == 0
+    pool.close()
+    assert connection.closed
+
+
+def test_connection_pool_raises_when_exhausted():
+    import threading
+    from planetmint.backend.exceptions import ConnectionError
+    from planetmint.backend.tarantool.sync_io.pool import ConnectionPool
+
+    pool = ConnectionPool(FakeConnection, size=1, timeout=0.01)
+    pool.acquire()
+
+    errors = []
+
+    def acquire():
+        try:
+            pool.acquire()
+        except ConnectionError as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    thread.join()
+    assert len(errors) == 1
+    assert pool.stats()["waits"] == 1
+    assert pool.stats()["in_use"] == 1
+
+
+def test_connection_pool_replaces_broken_connections():
+    from planetmint.backend.tarantool.sync_io.pool import ConnectionPool
+
+    pool = ConnectionPool(FakeConnection, size=1, health_check_interval=0)
+    broken = pool.acquire()
+    broken.healthy = False
+    pool.release()
+
+    connection = pool.acquire()
+    assert connection is not broken
+    assert broken.closed
+    assert pool.stats()["reconnects"] == 1
+    assert pool.stats()["created"] == 1
@@ -81,3 +81,73 @@ def test_module_dispatch_errors_on_non_dispatchable_func(mock_module):
         @mock_dispatch(str)
         def dispatched():
             pass
+
+
+def test_module_dispatch_traces_queries(mock_module):
+    from planetmint.backend import tracing
+    from planetmint.backend.utils import module_dispatch_registrar
+
+    @singledispatch
+    def get_items(connection, ids):
+        pass
+
+    @singledispatch
+    def get_item(connection, item_id):
+        pass
+
+    mock_module.get_items = get_items
+    mock_module.get_item = get_item
+    mock_dispatch = module_dispatch_registrar(mock_module)
+
+    @mock_dispatch(str)
+    def get_items(connection, ids):
+        return [get_item(connection, item_id) for item_id in ids]
+
+    @mock_dispatch(str)
+    def get_item(connection, item_id):
+        tracing.round_trip()
+        return {"id": item_id}
+
+    mock_module.get_items("connection", ["a", "b"])
+    assert tracing.top() == []
+
+    tracing.enable()
+    try:
+        for _ in range(2):
+            with tracing.scope("http GET /items"):
+                mock_module.get_items("connection", ["a", "b", "c"])
+        queries = {query["operation"]: query for query in tracing.top(sort="calls")}
+    finally:
+        tracing.disable()
+        tracing.reset()
+
+    assert queries["get_items"]["calls"] == 2
+    assert queries["get_items"]["rows"] == 6
+    assert queries["get_items"]["round_trips"] == 6
+    assert queries["get_item"]["calls"] == 6
+    assert queries["get_item"]["calls_per_scope"] == 3
+    assert queries["get_item"]["scope"] == "http GET /items"
+
+
+def test_tracing_top_merges_the_queries_of_other_processes(tmp_path, monkeypatch):
+    import json
+    import os
+    from planetmint.backend import tracing
+    from planetmint.utils import metrics
+
+    monkeypatch.setattr(metrics, "_directory", str(tmp_path))
+    shared = {"operations": [["abci deliver_tx", "get_assets", 3, 0.5, 3, 3]], "scopes": [["abci deliver_tx", 3]]}
+    (tmp_path / "{}.json".format(os.getppid())).write_text(json.dumps({"metrics": [], "shared": {"tracing": shared}}))
+
+    tracing.enable()
+    try:
+        with tracing.scope("abci deliver_tx"):
+            tracing.traced(lambda: [])()
+        queries = {query["operation"]: query for query in tracing.top()}
+    finally:
+        tracing.disable()
+        tracing.reset()
+
+    assert queries["get_assets"]["calls"] == 3
+    assert queries["get_assets"]["calls_per_scope"] == 0.75
+    assert queries["<lambda>"]["calls"] == 1
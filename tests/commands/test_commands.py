@@ -391,6 +391,41 @@ def test_recover_db_on_start(mock_rollback, mock_start, mocked_setup_logging):
     assert mock_start.called
 
 
+def test_split_deployment_starts_both_metrics_servers(mocker):
+    from planetmint import start
+    from planetmint.utils import metrics
+
+    servers = []
+    start_http_server = metrics.start_http_server
+
+    def record(*args):
+        servers.append(start_http_server(*args))
+        return servers[-1]
+
+    mocker.patch.object(metrics, "start_http_server", side_effect=record)
+    mocker.patch("planetmint.start.server.create_server")
+    mocker.patch("planetmint.start.Process")
+    mocker.patch("planetmint.start.Exchange")
+    mocker.patch("planetmint.start.ApplicationLogic")
+    mocker.patch("planetmint.start.setproctitle")
+    mocker.patch("abci.server.ABCIServer")
+
+    try:
+        # `planetmint start --web-api-only` and `--abci-only` on the same
+        # host, with the default configuration
+        start.start_web_api(Namespace(web_api_only=True))
+        start.start_abci_server(Namespace(experimental_parallel_validation=False))
+        assert len(servers) == 2
+        assert servers[0].server_address[1] != servers[1].server_address[1]
+
+        # a port already in use doesn't stop the node
+        assert start.start_metrics_server() is None
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+
 @pytest.mark.bdb
 def test_run_recover(b, alice, bob, test_models):
     from transactions.types.assets.create import Create
@@ -302,6 +302,76 @@ def test_deliver_transfer_tx__double_spend_fails(b, init_chain_request):
     assert result.code == CodeTypeError
 
 
+def test_deliver_tx_reuses_check_tx_verdict(mocker, b, init_chain_request):
+    app = ApplicationLogic(validator=b)
+    app.init_chain(init_chain_request)
+
+    alice = generate_key_pair()
+    bob = generate_key_pair()
+
+    tx = Create.generate([alice.public_key], [([alice.public_key], 1)]).sign([alice.private_key])
+    b.models.store_bulk_transactions([tx])
+    tx_transfer = Transfer.generate(tx.to_inputs(), [([bob.public_key], 1)], asset_ids=[tx.id]).sign(
+        [alice.private_key]
+    )
+
+    from planetmint.application.validator import Validator
+
+    validate_input_conditions = mocker.spy(Validator, "validate_input_conditions")
+    assert app.check_tx(encode_tx_to_bytes(tx_transfer)).code == OkCode
+    assert validate_input_conditions.call_count == 1
+
+    app.begin_block(types.RequestBeginBlock())
+    assert app.deliver_tx(encode_tx_to_bytes(tx_transfer)).code == OkCode
+    assert validate_input_conditions.call_count == 1
+    assert app.block_txn_ids == [tx_transfer.id]
+
+    # the state is still checked: delivering the transaction again is a
+    # double spend
+    assert app.deliver_tx(encode_tx_to_bytes(tx_transfer)).code == CodeTypeError
+    assert app.block_txn_ids == [tx_transfer.id]
+
+
+def test_end_block_drops_transactions_with_invalid_signatures(b, init_chain_request):
+    app = ApplicationLogic(validator=b)
+    app.init_chain(init_chain_request)
+
+    alice = generate_key_pair()
+    bob = generate_key_pair()
+    carly = generate_key_pair()
+
+    tx = Create.generate([alice.public_key], [([alice.public_key], 1)]).sign([alice.private_key])
+    b.models.store_bulk_transactions([tx])
+    to_bob = Transfer.generate(tx.to_inputs(), [([bob.public_key], 1)], asset_ids=[tx.id]).sign([alice.private_key])
+    to_carly = Transfer.generate(tx.to_inputs(), [([carly.public_key], 1)], asset_ids=[tx.id]).sign(
+        [alice.private_key]
+    )
+    # the fulfillment of `to_bob` doesn't sign `to_carly`
+    forged = to_carly.to_dict()
+    forged["inputs"][0]["fulfillment"] = to_bob.to_dict()["inputs"][0]["fulfillment"]
+
+    app.begin_block(types.RequestBeginBlock())
+    # without parallel validation, signatures are verified in `deliver_tx`
+    assert app.deliver_tx(json.dumps(forged).encode("utf8")).code == CodeTypeError
+    assert app.deliver_tx(encode_tx_to_bytes(to_bob)).code == OkCode
+    assert app.block_txn_ids == [to_bob.id]
+
+    # the parallel validation defers them to `end_block`, as a worker would
+    app.begin_block(types.RequestBeginBlock())
+    signatures = []
+    transaction = b.is_valid_transaction(forged, [], deferred_signatures=signatures)
+    assert transaction
+    app.signature_verifier.add(0, signatures)
+    app.delivered_transactions = [(forged, True), (to_bob.to_dict(), False)]
+    app.block_txn_ids = [transaction.id]
+    app.block_transactions = [transaction]
+    app.end_block(types.RequestEndBlock(height=99))
+
+    # without the forged transaction, `to_bob` is not a double spend anymore
+    assert app.block_txn_ids == [to_bob.id]
+    assert query.get_pre_commit_state(b.models.connection)["transactions"] == [to_bob.id]
+
+
 def test_end_block_return_validator_updates(b, init_chain_request):
     app = ApplicationLogic(validator=b)
     app.init_chain(init_chain_request)
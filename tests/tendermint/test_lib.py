@@ -98,7 +98,7 @@ def test_validation_error(b):
     assert not b.validate_transaction(tx)
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_write_and_post_transaction(mock_post, b, test_abci_rpc):
     from transactions.common.crypto import generate_key_pair
     from planetmint.abci.utils import encode_transaction
@@ -120,7 +120,7 @@ def test_write_and_post_transaction(mock_post, b, test_abci_rpc):
     assert encoded_tx == kwargs["json"]["params"]
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 @pytest.mark.parametrize("mode", [BROADCAST_TX_SYNC, BROADCAST_TX_ASYNC, BROADCAST_TX_COMMIT])
 def test_post_transaction_valid_modes(mock_post, b, mode, test_abci_rpc):
     from transactions.common.crypto import generate_key_pair
@@ -149,6 +149,78 @@ def test_post_transaction_invalid_mode(b, test_abci_rpc):
         test_abci_rpc.write_transaction(MODE_LIST, test_abci_rpc.tendermint_rpc_endpoint, MODE_COMMIT, tx, "nope")
 
 
+def batch_transactions(count):
+    from transactions.common.crypto import generate_key_pair
+
+    alice = generate_key_pair()
+    return [
+        Create.generate([alice.public_key], [([alice.public_key], 1)], metadata=multihash(marshal({"n": n}))).sign(
+            [alice.private_key]
+        )
+        for n in range(count)
+    ]
+
+
+def batch_reply(payload):
+    # answered in reverse order, the second transaction is rejected
+    return [
+        {"jsonrpc": "2.0", "id": request["id"], "result": {"code": 1 if index == 1 else 0}}
+        for index, request in reversed(list(enumerate(payload)))
+    ]
+
+
+@patch("requests.Session.post")
+def test_write_transactions_in_a_batch(mock_post, test_abci_rpc):
+    from unittest.mock import Mock
+    from planetmint.abci.utils import decode_transaction_base64
+
+    mock_post.side_effect = lambda endpoint, json: Mock(json=Mock(return_value=batch_reply(json)))
+    txs = batch_transactions(3)
+
+    results = test_abci_rpc.write_transactions(
+        MODE_LIST, test_abci_rpc.tendermint_rpc_endpoint, MODE_COMMIT, txs, BROADCAST_TX_ASYNC
+    )
+
+    assert results == [(202, ""), (500, "Transaction validation failed"), (202, "")]
+    # a single round trip
+    assert mock_post.call_count == 1
+    payload = mock_post.call_args[1]["json"]
+    assert [request["method"] for request in payload] == [BROADCAST_TX_ASYNC] * 3
+    assert [decode_transaction_base64(request["params"][0]) for request in payload] == [tx.to_dict() for tx in txs]
+
+
+async def test_async_abci_rpc_writes_transactions():
+    from aiohttp import web
+    from planetmint.abci.rpc import AsyncABCI_RPC
+
+    async def handle(request):
+        payload = await request.json()
+        if isinstance(payload, list):
+            return web.json_response(batch_reply(payload))
+        return web.json_response({"jsonrpc": "2.0", "id": payload["id"], "result": {"code": 0}})
+
+    app = web.Application()
+    app.router.add_post("/", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "localhost", 0)
+    await site.start()
+    endpoint = "http://localhost:{}/".format(runner.addresses[0][1])
+
+    abci_rpc = AsyncABCI_RPC()
+    try:
+        txs = batch_transactions(3)
+        assert await abci_rpc.write_transaction(MODE_LIST, endpoint, MODE_COMMIT, txs[0], BROADCAST_TX_SYNC) == (
+            202,
+            "",
+        )
+        results = await abci_rpc.write_transactions(MODE_LIST, endpoint, MODE_COMMIT, txs, BROADCAST_TX_ASYNC)
+        assert results == [(202, ""), (500, "Transaction validation failed"), (202, "")]
+    finally:
+        await abci_rpc.close()
+        await runner.cleanup()
+
+
 @pytest.mark.bdb
 def test_update_utxoset(b, signed_create_tx, signed_transfer_tx, db_conn):
     b.models.update_utxoset(signed_create_tx.to_dict())
@@ -166,22 +238,45 @@ def test_update_utxoset(b, signed_create_tx, signed_transfer_tx, db_conn):
 
 @pytest.mark.bdb
 def test_store_transaction(mocker, b, signed_create_tx, signed_transfer_tx):
-    mocked_store_transaction = mocker.patch("planetmint.backend.query.store_transactions")
+    mocked_store_transaction = mocker.patch("planetmint.backend.query.store_bulk_transactions")
     b.models.store_bulk_transactions([signed_create_tx])
-    mocked_store_transaction.assert_any_call(b.models.connection, [signed_create_tx.to_dict()], "transactions")
+    mocked_store_transaction.assert_any_call(b.models.connection, [signed_create_tx.to_dict()], [])
     mocked_store_transaction.reset_mock()
     b.models.store_bulk_transactions([signed_transfer_tx])
 
 
 @pytest.mark.bdb
 def test_store_bulk_transaction(mocker, b, signed_create_tx, signed_transfer_tx):
-    mocked_store_transactions = mocker.patch("planetmint.backend.query.store_transactions")
+    mocked_store_transactions = mocker.patch("planetmint.backend.query.store_bulk_transactions")
     b.models.store_bulk_transactions((signed_create_tx,))
-    mocked_store_transactions.assert_any_call(b.models.connection, [signed_create_tx.to_dict()], "transactions")
+    mocked_store_transactions.assert_any_call(b.models.connection, [signed_create_tx.to_dict()], [])
     mocked_store_transactions.reset_mock()
     b.models.store_bulk_transactions((signed_transfer_tx,))
 
 
+@pytest.mark.bdb
+def test_store_bulk_transactions_updates_utxoset(b, signed_create_tx, signed_transfer_tx):
+    b.models.store_bulk_transactions([signed_create_tx, signed_transfer_tx])
+
+    utxos = b.models.connection.get_space("utxos").select().data
+    assert [(utxo[5], utxo[4]) for utxo in utxos] == [(signed_transfer_tx.id, 0)]
+    assert b.models.get_transaction(signed_create_tx.id).to_dict() == signed_create_tx.to_dict()
+    assert b.models.get_transaction(signed_transfer_tx.id).to_dict() == signed_transfer_tx.to_dict()
+
+
+@pytest.mark.bdb
+def test_store_bulk_transactions_is_atomic(b, signed_create_tx, signed_transfer_tx):
+    from planetmint.exceptions import CriticalDoubleSpend
+
+    b.models.store_bulk_transactions([signed_create_tx])
+    with pytest.raises(CriticalDoubleSpend):
+        b.models.store_bulk_transactions([signed_transfer_tx, signed_create_tx])
+
+    assert b.models.get_transaction(signed_transfer_tx.id) is None
+    utxos = b.models.connection.get_space("utxos").select().data
+    assert [(utxo[5], utxo[4]) for utxo in utxos] == [(signed_create_tx.id, 0)]
+
+
 @pytest.mark.bdb
 def test_delete_zero_unspent_outputs(b, alice):
     from planetmint.backend.tarantool.sync_io import query
@@ -291,6 +386,40 @@ def test_get_spending_transaction_double_spend(b, alice, bob, carol):
         b.models.get_spending_transaction(tx.id, tx_transfer.inputs[0].fulfills.output, [double_spend])
 
 
+@pytest.mark.bdb
+def test_get_input_txs_and_conditions_with_resolved_inputs(b, alice, bob):
+    from transactions.common.exceptions import DoubleSpend
+
+    tx = Create.generate([alice.public_key], [([alice.public_key], 1), ([alice.public_key], 2)]).sign(
+        [alice.private_key]
+    )
+    b.models.store_bulk_transactions([tx])
+
+    transfer_0 = Transfer.generate([tx.to_inputs()[0]], [([bob.public_key], 1)], asset_ids=[tx.id]).sign(
+        [alice.private_key]
+    )
+    transfer_1 = Transfer.generate([tx.to_inputs()[1]], [([bob.public_key], 2)], asset_ids=[tx.id]).sign(
+        [alice.private_key]
+    )
+
+    # resolve the inputs of the whole block at once
+    resolved_inputs = b.models.resolve_inputs(transfer_0.inputs + transfer_1.inputs)
+    assert list(resolved_inputs[0].keys()) == [tx.id]
+    assert not resolved_inputs[1]
+
+    input_txs, input_conditions = b.models.get_input_txs_and_conditions(
+        transfer_1.inputs, [transfer_0], resolved_inputs
+    )
+    assert [input_tx.id for input_tx in input_txs] == [tx.id]
+    assert [(condition.transaction_id, condition.index, condition.amount) for condition in input_conditions] == [
+        (tx.id, 1, 2)
+    ]
+
+    b.models.store_bulk_transactions([transfer_1])
+    with pytest.raises(DoubleSpend):
+        b.models.get_input_txs_and_conditions(transfer_1.inputs)
+
+
 def test_validation_with_transaction_buffer(b):
     from transactions.common.crypto import generate_key_pair
 
@@ -364,3 +493,116 @@ def test_get_spent_key_order(b, user_pk, user_sk, user2_pk, user2_sk):
 
     with pytest.raises(DoubleSpend):
         b.validate_transaction(tx3)
+
+
+@pytest.mark.bdb
+def test_transaction_cache_is_invalidated_on_delete(b, signed_create_tx, signed_transfer_tx):
+    b.models.enable_transaction_cache(10)
+    try:
+        b.models.store_bulk_transactions([signed_create_tx, signed_transfer_tx])
+        assert b.models.get_transaction(signed_create_tx.id).to_dict() == signed_create_tx.to_dict()
+        assert b.models.is_committed(signed_create_tx.id)
+        assert [output.amount for output in b.models.get_outputs_by_tx_id(signed_create_tx.id)] == [1]
+        assert b.models.transaction_cache.stats()["hits"] == 2
+
+        b.models.delete_transactions([signed_create_tx.id])
+        assert not b.models.is_committed(signed_create_tx.id)
+        assert [tx.id for tx in b.models.get_transactions([signed_create_tx.id, signed_transfer_tx.id])] == [
+            signed_transfer_tx.id
+        ]
+    finally:
+        b.models.enable_transaction_cache(0)
+
+
+@pytest.mark.bdb
+def test_transaction_cache_is_cleared_on_rollback(b, signed_create_tx):
+    b.models.enable_transaction_cache(10)
+    try:
+        b.models.store_block(Block(app_hash="", height=1, transactions=[])._asdict())
+        b.models.store_bulk_transactions([signed_create_tx])
+        b.models.store_pre_commit_state({"height": 2, "transactions": [signed_create_tx.id]})
+        assert b.models.get_transaction(signed_create_tx.id)
+
+        b.rollback()
+        assert len(b.models.transaction_cache) == 0
+        assert not b.models.get_transaction(signed_create_tx.id)
+    finally:
+        b.models.enable_transaction_cache(0)
+
+
+@pytest.mark.bdb
+def test_committed_filter_short_circuits_is_committed(
+    mocker, b, alice, signed_create_tx, signed_transfer_tx, tmp_path
+):
+    from planetmint.abci.block import Block
+
+    path = str(tmp_path / "committed_txids")
+    b.models.store_bulk_transactions([signed_create_tx])
+    b.models.enable_committed_filter(100, 0.001, path, save_interval=1)
+    try:
+        assert b.models.is_committed(signed_create_tx.id)
+
+        b.models.store_bulk_transactions([signed_transfer_tx])
+        b.models.store_block(Block(app_hash="", height=1, transactions=[signed_transfer_tx.id])._asdict())
+        b.models.committed_filter = None
+        assert b.models.get_committed_filter().count == 2
+
+        # blocks committed after the filter was saved are caught up on load
+        tx = Create.generate([alice.public_key], [([alice.public_key], 1)]).sign([alice.private_key])
+        b.models.committed_filter = None
+        b.models.store_bulk_transactions([tx])
+        b.models.store_block(Block(app_hash="", height=2, transactions=[tx.id])._asdict())
+        assert b.models.get_committed_filter().count == 3
+        assert tx.id in b.models.get_committed_filter()
+
+        # a filter saved by another chain is rebuilt instead
+        b.models.get_committed_filter().save(path, 2, "other-chain:")
+        b.models.committed_filter = None
+        build_committed_filter = mocker.spy(b.models, "_build_committed_filter")
+        assert b.models.get_committed_filter().count == 3
+        assert build_committed_filter.call_count == 1
+
+        get_transaction = mocker.spy(b.models, "get_transaction")
+        assert not b.models.is_committed("0" * 64)
+        assert get_transaction.call_count == 0
+        assert b.models.is_committed(signed_transfer_tx.id)
+    finally:
+        b.models.committed_filter_settings = None
+        b.models.committed_filter = None
+
+
+@pytest.mark.bdb
+def test_chain_state_serves_lookups_from_memory(mocker, b):
+    from planetmint.abci.block import Block
+
+    b.models.store_block(Block(app_hash="first", height=1, transactions=[])._asdict())
+    b.models.store_validator_set(1, [{"voting_power": 1}])
+    b.models.store_validator_set(5, [{"voting_power": 5}])
+    b.models.store_abci_chain(0, "chain-X")
+    b.models.enable_chain_state()
+    try:
+        b.models.load_chain_state()
+        get_latest_block = mocker.spy(backend.query, "get_latest_block")
+        get_validator_set = mocker.spy(backend.query, "get_validator_set")
+        get_latest_abci_chain = mocker.spy(backend.query, "get_latest_abci_chain")
+
+        b.models.store_block(Block(app_hash="second", height=2, transactions=["a" * 64])._asdict())
+        assert b.models.get_latest_block() == {"app_hash": "second", "height": 2, "transaction_ids": ["a" * 64]}
+        assert b.models.get_validator_set()["height"] == 5
+        assert b.models.get_validator_set(4)["height"] == 1
+        assert b.models.get_validator_set(0) is None
+        assert b.models.get_latest_abci_chain()["chain_id"] == "chain-X"
+        assert get_latest_block.call_count == 0
+        assert get_validator_set.call_count == 0
+        assert get_latest_abci_chain.call_count == 0
+
+        # validator sets and chains are reloaded after a change
+        b.models.store_validator_set(9, [{"voting_power": 9}])
+        assert b.models.get_validators() == [{"voting_power": 9}]
+        assert b.models.get_validator_set(4)["height"] == 1
+        b.models.delete_validator_set(9)
+        assert b.models.get_validator_set()["height"] == 5
+        b.models.store_abci_chain(3, "chain-X-migrated-at-height-2", False)
+        assert b.models.get_latest_abci_chain()["is_synced"] is False
+    finally:
+        b.models.chain_state = None
@@ -14,10 +14,12 @@ def test_encode_decode_transaction(b):
     from planetmint.abci.utils import decode_transaction
     from planetmint.abci.utils import encode_transaction
 
-    asset = {"value": "key"}
+    asset = {"value": "key", "id": "é"}
 
     encode_tx = encode_transaction(asset)
-    new_encode_tx = base64.b64encode(json.dumps(asset).encode("utf8")).decode("utf8")
+    new_encode_tx = base64.b64encode(
+        json.dumps(asset, separators=(",", ":"), ensure_ascii=False, sort_keys=True).encode("utf8")
+    ).decode("utf8")
 
     assert encode_tx == new_encode_tx
 
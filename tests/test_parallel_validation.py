@@ -24,8 +24,18 @@ def generate_create_and_transfer(keypair=None):
 
 
 def test_validation_worker_process_multiple_transactions(b):
-    import multiprocessing as mp
-    from planetmint.abci.parallel_validation import ValidationWorker, RESET, EXIT
+    from json import dumps
+    from planetmint.utils.ring_buffer import RingBuffer
+    from planetmint.abci.parallel_validation import (
+        ValidationWorker,
+        RESET,
+        EXIT,
+        VALID,
+        INVALID,
+        MALFORMED,
+        pack_transaction,
+        unpack_verdict,
+    )
 
     keypair = generate_key_pair()
     create_tx, transfer_tx = generate_create_and_transfer(keypair)
@@ -33,39 +43,81 @@ def test_validation_worker_process_multiple_transactions(b):
         create_tx.to_inputs(), [([keypair.public_key], 10)], asset_ids=[create_tx.id]
     ).sign([keypair.private_key])
 
-    in_queue, results_queue = mp.Queue(), mp.Queue()
-    vw = ValidationWorker(in_queue, results_queue)
+    in_buffer, results_buffer = RingBuffer(64 * 1024), RingBuffer(64 * 1024)
+    vw = ValidationWorker(in_buffer, results_buffer)
+
+    def put(index, transaction):
+        in_buffer.put(pack_transaction(index, dumps(transaction.to_dict()).encode("utf8")))
 
     # Note: in the following instructions, the worker will encounter two
     # `RESET` messages, and an `EXIT` message. When a worker processes a
     # `RESET` message, it forgets all transactions it has validated. This allow
     # us to re-validate the same transactions. This won't happen in real life,
     # but it's quite handy to check if the worker actually forgot about the
-    # past transactions (if not, it will return `False` because the
+    # past transactions (if not, it will return `INVALID` because the
     # transactions look like a double spend).
     # `EXIT` makes the worker to stop the infinite loop.
-    in_queue.put((0, create_tx.to_dict()))
-    in_queue.put((10, transfer_tx.to_dict()))
-    in_queue.put((20, double_spend.to_dict()))
-    in_queue.put(RESET)
-    in_queue.put((0, create_tx.to_dict()))
-    in_queue.put((5, transfer_tx.to_dict()))
-    in_queue.put(RESET)
-    in_queue.put((20, create_tx.to_dict()))
-    in_queue.put((25, double_spend.to_dict()))
-    in_queue.put((30, transfer_tx.to_dict()))
-    in_queue.put(EXIT)
+    put(0, create_tx)
+    put(10, transfer_tx)
+    put(20, double_spend)
+    in_buffer.put(RESET)
+    put(0, create_tx)
+    put(5, transfer_tx)
+    in_buffer.put(RESET)
+    put(20, create_tx)
+    put(25, double_spend)
+    put(30, transfer_tx)
+    in_buffer.put(pack_transaction(35, b"not a transaction"))
+    in_buffer.put(EXIT)
 
     vw.run()
 
-    assert results_queue.get() == (0, create_tx)
-    assert results_queue.get() == (10, transfer_tx)
-    assert results_queue.get() == (20, False)
-    assert results_queue.get() == (0, create_tx)
-    assert results_queue.get() == (5, transfer_tx)
-    assert results_queue.get() == (20, create_tx)
-    assert results_queue.get() == (25, double_spend)
-    assert results_queue.get() == (30, False)
+    def result():
+        index, verdict, signatures = unpack_verdict(results_buffer.get())
+        return index, verdict
+
+    assert result() == (0, VALID)
+    assert result() == (10, VALID)
+    assert result() == (20, INVALID)
+    assert result() == (0, VALID)
+    assert result() == (5, VALID)
+    assert result() == (20, VALID)
+    assert result() == (25, VALID)
+    assert result() == (30, INVALID)
+    assert result() == (35, MALFORMED)
+
+    in_buffer.close()
+    results_buffer.close()
+
+
+def test_verdicts_carry_the_signatures_to_verify():
+    from planetmint.abci.parallel_validation import VALID, pack_verdict, unpack_verdict
+
+    signatures = [(bytes([1]) * 32, bytes([2]) * 32, bytes([3]) * 64), (bytes(32), bytes(32), bytes(64))]
+    assert unpack_verdict(pack_verdict(7, VALID, signatures)) == (7, VALID, signatures)
+
+
+def test_dependency_components():
+    from planetmint.abci.parallel_validation import dependency_components
+
+    def spend(txid, output_index=0):
+        return {"fulfills": {"transaction_id": txid, "output_index": output_index}}
+
+    transactions = [
+        {"id": "a", "inputs": [{"fulfills": None}]},
+        {"id": "b", "inputs": [spend("committed", 0)]},
+        {"id": "c", "inputs": [spend("a")]},
+        {"id": "d", "inputs": [spend("committed", 0)]},
+        {"id": "e", "inputs": [spend("committed", 1)]},
+        {"id": "a", "inputs": [{"fulfills": None}]},
+        {"id": "f", "inputs": [spend("c"), spend("e")]},
+        "not a transaction",
+    ]
+
+    components = sorted(dependency_components(transactions))
+    # `a`, its duplicate, `c` spending `a`, `f` spending `c` and `e` are
+    # dependent, `b` and `d` are a double spend of the same committed output
+    assert components == [[0, 2, 4, 5, 6], [1, 3], [7]]
 
 
 def test_parallel_validator_routes_transactions_correctly(b, monkeypatch):
@@ -73,7 +125,7 @@ def test_parallel_validator_routes_transactions_correctly(b, monkeypatch):
     from collections import defaultdict
     import multiprocessing as mp
     from json import dumps
-    from planetmint.abci.parallel_validation import ParallelValidator
+    from planetmint.abci.parallel_validation import ParallelValidator, VALID
 
     # We want to make sure that the load is distributed across all workers.
     # Since introspection on an object running on a different process is
@@ -85,14 +137,23 @@ def test_parallel_validator_routes_transactions_correctly(b, monkeypatch):
     # the PID of its worker to the designated queue.
     def validate(self, dict_transaction):
         validation_called_by.put((os.getpid(), dict_transaction["id"]))
-        return dict_transaction
+        return dict_transaction, []
 
     monkeypatch.setattr("planetmint.abci.parallel_validation.ValidationWorker.validate", validate)
 
-    # Transaction routing uses the `id` of the transaction. This test strips
-    # down a transaction to just its `id`. We have two workers, so even ids
-    # will be processed by one worker, odd ids by the other.
-    transactions = [{"id": "0"}, {"id": "1"}, {"id": "2"}, {"id": "3"}]
+    # Transaction routing follows the dependencies between transactions. This
+    # test strips down transactions to their `id` and `inputs`. Transactions
+    # `2` and `3` spend outputs of `0` and `1`, so we expect two components,
+    # one per worker: `0` and `2` on one side, `1` and `3` on the other.
+    def spend(txid):
+        return [{"fulfills": {"transaction_id": txid, "output_index": 0}}]
+
+    transactions = [
+        {"id": "0", "inputs": []},
+        {"id": "1", "inputs": []},
+        {"id": "2", "inputs": spend("0")},
+        {"id": "3", "inputs": spend("1")},
+    ]
 
     pv = ParallelValidator(number_of_workers=2)
     pv.start()
@@ -107,7 +168,7 @@ def test_parallel_validator_routes_transactions_correctly(b, monkeypatch):
         for transaction in transactions:
             pv.validate(dumps(transaction).encode("utf8"))
 
-        assert pv.result(timeout=1) == transactions
+        assert pv.result(timeout=1) == [(transaction, VALID, []) for transaction in transactions]
 
         # Now we analize the transaction processed by the workers
         worker_to_transactions = defaultdict(list)
@@ -115,17 +176,38 @@ def test_parallel_validator_routes_transactions_correctly(b, monkeypatch):
             worker_pid, transaction_id = validation_called_by.get()
             worker_to_transactions[worker_pid].append(transaction_id)
 
-        # The transactions are stored in two buckets.
-        for _, transaction_ids in worker_to_transactions.items():
-            assert len(transaction_ids) == 2
-
-            # We have two workers, hence we have two different routes for
-            # transactions. We have the route for even transactions, and the
-            # route for odd transactions. Since we don't know which worker
-            # processed what, we test that the transactions processed by a
-            # worker are all even or all odd.
-            assert all(filter(lambda x: int(x) % 2 == 0, transaction_ids)) or all(
-                filter(lambda x: int(x) % 2 == 1, transaction_ids)
-            )
+        # Every worker validated one component, in block order.
+        assert sorted(worker_to_transactions.values()) == [["0", "2"], ["1", "3"]]
 
     pv.stop()
+
+
+def test_parallel_validator_auto_tunes_active_workers():
+    from planetmint.abci.parallel_validation import ParallelValidator
+
+    pv = ParallelValidator(number_of_workers=4, buffer_size=1024, auto_tune=True, transactions_per_worker=10)
+    try:
+        assert pv.active_workers == 4
+        pv.tune(5)
+        assert pv.active_workers == 1
+        pv.tune(45)
+        # the average of the recent blocks is 25 transactions
+        assert pv.active_workers == 3
+        for _ in range(10):
+            pv.tune(1000)
+        assert pv.active_workers == 4
+
+        from planetmint.utils import metrics
+
+        exported = metrics.render().splitlines()
+        assert "planetmint_validation_active_workers 4" in exported
+        assert 'planetmint_validation_worker_transactions_total{worker="3"} 0' in exported
+
+        pv.tune(0)
+        pv.active_workers = 2
+        transactions = [{"id": str(i), "inputs": []} for i in range(6)]
+        assert sorted(set(pv.schedule(transactions))) == [0, 1]
+        assert pv.stats()["active_workers"] == 2
+    finally:
+        for buffer in pv.routing_buffers + pv.results_buffers:
+            buffer.close()
@@ -3,6 +3,7 @@
 # SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
 # Code is Apache-2.0 and docs are CC-BY-4.0
 
+import json
 import queue
 import pytest
 
@@ -167,3 +168,227 @@ def test_process_set_title():
     process = Process(target=lambda: queue.put(getproctitle()), name=uuid)
     process.start()
     assert queue.get() == uuid
+
+
+def test_lru_cache_evicts_least_recently_used_entry():
+    from planetmint.utils.lru_cache import LRUCache
+
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    assert cache.stats() == {"size": 2, "entries": 2, "hits": 2, "misses": 1}
+
+    assert cache.pop("a") == 1
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 0
+
+
+def test_bloom_filter_has_no_false_negatives_and_survives_save(tmp_path):
+    from planetmint.utils.bloom_filter import BloomFilter
+
+    bloom_filter = BloomFilter(1000, 0.01)
+    keys = [f"key-{i}" for i in range(1000)]
+    bloom_filter.update(keys)
+    assert all(key in bloom_filter for key in keys)
+    assert sum(f"other-{i}" in bloom_filter for i in range(1000)) < 50
+    assert not bloom_filter.is_full
+
+    path = str(tmp_path / "bloom")
+    bloom_filter.save(path, 42, "chain:hash")
+    loaded, height, tag = BloomFilter.load(path)
+    assert height == 42
+    assert tag == "chain:hash"
+    assert loaded.count == 1000
+    assert all(key in loaded for key in keys)
+
+    with open(path, "r+b") as f:
+        f.truncate(10)
+    assert BloomFilter.load(path) == (None, None, None)
+    assert BloomFilter.load(str(tmp_path / "missing")) == (None, None, None)
+
+
+def test_ring_buffer_passes_messages_between_processes():
+    import multiprocessing as mp
+    import queue
+    from planetmint.utils.ring_buffer import RingBuffer
+
+    def echo(in_buffer, out_buffer):
+        while True:
+            message = in_buffer.get()
+            out_buffer.put(message[::-1])
+            if not message:
+                return
+
+    in_buffer, out_buffer = RingBuffer(64), RingBuffer(64)
+    try:
+        in_buffer.put(b"a" * 40)
+        with pytest.raises(queue.Full):
+            in_buffer.put(b"b" * 40, block=False)
+        with pytest.raises(ValueError):
+            in_buffer.put(b"c" * 61)
+        assert in_buffer.get() == b"a" * 40
+        with pytest.raises(queue.Empty):
+            in_buffer.get(timeout=0.01)
+
+        # messages larger than the free space wrap around the end of the buffer
+        process = mp.Process(target=echo, args=(in_buffer, out_buffer))
+        process.start()
+        messages = [bytes([i]) * (i % 50 + 1) for i in range(200)] + [b""]
+        for message in messages:
+            in_buffer.put(message)
+            assert out_buffer.get(timeout=5) == message[::-1]
+        process.join()
+    finally:
+        in_buffer.close()
+        out_buffer.close()
+
+
+@pytest.mark.parametrize("backend", ["json", "rapidjson", "orjson"])
+def test_serialization_backends_agree(backend):
+    from planetmint.utils import serialization
+
+    if backend == "orjson":
+        pytest.importorskip("orjson")
+
+    value = {"id": "a" * 64, "amount": "1", "keys": ["é", None, True], "height": 2**40}
+    serialization.use(backend)
+    try:
+        assert serialization.backend() == backend
+        assert serialization.dumps(value) == json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+        assert serialization.dumps(value, sort_keys=True) == json.dumps(
+            value, separators=(",", ":"), ensure_ascii=False, sort_keys=True
+        )
+        assert serialization.loads(serialization.dumps(value)) == value
+        assert serialization.loads(serialization.dumps(value).encode()) == value
+    finally:
+        serialization.use(serialization.DEFAULT_BACKEND)
+
+    with pytest.raises(ValueError):
+        serialization.use("yaml")
+
+
+def test_histogram():
+    from planetmint.utils import metrics
+
+    histogram = metrics.Histogram("test_seconds", "Test", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.snapshot() == {"count": 4, "sum": 2.65, "buckets": [[0.1, 2], [1.0, 3]]}
+    assert metrics.histogram("test_seconds", "Test", {"stage": "a"}) is metrics.histogram(
+        "test_seconds", "Test", {"stage": "a"}
+    )
+    assert metrics.histogram("test_seconds", "Test", {"stage": "a"}) is not metrics.histogram("test_seconds", "Test")
+
+
+def test_metrics_render_prometheus_text_format():
+    from planetmint.utils import metrics
+
+    metrics.counter("test_failures_total", "Test failures", {"error": 'Bad "quote"'}).inc(2)
+    metrics.histogram("test_render_seconds", "Test", buckets=(0.5,)).observe(0.25)
+
+    lines = metrics.render().splitlines()
+    assert "# TYPE test_failures_total counter" in lines
+    assert 'test_failures_total{error="Bad \\"quote\\""} 2' in lines
+    assert "# TYPE test_render_seconds histogram" in lines
+    assert 'test_render_seconds_bucket{le="0.5"} 1' in lines
+    assert 'test_render_seconds_bucket{le="+Inf"} 1' in lines
+    assert "test_render_seconds_sum 0.25" in lines
+    assert "test_render_seconds_count 1" in lines
+
+    with pytest.raises(ValueError):
+        metrics.histogram("test_failures_total", "Test")
+
+
+def test_metrics_gauge_and_function():
+    from planetmint.utils import metrics
+
+    gauge = metrics.gauge("test_in_use", "Test")
+    gauge.inc(3)
+    gauge.dec()
+    assert gauge.snapshot() == 2
+    gauge.set(5)
+    assert "test_in_use 5" in metrics.render().splitlines()
+
+    stats = {"checkouts": 7}
+    metrics.counter("test_checkouts_total", "Test").set_function(lambda: stats["checkouts"])
+    stats["checkouts"] += 1
+    lines = metrics.render().splitlines()
+    assert "# TYPE test_in_use gauge" in lines
+    assert "test_checkouts_total 8" in lines
+
+
+def test_metrics_shared_between_processes(tmp_path, monkeypatch):
+    import json
+    import os
+    from planetmint.utils import metrics
+
+    shared = metrics.counter("test_shared_total", "Test")
+    shared.inc(2)
+    metrics.gauge("test_shared_in_use", "Test").set(1)
+
+    # a forked process starts from zero
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if shared.snapshot() == 0 else 1)
+    assert os.waitpid(pid, 0)[1] == 0
+
+    monkeypatch.setattr(metrics, "_directory", str(tmp_path))
+    metrics._dump()
+    snapshot = (tmp_path / "{}.json".format(os.getpid())).read_text()
+    # the same metrics, from a live process and from two dead ones (above
+    # the largest pid)
+    (tmp_path / "{}.json".format(os.getppid())).write_text(snapshot)
+    for pid in (2**22 + 1, 2**22 + 2):
+        (tmp_path / "{}.json".format(pid)).write_text(snapshot)
+    assert set(json.loads(snapshot)) == {"metrics", "shared"}
+
+    for _ in range(2):
+        lines = metrics.render().splitlines()
+        assert "test_shared_total 8" in lines
+        # the gauges of the dead processes are dropped
+        assert "test_shared_in_use 2" in lines
+    # the files of the dead processes are folded into one
+    assert not (tmp_path / "{}.json".format(2**22 + 1)).exists()
+    assert (tmp_path / "exited.json").exists()
+
+
+def test_metrics_temporary_directory_removed_at_exit(monkeypatch):
+    import os
+    from planetmint.utils import metrics
+
+    exit_handlers = []
+    monkeypatch.setattr(metrics, "_start_writer", lambda: None)
+    monkeypatch.setattr(metrics.atexit, "register", lambda *args: exit_handlers.append(args))
+    monkeypatch.setattr(metrics, "_directory", None)
+    metrics.enable_multiprocess()
+
+    directory = metrics._directory
+    assert os.path.isdir(directory)
+    for function, *args in exit_handlers:
+        function(*args)
+    assert not os.path.exists(directory)
+
+
+def test_metrics_server_serves_the_tracing_page():
+    import requests
+    from planetmint.start import tracing_page
+    from planetmint.utils import metrics
+
+    metrics.counter("test_served_total", "Test").inc()
+    server = metrics.start_http_server("localhost", 0, {"/tracing": tracing_page})
+    try:
+        url = "http://localhost:{}".format(server.server_address[1])
+        assert "test_served_total 1" in requests.get(url + "/metrics").text.splitlines()
+        assert set(requests.get(url + "/tracing", params={"top": 5}).json()) == {"enabled", "queries"}
+        assert requests.get(url + "/tracing", params={"sort": "size"}).status_code == 400
+    finally:
+        server.shutdown()
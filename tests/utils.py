@@ -35,8 +35,11 @@ def flush_localmongo_db(connection, dbname):
 
 @flush_db.register(TarantoolDBConnection)
 def flush_tarantool_db(connection, dbname):
+    from planetmint.model.dataaccessor import DataAccessor
+
     connection.connect().call("drop")
     connection.connect().call("init")
+    DataAccessor().invalidate_caches()
 
 
 def generate_block(planet, test_abci_rpc):
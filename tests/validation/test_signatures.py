@@ -0,0 +1,50 @@
+# Copyright © 2020 Interplanetary Database Association e.V.,
+# Planetmint and IPDB software contributors.
+# SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
+# Code is Apache-2.0 and docs are CC-BY-4.0
+
+import pytest
+
+from transactions.common.crypto import generate_key_pair
+from transactions.common.exceptions import InvalidSignature
+from transactions.types.assets.create import Create
+from transactions.types.assets.transfer import Transfer
+
+
+def generate_transfer():
+    alice = generate_key_pair()
+    create_tx = Create.generate([alice.public_key], [([alice.public_key], 1)]).sign([alice.private_key])
+    transfer_tx = Transfer.generate(create_tx.to_inputs(), [([alice.public_key], 1)], asset_ids=[create_tx.id])
+    return create_tx, transfer_tx.sign([alice.private_key])
+
+
+def test_collect_signatures():
+    from planetmint.application.signatures import collect_signatures, verify_batch
+
+    create_tx, transfer_tx = generate_transfer()
+    signatures = collect_signatures(transfer_tx, create_tx.outputs)
+    assert len(signatures) == 1
+    assert verify_batch(signatures) == set()
+    assert verify_batch([signatures[0][:2] + (bytes(64),)] + signatures) == {0}
+
+    other_create_tx, _ = generate_transfer()
+    with pytest.raises(InvalidSignature):
+        # the fulfillment doesn't match the spent condition
+        collect_signatures(transfer_tx, other_create_tx.outputs)
+
+
+@pytest.mark.parametrize("threads", [1, 2])
+def test_block_signature_verifier_finds_invalid_transactions(threads):
+    from planetmint.application.signatures import BlockSignatureVerifier, collect_signatures
+
+    verifier = BlockSignatureVerifier(batch_size=2, threads=threads)
+    for index in range(7):
+        create_tx, transfer_tx = generate_transfer()
+        public_key, message, signature = collect_signatures(transfer_tx, create_tx.outputs)[0]
+        if index in (1, 5):
+            signature = bytes(64)
+        verifier.add(index, [(public_key, message, signature)])
+
+    assert verifier.verify() == {1, 5}
+    # the verified signatures are dropped
+    assert verifier.verify() == set()
@@ -39,3 +39,26 @@ def test_get_assets_tendermint_limit(client, b, alice, bob):
     assert res.status_code == 200
     assert len(res.json) == 1
     assert res.json[0] == {"data": assets[0]["data"]}
+
+
+@pytest.mark.bdb
+def test_get_assets_tendermint_cursor(client, b, alice, bob):
+    # create assets
+    assets = [{"data": multihash(marshal({"msg": "abc"}))}]
+    txs = [
+        Create.generate([user.public_key], [([user.public_key], 1)], assets=assets).sign([user.private_key])
+        for user in (alice, bob, alice)
+    ]
+
+    b.models.store_bulk_transactions(txs)
+
+    res = client.get(ASSETS_ENDPOINT + assets[0]["data"] + "?limit=2")
+    assert res.status_code == 200
+    assert len(res.json) == 2
+    next_url, rel = res.headers["Link"].split("; ")
+    assert rel == 'rel="next"'
+
+    res = client.get(next_url.strip("<>"))
+    assert res.status_code == 200
+    assert res.json == [{"data": assets[0]["data"]}]
+    assert "Link" not in res.headers
@@ -3,6 +3,8 @@
 # SPDX-License-Identifier: (Apache-2.0 AND CC-BY-4.0)
 # Code is Apache-2.0 and docs are CC-BY-4.0
 
+import pytest
+
 from unittest import mock
 
 
@@ -48,3 +50,9 @@ def test_api_v1_endpoint(client, wsserver_base_url):
     }
     res = client.get("/api/v1")
     assert res.json == api_v1_info
+
+
+@pytest.mark.parametrize("path", ["/metrics", "/tracing", "/api/v1/admission"])
+def test_operator_endpoints_are_not_public(client, path):
+    # served by the metrics server only, see `planetmint.start.start_metrics_server`
+    assert client.get(path).status_code == 404
@@ -54,6 +54,51 @@ def test_get_outputs_endpoint_spent(client, user_pk):
     gof.assert_called_once_with(user_pk, True)
 
 
+def test_get_outputs_endpoint_paginated(client, user_pk):
+    m = MagicMock()
+    m.transaction_id = "a"
+    m.index = 0
+    with patch("planetmint.model.dataaccessor.DataAccessor.get_outputs_filtered") as gof:
+        gof.return_value = [m]
+        params = "?spent=true&public_key={}&offset=10&limit=5".format(user_pk)
+        res = client.get(OUTPUTS_ENDPOINT + params)
+    assert res.json == [{"transaction_id": "a", "output_index": 0}]
+    assert res.status_code == 200
+    gof.assert_called_once_with(user_pk, True, offset=10, limit=5)
+
+    res = client.get(OUTPUTS_ENDPOINT + "?public_key={}&limit=-1".format(user_pk))
+    assert res.status_code == 400
+
+
+def test_get_outputs_endpoint_cursor(client, user_pk):
+    from urllib.parse import parse_qs, urlparse
+    from planetmint.web.views.parameters import encode_cursor, valid_cursor
+
+    m = MagicMock()
+    m.id = "b"
+    m.transaction_id = "a"
+    m.index = 0
+    with patch("planetmint.model.dataaccessor.DataAccessor.get_outputs_filtered") as gof:
+        gof.return_value = [m, m]
+        params = "?public_key={}&limit=2&cursor={}".format(user_pk, encode_cursor("c"))
+        res = client.get(OUTPUTS_ENDPOINT + params)
+        assert res.status_code == 200
+        gof.assert_called_once_with(user_pk, None, limit=2, after="c")
+        # the next page starts after the last output of this one
+        url, rel = res.headers["Link"].split("; ")
+        assert rel == 'rel="next"'
+        query = parse_qs(urlparse(url.strip("<>")).query)
+        assert valid_cursor(query["cursor"][0]) == "b"
+        assert query["limit"] == ["2"]
+
+        gof.return_value = [m]
+        res = client.get(OUTPUTS_ENDPOINT + params)
+        assert "Link" not in res.headers
+
+    res = client.get(OUTPUTS_ENDPOINT + "?public_key={}&cursor=abc".format(user_pk))
+    assert res.status_code == 400
+
+
 @pytest.mark.bdb
 @pytest.mark.userfixtures("inputs")
 def test_get_outputs_endpoint_without_public_key(client):
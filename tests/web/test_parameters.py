@@ -81,3 +81,14 @@ def test_valid_operation():
         valid_operation("blah")
     with pytest.raises(ValueError):
         valid_operation("")
+
+
+def test_valid_cursor():
+    from planetmint.web.views.parameters import encode_cursor, valid_cursor
+
+    after = "18ac3e7343f016890c510e93f935261169d9e3f565436429830faf0934f4f8e4"
+    assert valid_cursor(encode_cursor(after)) == after
+
+    for cursor in ["", "not a cursor", encode_cursor(1).replace("=", ""), "WzFd"]:
+        with pytest.raises(ValueError):
+            valid_cursor(cursor)
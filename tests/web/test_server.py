@@ -13,3 +13,16 @@ def test_settings():
     # for whatever reason the value is wrapped in a list
     # needs further investigation
     assert s.cfg.bind[0] == Config().get()["server"]["bind"]
+
+
+def test_every_thread_gets_its_own_abci_rpc_client():
+    from planetmint.web import server
+
+    app = server.create_app(threads=2)
+    abci_rpc_pool = app.config["abci_rpc"]
+
+    with abci_rpc_pool() as first, abci_rpc_pool() as second:
+        assert first is not second
+        assert first.session is not second.session
+    with abci_rpc_pool() as client:
+        assert client in (first, second)
@@ -421,6 +421,24 @@ def test_transactions_get_list_good(client):
         ]
 
 
+def test_transactions_get_list_streams_ndjson(client):
+    from functools import partial
+
+    def get_txs_patched(conn, **args):
+        for index in range(3):
+            yield type("", (), {"to_dict": partial(lambda a: a, {"index": index})})
+
+    asset_ids = ["1" * 64]
+
+    with patch("planetmint.model.dataaccessor.DataAccessor.get_transactions_filtered", get_txs_patched):
+        url = TX_ENDPOINT + "?asset_ids=" + ",".join(asset_ids)
+        res = client.get(url, headers={"Accept": "application/x-ndjson"})
+        assert res.status_code == 200
+        assert res.mimetype == "application/x-ndjson"
+        assert res.data.decode().splitlines() == ['{"index": 0}', '{"index": 1}', '{"index": 2}']
+        assert client.get(url).json == [{"index": 0}, {"index": 1}, {"index": 2}]
+
+
 def test_transactions_get_list_bad(client):
     def should_not_be_called():
         assert False
@@ -440,7 +458,7 @@ def test_transactions_get_list_bad(client):
         assert client.get(url).status_code == 400
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 @pytest.mark.parametrize(
     "mode",
     [
@@ -474,6 +492,96 @@ def test_post_transaction_invalid_mode(client):
     assert 'Mode must be "async", "sync" or "commit"' == json.loads(response.data.decode("utf8"))["message"]["mode"]
 
 
+@patch("planetmint.abci.rpc.ABCI_RPC.write_transactions")
+@pytest.mark.parametrize("ndjson", [False, True])
+def test_post_transaction_batch(mock_write, client, ndjson):
+    mock_write.side_effect = lambda mode_list, endpoint, mode_commit, txs, mode: [(202, "")] * len(txs)
+
+    alice = generate_key_pair()
+    create_tx = Create.generate([alice.public_key], [([alice.public_key], 1)]).sign([alice.private_key])
+    transfer_tx = Transfer.generate(create_tx.to_inputs(), [([alice.public_key], 1)], asset_ids=[create_tx.id])
+    transfer_tx = transfer_tx.sign([alice.private_key])
+    double_spend = Transfer.generate(create_tx.to_inputs(), [([alice.public_key], 1)], asset_ids=[create_tx.id])
+    double_spend = double_spend.sign([alice.private_key])
+    batch = [create_tx.to_dict(), transfer_tx.to_dict(), {"id": "invalid"}, double_spend.to_dict()]
+
+    if ndjson:
+        data = "\n".join(json.dumps(tx) for tx in batch)
+        res = client.post(TX_ENDPOINT + "batch?mode=sync", data=data, content_type="application/x-ndjson")
+    else:
+        res = client.post(TX_ENDPOINT + "batch?mode=sync", data=json.dumps(batch))
+
+    assert res.status_code == 200
+    assert [result["status"] for result in res.json] == [202, 202, 400, 400]
+    assert [result["id"] for result in res.json] == [create_tx.id, transfer_tx.id, "invalid", double_spend.id]
+    assert "DoubleSpend" in res.json[3]["message"]
+    args, _ = mock_write.call_args
+    assert [tx.id for tx in args[3]] == [create_tx.id, transfer_tx.id]
+    assert args[4] == BROADCAST_TX_SYNC
+
+
+@patch("planetmint.abci.rpc.ABCI_RPC.write_transactions")
+def test_post_transaction_batch_rejects_commit_mode(mock_write, client):
+    alice = generate_key_pair()
+    create_tx = Create.generate([alice.public_key], [([alice.public_key], 1)]).sign([alice.private_key])
+
+    res = client.post(TX_ENDPOINT + "batch?mode=commit", data=json.dumps([create_tx.to_dict()]))
+    assert res.status_code == 400
+    assert "commit" in res.json["message"]
+    assert not mock_write.called
+
+
+def test_post_transaction_batch_bad_body(client):
+    res = client.post(TX_ENDPOINT + "batch", data=json.dumps({"id": "not a list"}))
+    assert res.status_code == 400
+    assert res.json["message"] == "The body must be a list of transactions"
+
+
+@patch("requests.Session.post")
+@patch("planetmint.application.validator.Validator.validate_transaction")
+def test_post_transaction_stateless_admission(mock_validate, mock_post, client):
+    from planetmint.utils import metrics
+    from planetmint.web.admission import AdmissionControl
+
+    mock_post.return_value = Mock(json=Mock(return_value={"result": {"code": 0}}))
+    client.application.config["admission"] = AdmissionControl("stateless")
+
+    alice = generate_key_pair()
+    tx = Create.generate([alice.public_key], [([alice.public_key], 1)], assets=None).sign([alice.private_key])
+    res = client.post(TX_ENDPOINT, data=json.dumps(tx.to_dict()))
+    assert res.status_code == 202
+    assert not mock_validate.called
+
+    stats = client.application.config["admission"].stats()
+    assert stats["mode"] == "stateless"
+    assert stats["histograms"]["stateless"]["count"] >= 1
+    assert "planetmint_admission_stateless 1" in metrics.render().splitlines()
+
+
+def test_adaptive_admission_goes_stateless_when_the_database_is_slow():
+    from contextlib import contextmanager
+    from planetmint.web.admission import AdmissionControl
+
+    validator = Mock()
+
+    @contextmanager
+    def validator_class():
+        yield validator
+
+    alice = generate_key_pair()
+    tx = Create.generate([alice.public_key], [([alice.public_key], 1)], assets=None).sign([alice.private_key])
+    admission = AdmissionControl("adaptive", latency_threshold=0.05, queue_threshold=16, probe_interval=60)
+
+    admission.validate(tx, validator_class)
+    assert validator.validate_transaction.call_count == 1
+    assert not admission.stats()["stateless"]
+
+    admission.latency = 0.1
+    admission.validate(tx, validator_class)
+    assert validator.validate_transaction.call_count == 1
+    assert admission.stats()["stateless"]
+
+
 def test_post_transaction_compose_valid_wo_abci(b, _bdb):
     alice = generate_key_pair()
     tx = Create.generate(